@@ -0,0 +1,83 @@
+import sys
+import os
+import time
+import random
+import argparse
+import yaml
+import torch
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rag_core.embedding_engine import EmbeddingEngine
+from src.rag_core.indexer import iter_processed_files
+
+def load_sentences(config, count, seed=0):
+    """
+    Collects benchmark inputs: sentences from the processed notes when
+    there are any, synthetic sentences of varied length otherwise.
+    """
+    sentences = []
+    for file_path in iter_processed_files(config['data']['processed_path']):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            sentences.extend(sentence.strip() for sentence in f.read().split('.') if sentence.strip())
+        if len(sentences) >= count:
+            break
+
+    rng = random.Random(seed)
+    if not sentences:
+        vocabulary = ['network', 'gradient', 'layer', 'sequence', 'attention', 'vector', 'loss', 'model', 'token', 'state']
+        sentences = [' '.join(rng.choice(vocabulary) for _ in range(rng.randint(4, 60))) for _ in range(count)]
+    rng.shuffle(sentences)
+    return (sentences * (count // len(sentences) + 1))[:count]
+
+def main(config, args):
+    """
+    Measures embedding throughput, in sentences per second, for every
+    combination of the batch sizes, thread counts and process counts given
+    on the command line.
+    """
+    sentences = load_sentences(config, args.sentences)
+    model_name = config['rag_core']['embedding']['model_name']
+    print(f"Embedding {len(sentences)} sentences with {model_name}")
+    print(f"{'batch':>6} {'threads':>8} {'procs':>6} {'sent/s':>10}")
+
+    for num_processes in args.processes:
+        for num_threads in args.threads:
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            for batch_size in args.batch_sizes:
+                engine = EmbeddingEngine(
+                    model_name,
+                    batch_size=batch_size,
+                    num_processes=num_processes,
+                )
+                try:
+                    # Warm-up run, also starts the process pool if there is one.
+                    engine.encode(sentences[:batch_size * max(num_processes, 1)])
+                    start = time.perf_counter()
+                    engine.encode(sentences)
+                    elapsed = time.perf_counter() - start
+                finally:
+                    engine.close()
+                print(f"{batch_size:>6} {num_threads:>8} {num_processes:>6} {len(sentences) / elapsed:>10.1f}")
+
+if __name__ == "__main__":
+    """
+    Example usage:
+        python benchmarks/bench_embeddings.py --config config.yaml --batch-sizes 16 64 256 --threads 1 4 8
+    """
+    parser = argparse.ArgumentParser(description='AI Study Assistant - Embedding throughput benchmark')
+    parser.add_argument('--config', type=str, required=True, help='Path to the project config.yaml file')
+    parser.add_argument('--sentences', type=int, default=2000, help='Number of sentences to embed per setting')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[16, 32, 64, 128], help='Batch sizes to try')
+    parser.add_argument('--threads', type=int, nargs='+', default=[0], help='Intra-op thread counts to try (0 = torch default)')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1], help='Encoding process counts to try')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+
+    main(config, args)
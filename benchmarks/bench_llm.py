@@ -0,0 +1,125 @@
+import sys
+import os
+import copy
+import time
+import argparse
+import resource
+import multiprocessing
+import yaml
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPT = "Explain in a few sentences how a GRU differs from an LSTM."
+CONTEXTS = [
+    "A GRU has an update gate and a reset gate and no separate cell state.",
+    "An LSTM has input, forget and output gates and keeps a cell state.",
+]
+
+def current_rss_mb():
+    """Returns the resident set size of this process in MB."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def time_to_first_token(llm, prompt):
+    """
+    Returns the seconds until the first streamed piece of the answer. The
+    stream is drained, so the next measurement starts on an idle model.
+    """
+    start = time.perf_counter()
+    first_token_time = None
+    for _ in llm.stream(prompt):
+        if first_token_time is None:
+            first_token_time = time.perf_counter()
+    return (first_token_time or time.perf_counter()) - start
+
+def run_backend(config, max_new_tokens, results):
+    """
+    Loads the LLM in a fresh process and measures load time, resident
+    memory, time to first token and decode throughput, and the time to
+    first token of two flashcard prompts that share the long instruction
+    prefix (the second one can reuse its cached key/value state).
+    """
+    from src.llm.model_loader import load_llm, register_prompt_prefix
+    from src.features.generator import count_tokens
+    from src.features.flashcard_generator import get_flashcard_prompt
+
+    config['rag_core']['generator']['max_new_tokens'] = max_new_tokens
+    start = time.perf_counter()
+    llm = load_llm(config)
+    load_seconds = time.perf_counter() - start
+
+    pieces = []
+    start = time.perf_counter()
+    first_token_time = None
+    for text in llm.stream(PROMPT):
+        if first_token_time is None:
+            first_token_time = time.perf_counter()
+        pieces.append(text)
+    end = time.perf_counter()
+
+    tokens = count_tokens(llm, pieces)
+    decode_seconds = end - (first_token_time or end)
+
+    flashcard_prompt = get_flashcard_prompt()
+    register_prompt_prefix(llm, 'flashcards', flashcard_prompt)
+    cold, warm = (time_to_first_token(llm, flashcard_prompt.format(context=context)) for context in CONTEXTS)
+    results.put({
+        'load_seconds': load_seconds,
+        'rss_mb': current_rss_mb(),
+        'ttft_seconds': (first_token_time or end) - start,
+        'tokens': tokens,
+        'tokens_per_second': (tokens - 1) / decode_seconds if tokens > 1 and decode_seconds > 0 else 0.0,
+        'prefix_cold_seconds': cold,
+        'prefix_warm_seconds': warm,
+    })
+
+def main(config, args):
+    """
+    Benchmarks each LLM backend in its own process, so the reported memory
+    belongs to that backend alone. 'cold s' and 'warm s' are the times to
+    first token of a flashcard prompt before and after its instruction
+    prefix is cached.
+    """
+    context = multiprocessing.get_context('spawn')
+    print(f"{'backend':>13} {'load s':>8} {'RSS MB':>8} {'TTFT s':>8} {'tokens':>7} {'tok/s':>7} {'cold s':>7} {'warm s':>7}")
+    for backend in args.backends:
+        backend_config = copy.deepcopy(config)
+        backend_config['rag_core']['generator']['backend'] = backend
+        if args.threads:
+            backend_config['rag_core']['generator']['num_threads'] = args.threads
+        results = context.Queue()
+        process = context.Process(target=run_backend, args=(backend_config, args.max_new_tokens, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0 or results.empty():
+            print(f"{backend:>13} failed (exit code {process.exitcode})")
+            continue
+        r = results.get()
+        print(f"{backend:>13} {r['load_seconds']:>8.1f} {r['rss_mb']:>8.0f} {r['ttft_seconds']:>8.2f} "
+              f"{r['tokens']:>7} {r['tokens_per_second']:>7.1f} {r['prefix_cold_seconds']:>7.2f} {r['prefix_warm_seconds']:>7.2f}")
+
+if __name__ == "__main__":
+    """
+    Example usage:
+        python benchmarks/bench_llm.py --config config.yaml --backends llama_cpp onnx --threads 8
+    """
+    parser = argparse.ArgumentParser(description='AI Study Assistant - LLM backend benchmark')
+    parser.add_argument('--config', type=str, required=True, help='Path to the project config.yaml file')
+    parser.add_argument('--backends', type=str, nargs='+', default=['transformers', 'llama_cpp', 'onnx'], help='LLM backends to compare')
+    parser.add_argument('--max-new-tokens', type=int, default=128, help='Tokens to generate per backend')
+    parser.add_argument('--threads', type=int, default=0, help='CPU threads (0 keeps the configured value)')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+
+    main(config, args)
@@ -0,0 +1,128 @@
+import sys
+import os
+import copy
+import time
+import random
+import argparse
+import yaml
+import chromadb
+import numpy as np
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rag_core.embedder import open_vector_store
+from src.rag_core.embedding_engine import load_embedding_model
+from src.rag_core.local_store import export_local_store, build_int8_index, build_ivf_index, open_local_store, read_documents
+from src.rag_core.retriever import create_retriever
+
+def bytes_per_vector(backend, dim):
+    """
+    Returns the index bytes held per vector by a backend: the float32
+    vector for Chroma, the int8 code plus its scale and norm for 'int8'
+    (whose float32 vectors stay on disk and are only read for reranking),
+    and only the list entry for 'ivf', which reads its vectors from the
+    memory-mapped matrix.
+    """
+    if backend == 'int8':
+        return dim + 8
+    if backend == 'ivf':
+        return 8
+    return 4 * dim
+
+def time_build(backend, store, store_dir, config):
+    """
+    Times building a backend's index from the exported vectors. For Chroma
+    the vectors are inserted into a fresh in-memory collection.
+    """
+    start = time.perf_counter()
+    if backend == 'int8':
+        build_int8_index(store_dir)
+    elif backend == 'ivf':
+        ivf_config = config['rag_core']['retriever'].get('ivf', {})
+        build_ivf_index(store_dir, n_lists=ivf_config.get('n_lists', 0), iterations=ivf_config.get('iterations', 20))
+    else:
+        client = chromadb.EphemeralClient()
+        collection = client.create_collection('bench_rebuild')
+        vectors = store['vectors']
+        for offset in range(0, len(vectors), 5000):
+            block = np.asarray(vectors[offset:offset + 5000])
+            collection.add(ids=[str(row) for row in range(offset, offset + len(block))], embeddings=block.tolist())
+        client.delete_collection('bench_rebuild')
+    return time.perf_counter() - start
+
+def main(config, args):
+    """
+    Compares the retriever backends against an exact float32 search over
+    the same vectors: index build time, recall@k, index bytes per vector
+    and query latency (p50/p99, including the query embedding). Queries
+    are sentences taken from random chunks of the collection.
+    """
+    embedding_model = load_embedding_model(config)
+    vector_store = open_vector_store(config, embedding_model)
+    store_dir = config['rag_core']['database']['local_store_directory']
+    export_local_store(vector_store, store_dir)
+
+    store = open_local_store(store_dir)
+    count, dim = store['info']['count'], store['info']['dim']
+    if not count:
+        print("The collection is empty. Build the vector store first.")
+        return
+    vectors = np.asarray(store['vectors'])
+    rng = random.Random(args.seed)
+    rows = [rng.randrange(count) for _ in range(args.queries)]
+    queries = [document.page_content.split('.')[0][:200] for document in read_documents(store_dir, store['offsets'], rows)]
+
+    ground_truth = []
+    for query in queries:
+        query_vector = np.asarray(embedding_model.embed_query(query), dtype=np.float32)
+        distances = ((vectors - query_vector) ** 2).sum(axis=1)
+        ground_truth.append(set(int(row) for row in np.argsort(distances)[:args.k]))
+    chunk_ids = [document.metadata['chunk_id'] for document in read_documents(store_dir, store['offsets'], range(count))]
+
+    print(f"{count} vectors of dimension {dim}, {len(queries)} queries, k={args.k}")
+    print(f"{'backend':>8} {'build s':>8} {'recall@k':>9} {'bytes/vec':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for backend in args.backends:
+        build_seconds = time_build(backend, store, store_dir, config)
+        backend_config = copy.deepcopy(config)
+        backend_config['rag_core']['retriever']['backend'] = backend
+        backend_config['rag_core']['retriever']['k'] = args.k
+        # Measure the backend itself, not its fusion with the lexical index.
+        backend_config['rag_core']['retriever'].setdefault('hybrid', {})['enabled'] = False
+        retriever = create_retriever(backend_config, embedding_model)
+
+        # Warm-up pass, which also fills the embedding cache for every query.
+        for query in queries:
+            retriever.invoke(query)
+
+        latencies, hits = [], 0
+        for query, truth in zip(queries, ground_truth):
+            start = time.perf_counter()
+            results = retriever.invoke(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            truth_ids = {chunk_ids[row] for row in truth}
+            hits += len(truth_ids & {document.metadata.get('chunk_id') for document in results})
+
+        recall = hits / (len(queries) * min(args.k, count))
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{backend:>8} {build_seconds:>8.2f} {recall:>9.3f} {bytes_per_vector(backend, dim):>10} {p50:>8.2f} {p99:>8.2f}")
+
+if __name__ == "__main__":
+    """
+    Example usage:
+        python benchmarks/bench_retrieval.py --config config.yaml --queries 200 --k 5
+    """
+    parser = argparse.ArgumentParser(description='AI Study Assistant - Retriever backend benchmark')
+    parser.add_argument('--config', type=str, required=True, help='Path to the project config.yaml file')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries to run')
+    parser.add_argument('--k', type=int, default=5, help='Number of results per query')
+    parser.add_argument('--backends', type=str, nargs='+', default=['chroma', 'int8', 'ivf'], help='Retriever backends to compare')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for picking the queries')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+
+    main(config, args)
@@ -0,0 +1,92 @@
+import sys
+import os
+import re
+import time
+import random
+import argparse
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Preprocessing.text_cleaner import clean_pages
+
+def legacy_pipeline(pages):
+    """
+    The text path as it was before the streaming cleaner: the document is
+    built with repeated `+=` and then cleaned with uncompiled regex passes.
+    """
+    text = ''
+    for page in pages:
+        text += page
+        text += "\n"
+    text = re.sub(r'\s+' , " " , text)
+    text = text.strip()
+    return re.sub(r'(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
+
+def streaming_pipeline(pages):
+    """The current text path: pages are cleaned one at a time and joined once."""
+    return ''.join(clean_pages(page + "\n" for page in pages))
+
+def make_synthetic_pages(total_mb, page_kb=4, seed=0):
+    """
+    Builds a synthetic document that looks like extracted lecture notes:
+    words separated by spaces, line breaks, runs of mixed whitespace and
+    words hyphenated across line breaks.
+    """
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 12))) for _ in range(5000)]
+    separators = [' '] * 14 + ['\n', '\n\n', ' \t ', '-\n']
+    pages = []
+    total_chars = int(total_mb * 1_000_000)
+    page_chars = page_kb * 1000
+    while total_chars > 0:
+        parts = []
+        size = 0
+        while size < page_chars:
+            word = rng.choice(vocabulary)
+            separator = rng.choice(separators)
+            parts.append(word)
+            parts.append(separator)
+            size += len(word) + len(separator)
+        pages.append(''.join(parts))
+        total_chars -= size
+    return pages
+
+def measure(pipeline, pages, repeats):
+    """Returns the best throughput of `pipeline` over `pages` in MB/s."""
+    size_mb = sum(len(page) + 1 for page in pages) / 1_000_000
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        pipeline(pages)
+        best = min(best, time.perf_counter() - start)
+    return size_mb / best
+
+def main(args):
+    """
+    Benchmarks the document text path, from per-page text to the cleaned
+    document, before and after the streaming cleaner, and prints the
+    throughput of both in MB/s.
+    """
+    pages = make_synthetic_pages(args.size_mb)
+    print(f"Synthetic document: {len(pages)} pages, {args.size_mb} MB")
+
+    legacy = measure(legacy_pipeline, pages, args.repeats)
+    streaming = measure(streaming_pipeline, pages, args.repeats)
+
+    print(f"legacy (+= and regex passes): {legacy:8.2f} MB/s")
+    print(f"streaming per-page cleaner:   {streaming:8.2f} MB/s ({streaming / legacy:.2f}x)")
+
+if __name__ == "__main__":
+    """
+    Example usage:
+        python benchmarks/bench_text_cleaner.py --size-mb 50
+    """
+    parser = argparse.ArgumentParser(description='AI Study Assistant - Text cleaning benchmark')
+    parser.add_argument('--size-mb', type=float, default=20, help='Size of the synthetic document in MB')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of timed runs per pipeline')
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,65 @@
+import sys
+import time
+import yaml
+import argparse
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from src.rag_core.embedder import open_vector_store
+from src.llm.model_loader import load_llm
+from src.features.flashcard_generator import create_flashcard_generator
+from src.features.question_bank import refresh_question_bank
+from src.memory.tracker import initialize_database
+
+def main(config):
+    """
+    Pre-generates the quiz question bank the app samples quizzes from.
+
+    This function generates flashcards for every course, shard by shard,
+    and stores them in the question bank of the memory database, keyed to
+    the chunks each question came from. Only shards whose chunks are new or
+    changed since the last run are generated, and questions of removed
+    chunks are deleted, so running it after every `build_vector_store.py`
+    is cheap.
+
+    Args:
+        config (dict): A dictionary containing the configuration loaded
+                       from the project's config.yaml file.
+    """
+    print("Refreshing the quiz question bank...")
+    initialize_database(config)
+    vector_store = open_vector_store(config)
+    flashcard_generator = create_flashcard_generator(
+        llm=load_llm(config), config=config, embedding_model=vector_store.embeddings
+    )
+
+    start = time.perf_counter()
+    stats = refresh_question_bank(flashcard_generator, vector_store, config)
+    print(f"\nQuestion bank is up to date: {stats['questions']} questions from {stats['generated']} new shards, "
+          f"{stats['kept']} shards kept, {stats['removed']} removed, {stats['failed']} failed "
+          f"in {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    """
+    Main entry point for the question bank build script.
+
+    Run it after `build_vector_store.py`, so the questions follow the
+    current contents of the vector store. Shards that failed are retried
+    on the next run.
+
+    The script requires a single command-line argument:
+    --config: The path to the project's main configuration YAML file.
+
+    Example usage:
+        python build_question_bank.py --config config.yaml
+    """
+    parser = argparse.ArgumentParser(description='AI Study Assistant - Build Question Bank Script')
+    parser.add_argument('--config', type=str, required=True, help='Path to the project config.yaml file')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+
+    main(config)
@@ -0,0 +1,64 @@
+import sys
+import time
+import yaml
+import argparse
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from src.rag_core.embedder import open_vector_store
+from src.llm.model_loader import load_llm
+from src.features.summarizer import create_summarizer_chain
+from src.features.summary_store import load_summary_store, refresh_summaries
+
+def main(config):
+    """
+    Precomputes the course summaries the app serves.
+
+    This function summarizes every course, and every notes type within a
+    course, from the chunks in the vector store and persists the results
+    in the summary store. Only the parts of the summary tree whose chunks
+    changed since the last run are rebuilt, and map outputs of unchanged
+    chunks are reused from the summarizer's cache, so running it after
+    every `build_vector_store.py` is cheap.
+
+    Args:
+        config (dict): A dictionary containing the configuration loaded
+                       from the project's config.yaml file.
+    """
+    store = load_summary_store(config)
+    if store is None:
+        print("No summary store configured under 'features.summarizer.store_path'. Exiting.")
+        return
+
+    print("Refreshing the precomputed summaries...")
+    vector_store = open_vector_store(config)
+    summarizer = create_summarizer_chain(llm=load_llm(config), config=config)
+
+    start = time.perf_counter()
+    stats = refresh_summaries(summarizer, vector_store, store)
+    print(f"\nSummaries are up to date: {stats['rebuilt']} nodes rebuilt, {stats['reused']} reused, "
+          f"{stats['removed']} removed in {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    """
+    Main entry point for the summary build script.
+
+    Run it after `build_vector_store.py`, so the summaries follow the
+    current contents of the vector store.
+
+    The script requires a single command-line argument:
+    --config: The path to the project's main configuration YAML file.
+
+    Example usage:
+        python build_summaries.py --config config.yaml
+    """
+    parser = argparse.ArgumentParser(description='AI Study Assistant - Build Summaries Script')
+    parser.add_argument('--config', type=str, required=True, help='Path to the project config.yaml file')
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+
+    main(config)
@@ -1,5 +1,4 @@
 import sys
-import os
 import yaml
 import argparse
 
@@ -7,17 +6,26 @@ repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 if repo_path not in sys.path:
     sys.path.append(repo_path)
 
-from src.rag_core.chunker import chunk_single_document
-from src.rag_core.embedder import embed_and_store
+from src.rag_core.embedder import open_vector_store, get_indexed_chunk_ids
+from src.rag_core.indexer import build_index
+from src.rag_core.local_store import build_local_index
+from src.rag_core.lexical_index import load_lexical_index, rebuild_lexical_index
+from src.rag_core.topic_catalog import build_topic_catalog, save_topic_catalog
 
 def main(config):
     """
     Orchestrates the chunking and embedding of all processed documents.
 
-    This function serves as the main logic for the script. It walks through
-    the processed data directory, chunks each corrected text file, collects
-    all chunks into a master list, and then embeds and stores them in the
-    ChromaDB vector store in a single, efficient batch operation.
+    This function serves as the main logic for the script. It streams the
+    corrected text files in the processed data directory through a
+    chunk -> embed -> write pipeline and brings the ChromaDB vector store
+    up to date incrementally: every chunk has a deterministic ID derived
+    from its source path and content, so only new or changed chunks are
+    embedded, chunks that no longer exist are deleted, and so are all
+    chunks of files that were removed. The BM25 lexical index used by
+    hybrid retrieval receives the same changes and is saved next to the
+    collection, along with the topic catalog (courses, specializations,
+    notes types and their chunk counts) that the app lists topics from.
 
     Args:
         config (dict): A dictionary containing the configuration loaded
@@ -25,29 +33,48 @@ def main(config):
     """
     print("Starting the build of the vector store from processed documents...")
 
-    all_chunks = []
-    processed_path = config['data']['processed_path']
-
-    for root, dirs, files in os.walk(processed_path):
-        for f in files:
-            if f.endswith('.txt'):
-                full_file_path = os.path.join(root, f)
-                print(f"Chunking document: {full_file_path}...")
-                
-
-                document_chunks = chunk_single_document(full_file_path, config)
-                all_chunks.extend(document_chunks)
-    
-    if not all_chunks:
-        print("No documents found to process. Exiting.")
-        return
-
-    print(f"\nAll {len(all_chunks)} document chunks have been created. Starting the embedding process...")
-
-
-    embed_and_store(all_chunks, config)
-
-    print("\nVector store has been successfully built!")
+    vector_store = open_vector_store(config)
+    indexed = get_indexed_chunk_ids(vector_store)
+    print(f"The collection currently holds {sum(len(ids) for ids in indexed.values())} chunks from {len(indexed)} files.")
+
+    lexical_index = load_lexical_index(config)
+    if lexical_index.chunk_ids() != set().union(*indexed.values()):
+        print("The lexical index is out of sync with the collection; rebuilding it...")
+        rebuild_lexical_index(lexical_index, vector_store)
+
+    stats = build_index(vector_store, indexed, config, lexical_index)
+
+    total_deleted = stats['deleted']
+    for source in sorted(set(indexed) - stats['seen_sources']):
+        vector_store.delete(ids=sorted(indexed[source]))
+        lexical_index.delete(indexed[source])
+        total_deleted += len(indexed[source])
+        print(f"Removed {len(indexed[source])} chunks of deleted file {source}.")
+
+    if not stats['seen_sources']:
+        print("No documents found to process.")
+        if not indexed:
+            return
+        # Everything was removed: still save the emptied indexes below.
+
+    print(f"\nVector store is up to date: {stats['added']} chunks embedded, {total_deleted} removed "
+          f"in {stats['seconds']:.1f}s ({stats['chunks_per_second']:.1f} chunks/s).")
+
+    catalog = build_topic_catalog(stats['source_summaries'])
+    save_topic_catalog(catalog, config['rag_core']['database']['topic_catalog_path'])
+    print(f"Topic catalog saved with {len(catalog['courses'])} courses.")
+
+    lexical_index.save(config['rag_core']['database']['lexical_index_path'])
+    print(f"Lexical index saved with {len(lexical_index)} chunks.")
+
+    info = build_local_index(vector_store, config)
+    if info is not None:
+        print(f"Exported {info['count']} vectors to the local '{config['rag_core']['retriever']['backend']}' search index.")
+    cache = getattr(vector_store.embeddings, 'cache', None)
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"Embedding cache: {cache_stats['hit_rate']:.0%} hit rate "
+              f"({cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, {cache_stats['misses']} misses).")
 
 if __name__ == "__main__":
     """
@@ -7,9 +7,9 @@ repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 if repo_path not in sys.path:
     sys.path.append(repo_path)
 
-from src.preprocessing.document_parser import process_all_documents
+from src.Preprocessing.document_parser import process_all_documents
 
-def main(config):
+def main(config, force=False):
     """
     Orchestrates the automated preprocessing of all raw documents.
 
@@ -21,9 +21,11 @@ def main(config):
     Args:
         config (dict): A dictionary containing the configuration loaded
                        from the project's config.yaml file.
+        force (bool): Reprocess every document, even those the manifest
+                      marks as unchanged.
     """
     print("Starting automated preprocessing of all raw documents...")
-    process_all_documents(config)
+    process_all_documents(config, force=force)
     print("\nAutomated preprocessing complete. Please manually review and correct the files in the data/processed directory.")
 
 if __name__ == "__main__":
@@ -38,14 +40,18 @@ if __name__ == "__main__":
     The script requires a single command-line argument:
     --config: The path to the project's main configuration YAML file.
 
+    Documents that are unchanged since the last run are skipped. Pass
+    --force to reprocess everything (this overwrites manual corrections).
+
     Example usage:
         python run_preprocessing.py --config config.yaml
     """
     parser = argparse.ArgumentParser(description='AI Study Assistant - Raw Data Preprocessing Script')
     parser.add_argument('--config', type=str, required=True, help='Path to the project config.yaml file')
+    parser.add_argument('--force', action='store_true', help='Reprocess all documents, ignoring the manifest')
     args = parser.parse_args()
 
     with open(args.config, 'r') as f:
         config = yaml.safe_load(f)
     
-    main(config)
+    main(config, force=args.force)
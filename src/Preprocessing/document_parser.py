@@ -1,33 +1,55 @@
 import sys , os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 import pymupdf as fitz
-import pdf2image 
-import pytesseract
 
-from src.Preprocessing.text_cleaner import cleaining_fn 
+from src.Preprocessing.text_cleaner import clean_pages 
+from src.Preprocessing.ocr_pipeline import iter_ocr_pages
+from src.Preprocessing.ocr_cache import evict_ocr_cache, summarize_cache_usage
+from src.Preprocessing.manifest import load_manifest, save_manifest, fingerprint_file, is_up_to_date, remove_stale_outputs
 
 repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 sys.path.append(repo_path)
 
-def extract_text_from_pdf(file_path):
+def _page_bounds(page_range, page_count):
+    """
+    Resolves an optional (start, stop) page range against a page count.
+
+    Args:
+        page_range (tuple[int, int] | None): Zero-based, half-open range of
+            pages, or None for the whole document.
+        page_count (int): The number of pages in the document.
+
+    Returns:
+        tuple[int, int]: The clamped (start, stop) page indices.
+    """
+    if page_range is None:
+        return 0, page_count
+    start, stop = page_range
+    return max(start, 0), min(stop, page_count)
+
+def extract_text_from_pdf(file_path, page_range=None):
     """
     Extracts text directly from a PDF file using PyMuPDF (fitz).
     This method is fast and effective for PDFs with selectable, typed text.
 
     Args:
         file_path (str): The full path to the PDF file.
+        page_range (tuple[int, int], optional): Zero-based, half-open range
+            of pages to extract. Defaults to the whole document.
 
     Returns:
         str: The extracted text from all pages of the PDF, concatenated.
              Returns an empty string if an error occurs.
     """
-    extracted_text = ''
+    page_texts = []
     try:
         with fitz.open(file_path) as doc:
-            for page in doc:
-                text = page.get_text()
-                extracted_text += text
-                extracted_text += "\n"
-        return extracted_text
+            start, stop = _page_bounds(page_range, doc.page_count)
+            for page_number in range(start, stop):
+                page_texts.append(doc[page_number].get_text())
+                page_texts.append("\n")
+        return ''.join(page_texts)
     except fitz.FileNotFoundError:
         print(f'PDF file {file_path} not found')
         return ""
@@ -35,104 +57,402 @@ def extract_text_from_pdf(file_path):
         print(f'An error occurred during direct text extraction: {e}')
         return ""
 
-def ocr_pdf(file_path, config):
+def ocr_pdf(file_path, config, page_range=None):
     """
     Performs Optical Character Recognition (OCR) on a PDF file.
     This is used for scanned documents or PDFs where text is not selectable.
-    It converts each page to an image and uses Tesseract to extract text.
+    Pages are rendered one at a time in memory and streamed to Tesseract,
+    so no temporary image files are written.
 
     Args:
         file_path (str): The full path to the PDF file.
-        config (dict): The project's configuration dictionary, which should
-                     contain the path for storing temporary OCR images.
+        config (dict): The project's configuration dictionary, which may
+                     contain OCR settings under 'preprocessing.ocr'.
+        page_range (tuple[int, int], optional): Zero-based, half-open range
+            of pages to OCR. Defaults to the whole document.
 
     Returns:
         str: The OCR'd text from all pages of the PDF, concatenated.
              Returns an empty string if an error occurs.
     """
-    ocr_text = ''
-    # Get the temporary directory for OCR images from the config file.
-    output_dir = config['data']['ocr_file_path']
-    os.makedirs(output_dir, exist_ok=True)
+    page_texts = []
     try:
-        images = pdf2image.convert_from_path(file_path, dpi=300, output_folder=output_dir, fmt='jpeg')
-        for image in images:
-            data = pytesseract.image_to_string(image)
-            ocr_text += data
-            ocr_text += '\n'
-        return ocr_text
+        with fitz.open(file_path) as doc:
+            start, stop = _page_bounds(page_range, doc.page_count)
+        results = {page_number: data for page_number, data, _ in iter_ocr_pages(file_path, range(start, stop), config)}
+        for page_number in sorted(results):
+            page_texts.append(results[page_number])
+            page_texts.append('\n')
+        return ''.join(page_texts)
     except Exception as e:
         print(f'An error occurred during OCR processing: {e}')
         return ""
 
-def process_all_documents(config):
+def _extract_pages(file_path, config, page_range=None):
     """
-    Orchestrates the entire document processing pipeline.
-    It walks through the raw data directory, processes each PDF file by
-    attempting direct text extraction and falling back to OCR, cleans the
-    extracted text, and saves the result to the processed data directory,
-    mirroring the original folder structure.
+    Extracts the text of a PDF page by page, choosing the method per page.
+    Pages with enough selectable text use PyMuPDF directly; only the pages
+    that don't (scans, photos of handwriting) are rasterized and OCR'd.
+    Unlike `extract_document`, errors opening the PDF are raised.
+    """
+    min_page_chars = config.get('preprocessing', {}).get('min_page_chars', 50)
+    page_texts = {}
+    page_records = {}
+    ocr_pages = []
+    with fitz.open(file_path) as doc:
+        start, stop = _page_bounds(page_range, doc.page_count)
+        for page_number in range(start, stop):
+            page_start = time.perf_counter()
+            text = doc[page_number].get_text()
+            if len(text.strip()) >= min_page_chars:
+                page_texts[page_number] = text + "\n"
+                page_records[page_number] = {
+                    'page': page_number + 1,
+                    'method': 'text',
+                    'chars': len(text) + 1,
+                    'seconds': round(time.perf_counter() - page_start, 4),
+                }
+            else:
+                ocr_pages.append(page_number)
+
+    # The scanned pages are OCR'd in a second pass, streamed through the
+    # in-memory OCR pipeline once the document above has been closed.
+    page_start = time.perf_counter()
+    try:
+        for page_number, text, details in iter_ocr_pages(file_path, ocr_pages, config):
+            page_texts[page_number] = text + "\n"
+            page_records[page_number] = {
+                'page': page_number + 1,
+                'method': 'ocr',
+                'chars': len(text) + 1,
+                'seconds': round(time.perf_counter() - page_start, 4),
+                'dpi': details['dpi'],
+                'confidence': details['confidence'],
+                'cache': details['cache'],
+                'failed': details['failed'],
+            }
+            page_start = time.perf_counter()
+    except Exception as e:
+        print(f'An error occurred during OCR processing of {file_path}: {e}')
+
+    for page_number in ocr_pages:
+        if page_number not in page_records:
+            page_texts[page_number] = "\n"
+            page_records[page_number] = {
+                'page': page_number + 1,
+                'method': 'ocr',
+                'chars': 1,
+                'seconds': 0.0,
+                'dpi': None,
+                'confidence': None,
+                'cache': None,
+                'failed': True,
+            }
+
+    order = sorted(page_records)
+    return [page_texts[page_number] for page_number in order], [page_records[page_number] for page_number in order]
+
+def extract_document(file_path, config, page_range=None):
+    """
+    Extracts the text of a PDF using per-page hybrid routing: PyMuPDF text
+    where a page has at least `preprocessing.min_page_chars` characters of
+    selectable text, OCR for the pages that don't.
+
+    Args:
+        file_path (str): The full path to the PDF file.
+        config (dict): The project's configuration dictionary.
+        page_range (tuple[int, int], optional): Zero-based, half-open range
+            of pages to extract. Defaults to the whole document.
+
+    Returns:
+        tuple[list[str], list[dict]]: The raw text of each page, and one
+        record per page with its 1-based 'page' number, the 'method' used
+        ('text' or 'ocr'), the number of 'chars' it yielded and the
+        'seconds' it took. OCR pages also record the 'dpi' they were
+        recognised at, Tesseract's mean word 'confidence', whether the
+        OCR 'cache' was a 'hit' or a 'miss', and whether OCR 'failed'.
+        Returns ([], []) if the PDF cannot be read.
+    """
+    try:
+        return _extract_pages(file_path, config, page_range)
+    except Exception as e:
+        print(f'An error occurred during text extraction of {file_path}: {e}')
+        return [], []
+
+def summarize_page_records(page_records):
+    """
+    Formats per-page extraction records as a one-line report.
+
+    Args:
+        page_records (list[dict]): Records returned by `extract_document`.
+
+    Returns:
+        str: e.g. "12 pages: 11 text, 1 OCR (OCR pages: 7 @150dpi conf 91.2)".
+    """
+    ocr_records = [record for record in page_records if record['method'] == 'ocr']
+    report = f"{len(page_records)} pages: {len(page_records) - len(ocr_records)} text, {len(ocr_records)} OCR"
+    if ocr_records:
+        details = ', '.join(
+            f"{record['page']} @{record['dpi']}dpi conf {record['confidence']}" for record in ocr_records
+        )
+        report += f" (OCR pages: {details})"
+    return report
+
+def has_failed_ocr(page_records):
+    """
+    Checks whether any OCR page of a document failed because Tesseract or
+    the rendering raised. Blank pages, which have no confidence, are fine.
+
+    Args:
+        page_records (list[dict]): Records returned by `extract_document`.
+
+    Returns:
+        bool: True if the document should be processed again next run.
+    """
+    return any(record['method'] == 'ocr' and record['failed'] for record in page_records)
+
+def process_document(file_path, config):
+    """
+    Extracts and cleans the text of a single PDF file.
+
+    Args:
+        file_path (str): The full path to the PDF file.
+        config (dict): The project's configuration dictionary.
+
+    Returns:
+        tuple[str, list[dict]]: The cleaned text of the document and its
+        per-page extraction records (see `extract_document`).
+    """
+    page_texts, page_records = extract_document(file_path, config)
+    return ''.join(clean_pages(page_texts)), page_records
+
+def find_raw_documents(config):
+    """
+    Walks the raw data directory and pairs every PDF with the path of the
+    .txt file it should be written to, mirroring the original folder
+    structure under the processed data directory.
 
     Args:
         config (dict): The project's configuration dictionary containing
-                     all necessary paths.
+                     the raw data path.
 
-    Side Effects:
-        - Creates .txt files in the `processed_path` directory.
-        - Prints status messages or errors to the console.
+    Returns:
+        list[tuple[str, str]]: (pdf_path, output_path) pairs in walk order.
     """
-    raw_data_folder = config['data']['raw_path']
-    
-    print(f"Starting document processing in: {raw_data_folder}")
+    documents = []
+    for root, dirs, files in os.walk(config['data']['raw_path']):
+        save_path = root.replace("raw", "processed")
+        for single_file in files:
+            if single_file.endswith('.pdf'):
+                file_name = f'{os.path.splitext(single_file)[0]}.txt'
+                documents.append((os.path.join(root, single_file), os.path.join(save_path, file_name)))
+    return documents
 
-    for root, dirs, files in os.walk(raw_data_folder):
-        if len(files) > 0:
+def write_processed_text(clean_text, full_file_path, elapsed):
+    """
+    Writes cleaned text to its processed .txt file and reports how long the
+    document took to process.
 
-            save_path = root.replace("raw", "processed")
-            os.makedirs(save_path, exist_ok=True)
+    Args:
+        clean_text (str): The cleaned document text.
+        full_file_path (str): Destination path of the .txt file.
+        elapsed (float): Seconds spent processing the source document.
 
-            for single_file in files:
-                if single_file.endswith('.pdf'):
-                    file_path = os.path.join(root, single_file)
-                    print(f"Processing: {file_path}")
+    Returns:
+        bool: True if the file was written successfully.
+    """
+    try:
+        os.makedirs(os.path.dirname(full_file_path), exist_ok=True)
+        with open(full_file_path, 'w', encoding='utf-8') as doc:
+            doc.write(clean_text)
+        print(f"    --> Saved to: {full_file_path} ({elapsed:.2f}s)")
+        return True
+    except Exception as e:
+        print(f"    --> ERROR: Could not write file. {e}")
+        return False
 
+def _page_tasks(file_path, pages_per_task):
+    """
+    Splits a PDF into page ranges of at most `pages_per_task` pages so that
+    large documents can be spread over several workers. Documents that
+    cannot be opened here are returned as a single whole-document task so
+    the worker reports the error exactly as the serial path would.
+    """
+    try:
+        with fitz.open(file_path) as doc:
+            page_count = doc.page_count
+    except Exception:
+        return [None]
+    if page_count <= pages_per_task:
+        return [None]
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
 
-                    text = extract_text_from_pdf(file_path)
+def _run_page_task(file_path, page_range, config):
+    """
+    Worker entry point for the process pool. Returns the text and page
+    records of the page range, or None if the PDF could not be read so the
+    parent can treat the whole document as failed, as the serial path does.
+    """
+    try:
+        return _extract_pages(file_path, config, page_range)
+    except Exception as e:
+        print(f'An error occurred during text extraction of {file_path}: {e}')
+        return None
+
+def _process_documents_parallel(documents, config, num_workers, pages_per_task, written):
+    """
+    Processes documents on a pool of worker processes.
+
+    Every document is split into page-range tasks. Results are streamed back
+    as they complete; once all ranges of a document are in, the parent
+    joins them in page order, cleans and writes the text, so output is
+    identical to the serial path. Documents with a page range that could
+    not be read are reported and not written.
+
+    Args:
+        written (dict[str, list[dict]]): Filled with the page records of
+            every source document as soon as its output is written, keyed
+            by source path, so an interrupted run keeps what it finished.
+    """
+    jobs = {}
+    pending = {}
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        for file_path, output_path in documents:
+            ranges = _page_tasks(file_path, pages_per_task)
+            jobs[file_path] = {
+                'output_path': output_path,
+                'parts': [None] * len(ranges),
+                'failed': False,
+                'remaining': len(ranges),
+                'start': time.perf_counter(),
+            }
+            for index, page_range in enumerate(ranges):
+                future = executor.submit(_run_page_task, file_path, page_range, config)
+                pending[future] = (file_path, index)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, index = pending.pop(future)
+                job = jobs[file_path]
+                part = future.result()
+                if part is None:
+                    job['failed'] = True
+                job['parts'][index] = part
+                job['remaining'] -= 1
+                if job['remaining']:
+                    continue
+
+                del jobs[file_path]
+                print(f"Processing: {file_path}")
+                if job['failed']:
+                    print("    --> ERROR: Could not extract the document, skipping it.")
+                    continue
+                page_texts = [text for part_texts, _ in job['parts'] for text in part_texts]
+                page_records = [record for _, part_records in job['parts'] for record in part_records]
+                print(f"    --> {summarize_page_records(page_records)}")
+                if write_processed_text(''.join(clean_pages(page_texts)), job['output_path'], time.perf_counter() - job['start']):
+                    written[file_path] = page_records
+
+def process_all_documents(config, force=False):
+    """
+    Orchestrates the entire document processing pipeline.
+    It walks through the raw data directory, extracts the text of each PDF
+    file page by page (direct extraction where a page has selectable text,
+    OCR where it doesn't), cleans the extracted text, and saves the result
+    to the processed data directory, mirroring the original folder structure.
 
+    When `data.manifest_path` is set, a manifest of content hashes is used
+    to skip documents that have not changed since they were last processed
+    and to delete the outputs of documents that were removed.
 
-                    if len(text) < 200:
-                        print("    --> Low text yield. Falling back to OCR...")
-                        text = ocr_pdf(file_path=file_path, config=config)
+    When `preprocessing.num_workers` is greater than 1 the documents, and
+    page ranges of large documents, are processed on a pool of worker
+    processes. The output is the same as in the serial mode.
 
+    Args:
+        config (dict): The project's configuration dictionary containing
+                     all necessary paths.
+        force (bool): Reprocess every document, ignoring the manifest.
 
-                    clean_text = cleaining_fn(text)
+    Side Effects:
+        - Creates .txt files in the `processed_path` directory.
+        - Deletes .txt files whose source PDF was removed.
+        - Documents that cannot be read are not written, and documents with
+          failed OCR pages are left out of the manifest, so both are
+          retried on the next run.
+        - Updates the manifest file and the OCR cache.
+        - Prints status messages, per-file timings or errors to the console.
+    """
+    raw_data_folder = config['data']['raw_path']
+    manifest_path = config['data'].get('manifest_path')
+    preprocessing_config = config.get('preprocessing', {})
+    num_workers = preprocessing_config.get('num_workers', 1)
+    pages_per_task = preprocessing_config.get('pages_per_task', 50)
 
+    print(f"Starting document processing in: {raw_data_folder}")
+    run_start = time.perf_counter()
+    documents = find_raw_documents(config)
+    manifest = load_manifest(manifest_path) if manifest_path else {}
 
-                    path_data = root.split(os.sep)
-                    path_data = path_data[2:] 
-                    meta_data = {}
-                    if len(path_data) > 2:
-                        meta_data = {
-                            'specialization': path_data[0],
-                            'course': path_data[1],
-                            'notes_type': path_data[2]
-                        }
-                    elif len(path_data) == 2:
-                        meta_data = {
-                            'course': path_data[0],
-                            'notes_type': path_data[1]
-                        }
+    fingerprints = {}
+    to_process = documents
+    if manifest_path:
+        to_process = []
+        for file_path, output_path in documents:
+            entry = manifest.get(file_path)
+            fingerprints[file_path] = fingerprint_file(file_path, entry)
+            if not force and is_up_to_date(entry, fingerprints[file_path], output_path):
+                # Refresh the mtime so the next run does not need to re-hash.
+                entry.update(fingerprints[file_path])
+            else:
+                to_process.append((file_path, output_path))
 
+        for output_path in remove_stale_outputs(manifest, fingerprints):
+            print(f"    --> Removed stale output: {output_path}")
+    print(f"{len(to_process)} of {len(documents)} documents need processing.")
 
-                    file_name = f'{os.path.splitext(single_file)[0]}.txt'
-                    full_file_path = os.path.join(save_path, file_name)
-                    
-                    try:
-                        with open(full_file_path, 'w', encoding='utf-8') as doc:
-                            doc.write(clean_text)
-                        print(f"    --> Saved to: {full_file_path}")
-                    except Exception as e:
-                        print(f"    --> ERROR: Could not write file. {e}")
+    written = {}
+    try:
+        if num_workers > 1 and to_process:
+            print(f"Using {num_workers} worker processes.")
+            _process_documents_parallel(to_process, config, num_workers, pages_per_task, written)
+        else:
+            for file_path, output_path in to_process:
+                print(f"Processing: {file_path}")
+                file_start = time.perf_counter()
+                clean_text, page_records = process_document(file_path, config)
+                if not page_records:
+                    print("    --> ERROR: Could not extract the document, skipping it.")
+                    continue
+                print(f"    --> {summarize_page_records(page_records)}")
+                if write_processed_text(clean_text, output_path, time.perf_counter() - file_start):
+                    written[file_path] = page_records
+    finally:
+        if manifest_path:
+            output_paths = dict(to_process)
+            for file_path, page_records in written.items():
+                if has_failed_ocr(page_records):
+                    # Leave the document out so its failed pages are retried next run.
+                    print(f"    --> OCR failed on some pages of {file_path}; it will be processed again next run.")
+                    continue
+                manifest[file_path] = dict(
+                    fingerprints[file_path],
+                    output=output_paths[file_path],
+                    pages=len(page_records),
+                    ocr_pages=[
+                        {'page': record['page'], 'dpi': record['dpi'], 'confidence': record['confidence']}
+                        for record in page_records if record['method'] == 'ocr'
+                    ],
+                )
+            save_manifest(manifest, manifest_path)
 
-    print("Document processing complete.")
+    ocr_cache_config = preprocessing_config.get('ocr_cache', {})
+    if ocr_cache_config.get('path'):
+        print(summarize_cache_usage(record for page_records in written.values() for record in page_records))
+        evicted = evict_ocr_cache(ocr_cache_config['path'], ocr_cache_config.get('max_size_mb', 512))
+        if evicted:
+            print(f"OCR cache: evicted {evicted} least recently used entries.")
 
+    print(f"Document processing complete. {len(written)} documents processed in {time.perf_counter() - run_start:.2f}s.")
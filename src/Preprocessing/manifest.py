@@ -0,0 +1,126 @@
+import sys, os
+import json
+import hashlib
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+def load_manifest(manifest_path):
+    """
+    Loads the preprocessing manifest from disk.
+
+    The manifest maps every processed source PDF to the fingerprint it had
+    when it was last processed and to the .txt file it produced:
+    {source_path: {'sha256': ..., 'mtime': ..., 'size': ..., 'output': ...}}
+
+    Args:
+        manifest_path (str): Path of the JSON manifest file.
+
+    Returns:
+        dict: The manifest, or an empty dict if the file does not exist or
+              cannot be read.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f'Could not read manifest {manifest_path}, starting a new one: {e}')
+        return {}
+
+def save_manifest(manifest, manifest_path):
+    """
+    Writes the manifest to disk atomically, so an interrupted run never
+    leaves a truncated manifest behind.
+
+    Args:
+        manifest (dict): The manifest to save.
+        manifest_path (str): Path of the JSON manifest file.
+    """
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+    temp_path = f'{manifest_path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+def hash_file(file_path, block_size=1 << 20):
+    """
+    Computes the SHA-256 digest of a file without loading it into memory.
+
+    Args:
+        file_path (str): The file to hash.
+        block_size (int): Number of bytes read per iteration.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def fingerprint_file(file_path, entry=None):
+    """
+    Builds the manifest fingerprint of a source file.
+
+    The content hash is only computed when the size or modification time
+    differ from the previous entry, so checking an unchanged corpus costs a
+    `stat` call per file.
+
+    Args:
+        file_path (str): The source file.
+        entry (dict, optional): The file's previous manifest entry.
+
+    Returns:
+        dict: {'sha256', 'mtime', 'size'} for the file as it is now.
+    """
+    stat = os.stat(file_path)
+    if entry and entry.get('mtime') == stat.st_mtime and entry.get('size') == stat.st_size:
+        digest = entry['sha256']
+    else:
+        digest = hash_file(file_path)
+    return {'sha256': digest, 'mtime': stat.st_mtime, 'size': stat.st_size}
+
+def is_up_to_date(entry, fingerprint, output_path):
+    """
+    Decides whether a source file can be skipped.
+
+    Args:
+        entry (dict | None): The file's previous manifest entry.
+        fingerprint (dict): The file's current fingerprint.
+        output_path (str): Where the file's processed text should be.
+
+    Returns:
+        bool: True if the content is unchanged and its output still exists.
+    """
+    return (
+        entry is not None
+        and entry.get('sha256') == fingerprint['sha256']
+        and entry.get('output') == output_path
+        and os.path.exists(output_path)
+    )
+
+def remove_stale_outputs(manifest, current_sources):
+    """
+    Deletes the processed outputs of sources that no longer exist and drops
+    their manifest entries. Only files recorded in the manifest are removed,
+    so hand-made files in the processed directory are never touched.
+
+    Args:
+        manifest (dict): The manifest, modified in place.
+        current_sources (set[str]): Source paths found in this run.
+
+    Returns:
+        list[str]: The output paths that were deleted.
+    """
+    removed = []
+    for source in sorted(set(manifest) - set(current_sources)):
+        output_path = manifest.pop(source).get('output')
+        if output_path and os.path.exists(output_path):
+            os.remove(output_path)
+            removed.append(output_path)
+    return removed
@@ -0,0 +1,142 @@
+import sys, os
+import time
+import json
+import hashlib
+import sqlite3
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+# Settings that change what Tesseract returns for a given page bitmap.
+_RESULT_SETTINGS = ('dpi', 'adaptive', 'base_dpi', 'min_confidence', 'grayscale', 'binarize', 'binarize_threshold')
+
+def open_ocr_cache(cache_path):
+    """
+    Opens the OCR cache database, creating it and its table if needed.
+    A generous timeout lets several ingestion worker processes share it.
+
+    Args:
+        cache_path (str): Path of the SQLite cache database.
+
+    Returns:
+        sqlite3.Connection: The connection to pass to `get_cached_ocr` and
+        `store_ocr_result`. The caller closes it.
+    """
+    cache_dir = os.path.dirname(cache_path)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    conn = sqlite3.connect(cache_path, timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ocr_cache (
+        key TEXT PRIMARY KEY,
+        text TEXT NOT NULL,
+        confidence REAL,
+        dpi INTEGER,
+        size_bytes INTEGER NOT NULL,
+        last_access REAL NOT NULL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_access ON ocr_cache (last_access)")
+    return conn
+
+def make_ocr_cache_key(pixmap_samples, width, height, settings):
+    """
+    Builds the cache key of a rendered page: a hash of its bitmap together
+    with every OCR setting that affects the recognised text.
+
+    Args:
+        pixmap_samples (bytes): The raw pixels of the first rendering of the page.
+        width (int): The bitmap width in pixels.
+        height (int): The bitmap height in pixels.
+        settings (dict): OCR settings from `get_ocr_settings`.
+
+    Returns:
+        str: The hexadecimal cache key.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({name: settings.get(name) for name in _RESULT_SETTINGS}, sort_keys=True).encode('utf-8'))
+    digest.update(f'{width}x{height}'.encode('utf-8'))
+    digest.update(pixmap_samples)
+    return digest.hexdigest()
+
+def get_cached_ocr(conn, key):
+    """
+    Looks up the OCR result of a page and marks it as recently used.
+
+    Args:
+        conn (sqlite3.Connection): Connection from `open_ocr_cache`.
+        key (str): Key from `make_ocr_cache_key`.
+
+    Returns:
+        tuple[str, float | None, int] | None: (text, confidence, dpi), or
+        None on a cache miss.
+    """
+    with conn:
+        row = conn.execute("SELECT text, confidence, dpi FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE ocr_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row
+
+def store_ocr_result(conn, key, text, confidence, dpi):
+    """
+    Stores the OCR result of a page.
+
+    Args:
+        conn (sqlite3.Connection): Connection from `open_ocr_cache`.
+        key (str): Key from `make_ocr_cache_key`.
+        text (str): The recognised text.
+        confidence (float | None): Tesseract's mean word confidence.
+        dpi (int): The resolution the text was recognised at.
+    """
+    size_bytes = len(key) + len(text.encode('utf-8')) + 32
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO ocr_cache (key, text, confidence, dpi, size_bytes, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, text, confidence, dpi, size_bytes, time.time()),
+        )
+
+def evict_ocr_cache(cache_path, max_size_mb):
+    """
+    Removes the least recently used entries until the cache holds at most
+    `max_size_mb` megabytes of entries.
+
+    Args:
+        cache_path (str): Path of the SQLite cache database.
+        max_size_mb (float): The size budget of the cache.
+
+    Returns:
+        int: The number of entries removed.
+    """
+    conn = open_ocr_cache(cache_path)
+    try:
+        with conn:
+            cursor = conn.execute("""
+            DELETE FROM ocr_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size_bytes) OVER (ORDER BY last_access DESC, key) AS running_size
+                    FROM ocr_cache
+                )
+                WHERE running_size > ?
+            )
+            """, (int(max_size_mb * 1024 * 1024),))
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def summarize_cache_usage(page_records):
+    """
+    Formats the OCR cache hit/miss statistics of a preprocessing run.
+
+    Args:
+        page_records (Iterable[dict]): Page records of the processed
+            documents. OCR pages carry a 'cache' field of 'hit' or 'miss'.
+
+    Returns:
+        str: e.g. "OCR cache: 40 hits, 10 misses (80.0% hit rate)".
+    """
+    outcomes = [record.get('cache') for record in page_records if record['method'] == 'ocr']
+    hits = outcomes.count('hit')
+    misses = outcomes.count('miss')
+    lookups = hits + misses
+    hit_rate = 100.0 * hits / lookups if lookups else 0.0
+    return f"OCR cache: {hits} hits, {misses} misses ({hit_rate:.1f}% hit rate)"
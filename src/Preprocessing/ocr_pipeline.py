@@ -0,0 +1,244 @@
+import sys
+import queue
+import threading
+from collections import deque
+import pymupdf as fitz
+import pytesseract
+from PIL import Image
+
+from src.Preprocessing.ocr_cache import make_ocr_cache_key, open_ocr_cache, get_cached_ocr, store_ocr_result
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+def get_ocr_settings(config):
+    """
+    Reads the OCR settings from 'preprocessing.ocr', filling in defaults.
+
+    Args:
+        config (dict): The project's configuration dictionary.
+
+    Returns:
+        dict: The complete OCR settings.
+    """
+    settings = {
+        'dpi': 300,
+        'queue_size': 2,
+        'adaptive': False,
+        'base_dpi': 150,
+        'min_confidence': 75,
+        'grayscale': False,
+        'binarize': False,
+        'binarize_threshold': 160,
+    }
+    settings.update(config.get('preprocessing', {}).get('ocr', {}))
+    return settings
+
+def prepare_page_image(image, settings):
+    """
+    Applies the optional grayscale conversion and binarization to a
+    rendered page before it is sent to Tesseract.
+
+    Args:
+        image (PIL.Image.Image): The rendered page.
+        settings (dict): OCR settings from `get_ocr_settings`.
+
+    Returns:
+        PIL.Image.Image: The image to recognise. This is `image` itself if
+        no preprocessing is enabled.
+    """
+    if not (settings['grayscale'] or settings['binarize']):
+        return image
+    prepared = image.convert("L")
+    if settings['binarize']:
+        threshold = settings['binarize_threshold']
+        binarized = prepared.point(lambda value: 255 if value > threshold else 0)
+        prepared.close()
+        prepared = binarized
+    return prepared
+
+def recognize_image(image):
+    """
+    Runs Tesseract on an image and measures how confident it was.
+
+    Args:
+        image (PIL.Image.Image): The page image.
+
+    Returns:
+        tuple[str, float | None]: The recognised text, with words joined by
+        spaces and lines by newlines, and the mean word confidence (0-100).
+        The confidence is None if no words were found.
+    """
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    lines = []
+    confidences = []
+    current_line = None
+    for word, confidence, block, paragraph, line in zip(
+        data['text'], data['conf'], data['block_num'], data['par_num'], data['line_num']
+    ):
+        confidence = float(confidence)
+        if confidence < 0 or not word.strip():
+            continue
+        if (block, paragraph, line) != current_line:
+            current_line = (block, paragraph, line)
+            lines.append([])
+        lines[-1].append(word)
+        confidences.append(confidence)
+    text = '\n'.join(' '.join(words) for words in lines)
+    if not confidences:
+        return text, None
+    return text, round(sum(confidences) / len(confidences), 2)
+
+def _render_pages(file_path, page_numbers, settings, use_cache, page_queue, retry_queue, stop_event):
+    """
+    Producer thread: renders the requested pages one at a time and hands
+    them to the OCR consumer through a bounded queue, so at most
+    `queue_size` rendered pages exist at any moment.
+
+    In adaptive mode pages are first rendered at `base_dpi`; pages the
+    consumer sends back through `retry_queue` are rendered again at `dpi`.
+    When the OCR cache is used, the first rendering of each page is also
+    hashed here into its cache key. All PyMuPDF calls stay on this thread.
+    """
+    def put(item):
+        while not stop_event.is_set():
+            try:
+                page_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    first_dpi = settings['base_dpi'] if settings['adaptive'] else settings['dpi']
+    pending = deque(page_numbers)
+    try:
+        with fitz.open(file_path) as doc:
+            while not stop_event.is_set():
+                try:
+                    page_number, dpi, is_retry = retry_queue.get_nowait(), settings['dpi'], True
+                except queue.Empty:
+                    if not pending:
+                        try:
+                            page_number, dpi, is_retry = retry_queue.get(timeout=0.1), settings['dpi'], True
+                        except queue.Empty:
+                            continue
+                    else:
+                        page_number, dpi, is_retry = pending.popleft(), first_dpi, False
+                pixmap = doc[page_number].get_pixmap(dpi=dpi, alpha=False)
+                cache_key = None
+                if use_cache and not is_retry:
+                    cache_key = make_ocr_cache_key(pixmap.samples_mv, pixmap.width, pixmap.height, settings)
+                image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+                del pixmap
+                if not put((page_number, dpi, image, cache_key)):
+                    return
+    except Exception as e:
+        put(e)
+
+def iter_ocr_pages(file_path, page_numbers, config):
+    """
+    Streams OCR results for the given pages of a PDF.
+
+    Pages are rendered in memory by a background thread while Tesseract
+    works on the previous page. Rendering and recognition therefore overlap,
+    peak memory is bounded by the queue size regardless of page count, and
+    no image files are written to disk.
+
+    With 'preprocessing.ocr.adaptive' enabled, pages are first recognised at
+    the cheaper `base_dpi`, and only pages whose mean word confidence is
+    below `min_confidence` are rendered and recognised again at `dpi`. The
+    more confident of the two results is kept.
+
+    With 'preprocessing.ocr_cache.path' set, results are cached on disk
+    keyed by a hash of the page's first rendering and the OCR settings, so
+    a page seen before in any document costs a lookup instead of a
+    Tesseract run. One cache connection is used for the whole call.
+
+    Args:
+        file_path (str): The full path to the PDF file.
+        page_numbers (Iterable[int]): Zero-based page numbers to OCR.
+        config (dict): The project's configuration dictionary. OCR settings
+            are read from 'preprocessing.ocr' (see `get_ocr_settings`).
+
+    Yields:
+        tuple[int, str, dict]: (page_number, text, details) as pages are
+        completed, which is not necessarily the order requested. `details`
+        holds the 'dpi' of the kept result, its mean word 'confidence' and
+        the 'cache' outcome ('hit', 'miss', or None without a cache).
+        A page Tesseract fails on yields an empty string with 'failed'
+        set; a blank page is not failed, only without a confidence.
+
+    Raises:
+        Exception: Any error raised while opening or rendering the PDF.
+    """
+    settings = get_ocr_settings(config)
+    cache_path = config.get('preprocessing', {}).get('ocr_cache', {}).get('path')
+    page_numbers = list(dict.fromkeys(page_numbers))
+    page_queue = queue.Queue(maxsize=settings['queue_size'])
+    retry_queue = queue.Queue()
+    stop_event = threading.Event()
+    producer = threading.Thread(
+        target=_render_pages,
+        args=(file_path, page_numbers, settings, bool(cache_path), page_queue, retry_queue, stop_event),
+        daemon=True,
+    )
+    cache = open_ocr_cache(cache_path) if cache_path else None
+    producer.start()
+    first_results = {}
+    cache_keys = {}
+    remaining = len(page_numbers)
+    try:
+        while remaining:
+            item = page_queue.get()
+            if isinstance(item, Exception):
+                raise item
+            page_number, dpi, image, cache_key = item
+            del item
+            if cache_key is not None:
+                cached = get_cached_ocr(cache, cache_key)
+                if cached is not None:
+                    image.close()
+                    remaining -= 1
+                    text, confidence, cached_dpi = cached
+                    yield page_number, text, {'dpi': cached_dpi, 'confidence': confidence, 'cache': 'hit', 'failed': False}
+                    continue
+                cache_keys[page_number] = cache_key
+
+            prepared = prepare_page_image(image, settings)
+            try:
+                text, confidence = recognize_image(prepared)
+                failed = False
+            except Exception as e:
+                print(f'An error occurred during OCR of page {page_number + 1} of {file_path}: {e}')
+                text, confidence, failed = '', None, True
+            finally:
+                if prepared is not image:
+                    prepared.close()
+                image.close()
+                del image, prepared
+
+            needs_retry = (
+                settings['adaptive']
+                and not failed
+                and dpi < settings['dpi']
+                and (confidence is None or confidence < settings['min_confidence'])
+            )
+            if needs_retry:
+                first_results[page_number] = (text, confidence, dpi)
+                retry_queue.put(page_number)
+                continue
+
+            if page_number in first_results:
+                first_text, first_confidence, first_dpi = first_results.pop(page_number)
+                if failed or (first_confidence is not None and (confidence is None or first_confidence > confidence)):
+                    text, confidence, dpi, failed = first_text, first_confidence, first_dpi, False
+            remaining -= 1
+            cache_key = cache_keys.pop(page_number, None)
+            if cache_key is not None and not failed:
+                store_ocr_result(cache, cache_key, text, confidence, dpi)
+            yield page_number, text, {'dpi': dpi, 'confidence': confidence, 'cache': 'miss' if cache_path else None, 'failed': failed}
+    finally:
+        stop_event.set()
+        producer.join()
+        if cache is not None:
+            cache.close()
@@ -3,9 +3,26 @@ import re,sys
 repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 sys.path.append(repo_path)
 
-def cleaning_fn(text) : 
+# Either a word broken across a line with a hyphen, e.g. "recur-\n  rent",
+# which is rejoined, or a run of whitespace, which becomes one space. A
+# single alternation lets one scan of the text do both.
+_CLEANUP_PATTERN = re.compile(r'(?<=\w)-[^\S\n]*\n\s*(?=\w)|\s+')
+# Matches up to the last character, other than a hyphen, that is followed
+# by whitespace. Text before that point can be cleaned without knowing
+# what comes after it.
+_SAFE_SPLIT_PATTERN = re.compile(r'.*[^\s-](?=\s)', re.DOTALL)
+
+def _replace_cleanup_match(match):
+    return '' if match.group().startswith('-') else ' '
+
+def _clean_fragment(text):
+    return _CLEANUP_PATTERN.sub(_replace_cleanup_match, text)
+
+def cleaning_fn(text) :
     """
-    Cleans raw extracted text by performing a series of normalization tasks.
+    Cleans raw extracted text by performing a series of normalization tasks:
+    words hyphenated across a line break are rejoined, runs of whitespace
+    are collapsed to a single space, and the result is stripped.
 
     Args:
         text (str): The raw text extracted from a document.
@@ -13,7 +30,40 @@ def cleaning_fn(text) :
     Returns:
         str: The cleaned and normalized text.
     """
-    text = re.sub(r'\s+' , " " , text)
-    text = text.strip() 
-    cleaned_text = re.sub(r'(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
-    return cleaned_text 
\ No newline at end of file
+    return _clean_fragment(text).strip()
+
+def clean_pages(pages):
+    """
+    Cleans a document page by page, yielding cleaned fragments as soon as
+    they are final.
+
+    Joining the fragments gives exactly `cleaning_fn(''.join(pages))`, but
+    the whole document is never held in memory twice. The end of each page
+    (its last word and trailing whitespace) is carried over to the next one
+    so hyphenation and whitespace runs that span pages are handled.
+
+    Args:
+        pages (Iterable[str]): The raw text of each page, in order.
+
+    Yields:
+        str: Cleaned fragments of the document.
+    """
+    carry = ''
+    at_start = True
+    for page in pages:
+        text = carry + page
+        match = _SAFE_SPLIT_PATTERN.match(text)
+        if match is None:
+            carry = text
+            continue
+        cleaned = _clean_fragment(text[:match.end()])
+        carry = text[match.end():]
+        if at_start:
+            cleaned = cleaned.lstrip()
+            at_start = False
+        yield cleaned
+
+    cleaned = _clean_fragment(carry)
+    cleaned = cleaned.strip() if at_start else cleaned.rstrip()
+    if cleaned:
+        yield cleaned
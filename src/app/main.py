@@ -2,8 +2,8 @@ import streamlit as st
 import sys
 import yaml
 import os
+import time
 from langchain_core.documents import Document
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from streamlit_mic_recorder import mic_recorder
 
 
@@ -12,12 +12,16 @@ if repo_path not in sys.path:
     sys.path.append(repo_path)
 
 from src.rag_core.retriever import create_retriever
-from src.features.generator import create_qa_chain
-from src.llm.model_loader import load_llm
+from src.rag_core.embedding_engine import load_embedding_model
+from src.rag_core.topic_catalog import load_topic_catalog, catalog_from_vector_store
+from src.features.generator import create_qa_chain, stream_qa_answer
+from src.llm.model_loader import load_llm, prefix_cache_stats
+from src.llm.scheduler import create_scheduled_llms
 from src.features.summarizer import create_summarizer_chain
-from src.features.flashcard_generator import create_flashcard_chain
+from src.features.summary_store import load_summary_store, summary_node_key
+from src.features.flashcard_generator import Flashcard, create_flashcard_generator
 from src.features.quiz_engine import grade_user_answer
-from src.memory.tracker import initialize_database, log_mistake, get_weak_topics
+from src.memory.tracker import initialize_database, log_mistake, get_weak_topics, sample_bank_questions
 from src.voice.speech_to_text import load_whisper_model, transcribe_audio
 from src.voice.text_to_speech import convert_text_to_speech
 
@@ -50,61 +54,104 @@ def load_all_components(config_path="config.yaml"):
     with open(config_path, 'r') as f:
         config = yaml.safe_load(f)
 
-    embedding_model = HuggingFaceEmbeddings(
-        model_name=config['rag_core']['embedding']['model_name']
-    )
+    embedding_model = load_embedding_model(config)
     llm = load_llm(config)
-    retriever = create_retriever(config)
-    qa_chain = create_qa_chain(retriever, llm, config)
-    summarizer_chain = create_summarizer_chain(llm=llm, config=config)
-    flashcard_chain = create_flashcard_chain(llm=llm)
+    # Chat runs ahead of summaries and flashcards on the shared model.
+    chat_llm, bulk_llm, scheduler = create_scheduled_llms(llm, config)
+    retriever = create_retriever(config, embedding_model)
+    qa_chain = create_qa_chain(retriever, chat_llm, config, embedding_model)
+    summarizer_chain = create_summarizer_chain(llm=bulk_llm, config=config)
+    flashcard_generator = create_flashcard_generator(llm=bulk_llm, config=config, embedding_model=embedding_model)
     initialize_database(config)
     whisper_model = load_whisper_model(config)
 
     return {
         'qa': qa_chain, 
         'summarizer': summarizer_chain, 
+        'summary_store': load_summary_store(config),
         'retriever': retriever, 
-        'flashcard_chain': flashcard_chain, 
+        'flashcard_generator': flashcard_generator, 
         'embedding_model': embedding_model, 
         'config': config, 
-        'whisper_model': whisper_model
+        'whisper_model': whisper_model,
+        'scheduler': scheduler,
+        'llm': llm
     }
 
+@st.cache_data
+def load_catalog(catalog_path, modified_time, _vector_store):
+    """
+    Loads the topic catalog written by build_vector_store.py. The file's
+    modification time is part of the cache key, so reruns reuse the loaded
+    catalog until the next build rewrites it. Without a catalog file the
+    collection metadata is scanned once instead.
+    """
+    catalog = load_topic_catalog(catalog_path)
+    if catalog is None and _vector_store is not None:
+        catalog = catalog_from_vector_store(_vector_store)
+    return catalog or {'courses': {}, 'specializations': [], 'notes_types': [], 'total_chunks': 0}
+
+def format_age(seconds):
+    """Formats a duration as a rough age, e.g. '5 min' or '3 days'."""
+    for unit, length in (('day', 86400), ('hour', 3600), ('min', 60)):
+        if seconds >= length:
+            count = int(seconds // length)
+            return f"{count} {unit}{'s' if count > 1 and unit != 'min' else ''}"
+    return "less than a minute"
+
 def handle_user_query(question_text, voice_enabled):
     """
     Handles the processing of a user's query, whether from text or voice.
+
+    The sources are shown as soon as retrieval finishes and the answer is
+    rendered token by token while the model generates it. Time to first
+    token and tokens per second are shown under the answer.
     """
     if question_text:
         st.session_state.messages.append({"role": "user", "content": question_text})
         with st.chat_message("user"):
             st.markdown(question_text)
 
-        with st.spinner("Thinking..."):
-            try:
-                result = qa_chain.invoke(question_text)
-                answer = result['result']
-                source_documents = result['source_documents']
-
-                st.session_state.messages.append({"role": "assistant", "content": answer})
-                with st.chat_message("assistant"):
-                    st.markdown(answer)
-                    with st.expander("Show Sources"):
-                        for doc in source_documents:
-                            st.markdown(f"**Source:** `{doc.metadata.get('source', 'N/A')}`")
-                            st.markdown(f"**Content:** {doc.page_content}")
-                            st.markdown("---")
-                
-                if voice_enabled:
-                    audio_bytes = convert_text_to_speech(answer)
-                    if audio_bytes:
-                        st.audio(audio_bytes, autoplay=True)
+        try:
+            with st.chat_message("assistant"):
+                events = stream_qa_answer(qa_chain, question_text)
+                with st.spinner("Searching your notes..."):
+                    _, source_documents = next(events)
+                with st.expander("Show Sources"):
+                    for doc in source_documents:
+                        st.markdown(f"**Source:** `{doc.metadata.get('source', 'N/A')}`")
+                        st.markdown(f"**Content:** {doc.page_content}")
+                        st.markdown("---")
 
-            except Exception as e:
-                error_message = f"An error occurred: {e}"
-                st.session_state.messages.append({"role": "assistant", "content": error_message})
-                with st.chat_message("assistant"):
-                    st.error(error_message)
+                metrics = {}
+                def answer_tokens():
+                    for kind, value in events:
+                        if kind == 'token':
+                            yield value
+                        else:
+                            metrics.update(value)
+
+                answer = st.write_stream(answer_tokens())
+                if metrics.get('cached'):
+                    st.caption("Answered from the cache.")
+                elif metrics:
+                    st.caption(f"First token after {metrics['ttft_seconds']:.1f}s, "
+                               f"{metrics['tokens_per_second']:.1f} tokens/s")
+                    print(f"QA request: ttft={metrics['ttft_seconds']:.2f}s, retrieval={metrics['retrieval_seconds']:.2f}s, "
+                          f"{metrics['tokens']} tokens at {metrics['tokens_per_second']:.1f} tokens/s")
+
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+
+            if voice_enabled:
+                audio_bytes = convert_text_to_speech(answer)
+                if audio_bytes:
+                    st.audio(audio_bytes, autoplay=True)
+
+        except Exception as e:
+            error_message = f"An error occurred: {e}"
+            st.session_state.messages.append({"role": "assistant", "content": error_message})
+            with st.chat_message("assistant"):
+                st.error(error_message)
 
 
 st.set_page_config(page_title="AI Study Assistant", layout="wide")
@@ -114,74 +161,135 @@ st.title("AI Study Assistant 🤖")
 components = load_all_components()
 qa_chain = components['qa']
 summarizer_chain = components['summarizer']
+summary_store = components['summary_store']
 retriever = components['retriever']
-flashcard_chain = components['flashcard_chain']
+flashcard_generator = components['flashcard_generator']
 embedding_model = components['embedding_model']
 config = components['config']
 whisper_model = components['whisper_model']
+scheduler = components['scheduler']
+llm = components['llm']
 
 
 with st.sidebar:
     st.header("Settings & Tools")
     voice_enabled = st.toggle("Enable Voice Responses")
+    if getattr(embedding_model, 'cache', None) is not None:
+        cache_stats = embedding_model.cache.stats()
+        st.caption(f"Embedding cache hit rate: {cache_stats['hit_rate']:.0%} "
+                   f"({cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, {cache_stats['misses']} misses)")
+    if getattr(qa_chain, 'cache', None) is not None:
+        answer_stats = qa_chain.cache.stats()
+        st.caption(f"Answer cache hit rate: {answer_stats['hit_rate']:.0%} "
+                   f"({answer_stats['exact_hits']} exact, {answer_stats['semantic_hits']} similar, "
+                   f"{answer_stats['misses']} misses, {answer_stats['invalidations']} invalidated)")
+    if scheduler is not None:
+        scheduler_stats = scheduler.stats()
+        st.caption(f"LLM queue: {scheduler_stats['queue_depth']} waiting, "
+                   f"wait p50 {scheduler_stats['wait_p50_ms']:.0f} ms / p95 {scheduler_stats['wait_p95_ms']:.0f} ms, "
+                   f"batch size {scheduler_stats['average_batch_size']:.1f}, {scheduler_stats['rejected']} rejected")
+    prefix_stats = prefix_cache_stats(llm)
+    if prefix_stats is not None:
+        st.caption("Prompt prefix cache: " + ", ".join(
+            f"{name} {chain['hits']}/{chain['hits'] + chain['misses']} hits"
+            for name, chain in prefix_stats['chains'].items()) + f" ({prefix_stats['bytes'] / 2**20:.0f} MB)")
     st.divider()
     
     st.header('Study Tools')
-    if retriever:
-        vector_store = retriever.vectorstore
-        all_docs = vector_store.get()
-        all_metadata = all_docs.get('metadatas', [])
-        list_of_topics = sorted(list(set(meta.get('course', None) for meta in all_metadata if meta)))
-    else:
-        list_of_topics = []
+    catalog_path = config['rag_core']['database']['topic_catalog_path']
+    catalog_time = os.path.getmtime(catalog_path) if os.path.exists(catalog_path) else None
+    catalog = load_catalog(catalog_path, catalog_time, retriever.vectorstore if retriever else None)
+    list_of_topics = list(catalog['courses'])
 
-    topic = st.selectbox("Select a topic for study tools", list_of_topics)
+    topic = st.selectbox(
+        "Select a topic for study tools",
+        list_of_topics,
+        format_func=lambda course: f"{course} ({catalog['courses'][course]['chunks']} chunks)",
+    )
+    notes_type = st.selectbox(
+        "Notes type to summarize",
+        ['All'] + sorted(catalog['courses'][topic]['notes_types']) if topic else ['All'],
+    )
+    summary_filter = {'course': topic} if notes_type == 'All' else {'$and': [{'course': topic}, {'notes_type': notes_type}]}
 
     if st.button('Generate Summary'):
-        if topic:
-            with st.spinner(f"Summarizing {topic}..."):
-                try:
-                    docs_for_topic = retriever.vectorstore.get(where={'course': topic})
-                    documents_to_summarize = [
-                        Document(page_content=text, metadata=meta)
-                        for text, meta in zip(docs_for_topic['documents'], docs_for_topic['metadatas'])
-                    ]
-                    if documents_to_summarize:
-                        summary_result = summarizer_chain.invoke(documents_to_summarize)
-                        st.subheader(f"Summary for {topic}")
-                        st.write(summary_result['output_text'])
-                    else:
-                        st.warning(f"No documents found for the topic: {topic}")
-                except Exception as e:
-                    st.error(f"An error occurred during summarization: {e}")
+        stored_summary = None
+        if topic and summary_store is not None:
+            stored_summary = summary_store.get(summary_node_key(topic, None if notes_type == 'All' else notes_type))
+        if stored_summary is not None:
+            st.subheader(f"Summary for {topic}" + ("" if notes_type == 'All' else f" ({notes_type})"))
+            st.write(stored_summary['text'])
+            current_ids = set(retriever.vectorstore.get(where=summary_filter, include=[])['ids'])
+            changed = len(current_ids.symmetric_difference(stored_summary['chunk_ids']))
+            freshness = f"Precomputed {format_age(time.time() - stored_summary['updated_at'])} ago"
+            st.caption(f"{freshness}; {changed} chunks changed since, run build_summaries.py to refresh."
+                       if changed else f"{freshness}; up to date with your notes.")
+        elif topic:
+            try:
+                docs_for_topic = retriever.vectorstore.get(where=summary_filter)
+                documents_to_summarize = sorted(
+                    (Document(page_content=text, metadata=meta)
+                     for text, meta in zip(docs_for_topic['documents'], docs_for_topic['metadatas'])),
+                    key=lambda document: document.metadata.get('source', ''),
+                )
+                if documents_to_summarize:
+                    st.subheader(f"Summary for {topic}")
+                    progress = st.progress(0.0, text="Extracting key points...")
+                    key_points_box = st.expander("Key points", expanded=False)
+
+                    def summary_tokens():
+                        for kind, value in summarizer_chain.stream(documents_to_summarize):
+                            if kind == 'key_points':
+                                progress.progress(value['done'] / value['total'],
+                                                  text=f"Key points from {value['done']}/{value['total']} chunks")
+                                key_points_box.markdown(value['text'])
+                            elif kind == 'collapse':
+                                progress.progress(1.0, text=f"Condensing key points (round {value['level']}, {value['groups']} groups)...")
+                            elif kind == 'token':
+                                yield value
+                            elif kind == 'metrics':
+                                progress.empty()
+                                st.caption(f"{value['chunks']} chunks ({value['cached_chunks']} cached), "
+                                           f"{value['total_seconds']:.0f}s")
+
+                    st.write_stream(summary_tokens())
+                else:
+                    st.warning(f"No documents found for the topic: {topic}")
+            except Exception as e:
+                st.error(f"An error occurred during summarization: {e}")
 
     if st.button('Generate Flashcards'):
         if topic:
-            with st.spinner(f'Generating Flashcards on {topic}...'):
-                try:
-                    docs_for_topic = retriever.vectorstore.get(where={'course': topic})
-                    list_of_texts = docs_for_topic.get('documents', [])
-                    if list_of_texts:
-                        combined_context = '\n\n'.join(list_of_texts)
-                        flashcard_result = flashcard_chain.invoke({"context": combined_context})
-                        st.subheader(f"Flashcards for {topic}")
-                        for flashcard in flashcard_result.flashcards:
+            try:
+                docs_for_topic = retriever.vectorstore.get(where={'course': topic}, include=['documents', 'embeddings'])
+                list_of_texts = docs_for_topic.get('documents', [])
+                if list_of_texts:
+                    st.subheader(f"Flashcards for {topic}")
+                    with st.spinner(f'Generating Flashcards on {topic}...'):
+                        for flashcard in flashcard_generator.stream(list_of_texts, docs_for_topic.get('embeddings')):
                             with st.expander(flashcard.question):
                                 st.write(flashcard.answer)
-                    else:
-                        st.warning("No text content found for this topic.")
-                except Exception as e:
-                    st.error(f"An error occurred during flashcard generation: {e}")
+                else:
+                    st.warning("No text content found for this topic.")
+            except Exception as e:
+                st.error(f"An error occurred during flashcard generation: {e}")
     
     if st.button('Start Quiz'):
         if topic:
-            with st.spinner(f'Generating Quiz on {topic}...'):
+            bank_questions = sample_bank_questions(topic, config['features']['quiz'].get('num_questions', 10), config)
+            if bank_questions:
+                st.session_state.quiz_questions = [Flashcard(question=question, answer=answer) for question, answer in bank_questions]
+                st.session_state.current_question_index = 0
+                st.session_state.score = 0
+                st.session_state.quiz_in_progress = True
+                st.session_state.quiz_topic = topic
+                st.rerun()
+            with st.spinner(f'Generating Quiz on {topic}... (run build_question_bank.py to start quizzes instantly)'):
                 try:
-                    docs_for_topic = retriever.vectorstore.get(where={'course': topic})
+                    docs_for_topic = retriever.vectorstore.get(where={'course': topic}, include=['documents', 'embeddings'])
                     list_of_texts = docs_for_topic.get('documents', [])
                     if list_of_texts:
-                        combined_context = '\n\n'.join(list_of_texts)
-                        generated_flashcards = flashcard_chain.invoke({"context": combined_context})
+                        generated_flashcards = flashcard_generator.invoke(list_of_texts, docs_for_topic.get('embeddings'))
                         
                         st.session_state.quiz_questions = generated_flashcards.flashcards
                         st.session_state.current_question_index = 0
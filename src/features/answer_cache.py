@@ -0,0 +1,169 @@
+import sys
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+_NORMALIZE_PATTERN = re.compile(r'[^\w]+')
+
+def normalize_question(question):
+    """
+    Builds the exact-match key of a question: lowercase words separated by
+    single spaces, without punctuation.
+    """
+    return _NORMALIZE_PATTERN.sub(' ', question.lower()).strip()
+
+class AnswerCache:
+    """
+    An in-memory cache of QA answers, matched exactly or semantically.
+
+    A question is first looked up by its normalized text, then by the
+    cosine similarity of its embedding to the cached questions. Entries
+    expire after `ttl_seconds`, the least recently used entry is evicted
+    beyond `max_entries`, and an entry is dropped on lookup when any of its
+    source chunks no longer exists in the vector store. Chunk IDs are
+    derived from chunk content, so an edited chunk counts as removed.
+    """
+
+    def __init__(self, embedding_model, vector_store=None, similarity_threshold=0.95, ttl_seconds=86400, max_entries=1000):
+        self.embedding_model = embedding_model
+        self.vector_store = vector_store
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    def _embed(self, question):
+        vector = np.asarray(self.embedding_model.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _is_valid(self, entry):
+        """Checks the entry's age and that its source chunks still exist."""
+        if time.time() - entry['created'] > self.ttl_seconds:
+            return False
+        if self.vector_store is None or not entry['chunk_ids']:
+            return True
+        stored = self.vector_store.get(ids=entry['chunk_ids'], include=[])
+        return len(stored['ids']) == len(entry['chunk_ids'])
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        self.metrics['invalidations'] += 1
+
+    def lookup(self, question):
+        """
+        Finds a cached answer for the question.
+
+        Args:
+            question (str): The question.
+
+        Returns:
+            tuple[dict | None, numpy.ndarray | None]: The cached result (the
+            QA chain output) or None, and the question embedding if one was
+            computed, so `store` does not compute it again.
+        """
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            if self._is_valid(entry):
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.metrics['exact_hits'] += 1
+                return entry['result'], None
+            with self._lock:
+                self._drop(key)
+
+        vector = self._embed(question)
+        while True:
+            with self._lock:
+                if not self._entries:
+                    break
+                keys = list(self._entries)
+                similarities = np.stack([self._entries[k]['vector'] for k in keys]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] < self.similarity_threshold:
+                    break
+                best_key = keys[best]
+                entry = self._entries[best_key]
+            if self._is_valid(entry):
+                with self._lock:
+                    if best_key in self._entries:
+                        self._entries.move_to_end(best_key)
+                    self.metrics['semantic_hits'] += 1
+                return entry['result'], vector
+            with self._lock:
+                self._drop(best_key)
+
+        with self._lock:
+            self.metrics['misses'] += 1
+        return None, vector
+
+    def store(self, question, result, vector=None):
+        """
+        Caches the answer to a question.
+
+        Args:
+            question (str): The question.
+            result (dict): The QA chain output, with 'source_documents'.
+            vector (numpy.ndarray, optional): The question embedding
+                returned by `lookup`.
+        """
+        if vector is None:
+            vector = self._embed(question)
+        chunk_ids = [
+            document.metadata['chunk_id']
+            for document in result.get('source_documents', [])
+            if document.metadata.get('chunk_id')
+        ]
+        entry = {'result': result, 'vector': vector, 'chunk_ids': chunk_ids, 'created': time.time()}
+        with self._lock:
+            key = normalize_question(question)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+
+    def stats(self):
+        """
+        Returns the cache metrics.
+
+        Returns:
+            dict: The hit, miss, invalidation and eviction counts, the number
+            of 'entries' and the 'hit_rate' (0-1).
+        """
+        with self._lock:
+            stats = dict(self.metrics, entries=len(self._entries))
+        hits = stats['exact_hits'] + stats['semantic_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = hits / lookups if lookups else 0.0
+        return stats
+
+class CachedQAChain:
+    """
+    Puts an `AnswerCache` in front of a QA chain. `invoke` returns the
+    chain's output, with 'cached' set to True when it came from the cache.
+    """
+
+    def __init__(self, qa_chain, cache):
+        self.qa_chain = qa_chain
+        self.cache = cache
+        self.retriever = getattr(qa_chain, 'retriever', None)
+
+    def invoke(self, question):
+        result, vector = self.cache.lookup(question)
+        if result is not None:
+            return dict(result, cached=True)
+        result = self.qa_chain.invoke(question)
+        self.cache.store(question, result, vector)
+        return dict(result, cached=False)
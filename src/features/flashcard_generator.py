@@ -4,10 +4,19 @@ repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 if repo_path not in sys.path:
     sys.path.append(repo_path)
 
+import re
+import json
+import math
+import numpy as np
 from langchain.prompts import PromptTemplate
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.pydantic_v1 import BaseModel, Field
-from typing import List
+from langchain_core.output_parsers.transform import BaseTransformOutputParser
+from langchain_core.pydantic_v1 import BaseModel, Field, ValidationError
+from typing import Any, List
+
+from src.llm.model_loader import register_prompt_prefix, token_counter
+from src.rag_core.local_store import train_kmeans
 
 class Flashcard(BaseModel):
     """A single flashcard with a question and an answer."""
@@ -42,13 +51,148 @@ Context:
     )
     return prompt_template
 
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+def _load_flashcard(candidate):
+    """
+    Parses one JSON object as a flashcard, tolerating trailing commas.
+    Returns None when it is not a valid card.
+    """
+    for text in (candidate, _TRAILING_COMMA.sub(r'\1', candidate)):
+        try:
+            card = json.loads(text)
+        except ValueError:
+            continue
+        if isinstance(card, dict) and isinstance(card.get('question'), str) and isinstance(card.get('answer'), str):
+            return Flashcard(question=card['question'].strip(), answer=card['answer'].strip())
+        return None
+    return None
+
+class FlashcardScanner:
+    """
+    Finds flashcards in model output incrementally.
+
+    The scanner tracks JSON strings and braces as text is fed to it, and
+    every object that closes is parsed on its own, so each card is
+    available as soon as its closing brace arrives and a malformed card,
+    or output cut off in the middle, only loses the cards it touches.
+
+    Only the text from the earliest object that may still become a card
+    is kept: once a card is found, the objects around it (such as the
+    `{"flashcards": [...]}` wrapper) are no longer parsed, so the buffer
+    stays about one card long however long the generation runs.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.position = 0
+        self.in_string = False
+        self.escape = False
+        self.starts = []
+
+    def feed(self, text):
+        """
+        Adds model output and returns the flashcards completed by it.
+
+        Args:
+            text (str): The next piece of output.
+
+        Returns:
+            list[Flashcard]: The cards whose objects closed in this piece.
+        """
+        self.text += text
+        cards = []
+        for position in range(self.position, len(self.text)):
+            char = self.text[position]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.starts.append(position)
+            elif char == '}' and self.starts:
+                start = self.starts.pop()
+                if start is None:
+                    continue
+                card = _load_flashcard(self.text[start:position + 1])
+                if card is not None:
+                    cards.append(card)
+                    self.starts = [None] * len(self.starts)
+
+        # Drop the text no open object can still need.
+        keep = next((start for start in self.starts if start is not None), len(self.text))
+        self.text = self.text[keep:]
+        self.starts = [None if start is None else start - keep for start in self.starts]
+        self.position = len(self.text)
+        return cards
+
+def recover_flashcards(text):
+    """
+    Returns every complete flashcard in a model output, even when the
+    output is truncated or partly malformed. When an unbalanced quote
+    derails the scanner, flat objects are parsed one by one instead.
+    """
+    cards = FlashcardScanner().feed(text)
+    if not cards:
+        cards = _recover_flat_flashcards(text)
+    return cards
+
+def _recover_flat_flashcards(text):
+    """Parses every flat `{...}` object in `text` that is a valid flashcard."""
+    return [card for card in map(_load_flashcard, re.findall(r'\{[^{}]*\}', text)) if card is not None]
+
+class FlashcardOutputParser(BaseTransformOutputParser[Any]):
+    """
+    Parses the flashcard chain's output.
+
+    `invoke` returns a `Flashcards` object with every complete card that
+    can be recovered, and only fails when there is none. `stream` yields
+    each `Flashcard` as soon as its JSON object closes, while the model is
+    still generating; if none closes cleanly, the cards recovered from the
+    full output are yielded at the end.
+    """
+
+    def parse(self, text):
+        cards = recover_flashcards(text)
+        if not cards:
+            raise OutputParserException(f"No flashcards found in the model output: {text[:200]!r}")
+        return Flashcards(flashcards=cards)
+
+    def _transform(self, input):
+        scanner = FlashcardScanner()
+        pieces = []
+        found = False
+        for chunk in input:
+            text = chunk if isinstance(chunk, str) else chunk.content
+            pieces.append(text)
+            for card in scanner.feed(text):
+                found = True
+                yield card
+        if not found:
+            # The scanner was derailed (e.g. by an unbalanced quote): fall back like `recover_flashcards`.
+            yield from _recover_flat_flashcards(''.join(pieces))
+
+    def get_format_instructions(self):
+        return JsonOutputParser(pydantic_object=Flashcards).get_format_instructions()
+
+    @property
+    def _type(self):
+        return "flashcards"
+
 def create_flashcard_chain(llm):
     """
     Builds and returns a chain that generates flashcards from a given context.
 
     The chain takes a block of text (context), formats it with a specialized
-    prompt, sends it to the language model, and then uses a JsonOutputParser
-    to convert the LLM's string output into a structured Python object.
+    prompt, sends it to the language model, and then uses a
+    `FlashcardOutputParser` to convert the LLM's string output into
+    flashcards, keeping every complete card of a truncated or partly
+    malformed output. Streaming the chain yields the cards one by one.
 
     Args:
         llm (langchain_core.language_models.base.BaseLanguageModel): The
@@ -59,12 +203,211 @@ def create_flashcard_chain(llm):
         invoked with a context, returns a Pydantic 'Flashcards' object.
     """
 
-    parser = JsonOutputParser(pydantic_object=Flashcards)
-    
+    parser = FlashcardOutputParser()
 
     prompt = get_flashcard_prompt()
+    register_prompt_prefix(llm, 'flashcards', prompt)
 
     flashcard_chain = prompt | llm | parser
     
     return flashcard_chain
 
+
+def shard_texts(texts, count_tokens, token_budget, vectors=None):
+    """
+    Splits chunk texts into shards of at most `token_budget` tokens each.
+
+    With the chunks' embedding vectors, the chunks are first clustered
+    with k-means (about one cluster per shard) and shards are packed
+    cluster by cluster, so each shard covers one subtopic. Otherwise they
+    are packed in the given order. A chunk larger than the budget gets a
+    shard of its own.
+
+    Args:
+        texts (list[str]): The chunk texts.
+        count_tokens (callable): Returns the number of tokens of a text.
+        token_budget (int): The maximum number of tokens per shard.
+        vectors (numpy.ndarray, optional): The chunk embeddings, one row
+            per text.
+
+    Returns:
+        list[list[int]]: The indices of the texts in every shard.
+    """
+    tokens = [count_tokens(text) for text in texts]
+    clusters = [list(range(len(texts)))]
+    n_clusters = min(len(texts), math.ceil(sum(tokens) / token_budget))
+    if vectors is not None and n_clusters > 1:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        centroids = train_kmeans(vectors, n_clusters)
+        labels = np.argmin(np.einsum('ij,ij->i', centroids, centroids) - 2.0 * vectors @ centroids.T, axis=1)
+        clusters = [list(np.flatnonzero(labels == label)) for label in np.unique(labels)]
+
+    shards = []
+    for cluster in clusters:
+        shard, shard_tokens = [], 0
+        for index in cluster:
+            if shard and shard_tokens + tokens[index] > token_budget:
+                shards.append(shard)
+                shard, shard_tokens = [], 0
+            shard.append(int(index))
+            shard_tokens += tokens[index]
+        if shard:
+            shards.append(shard)
+    return shards
+
+def parse_flashcards(output):
+    """
+    Returns the valid flashcards of a parsed model output, which may be the
+    expected {'flashcards': [...]} object or a bare list of cards.
+    """
+    if isinstance(output, Flashcards):
+        return output.flashcards
+    cards = output.get('flashcards', []) if isinstance(output, dict) else output
+    flashcards = []
+    for card in cards if isinstance(cards, list) else []:
+        try:
+            flashcards.append(Flashcard(**card))
+        except (TypeError, ValidationError):
+            continue
+    return flashcards
+
+def deduplicate_flashcards(flashcards, embedding_model, threshold):
+    """
+    Drops flashcards whose question is a near duplicate (cosine similarity
+    of the question embeddings of at least `threshold`) of an earlier one.
+    """
+    if embedding_model is None or len(flashcards) < 2:
+        return flashcards
+    vectors = np.asarray(embedding_model.embed_documents([card.question for card in flashcards]), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    kept = []
+    for index in range(len(flashcards)):
+        if not kept or np.max(vectors[kept] @ vectors[index]) < threshold:
+            kept.append(index)
+    return [flashcards[index] for index in kept]
+
+class FlashcardGenerator:
+    """
+    Generates flashcards for a whole topic within the model's context.
+
+    The topic's chunks are split into shards of at most `token_budget`
+    tokens (see `shard_texts`), cards are generated for all shards with
+    the flashcard chain, `batch_size` shards per LLM call so they run as a
+    batch, and the cards are merged into one `Flashcards` object after
+    dropping near-duplicate questions. A shard whose output cannot be
+    parsed only loses its own cards.
+    """
+
+    def __init__(self, flashcard_chain, count_tokens, embedding_model=None, token_budget=2000,
+                 batch_size=8, dedupe_threshold=0.9, cluster_shards=True):
+        self.flashcard_chain = flashcard_chain
+        self.count_tokens = count_tokens
+        self.embedding_model = embedding_model
+        self.token_budget = token_budget
+        self.batch_size = batch_size
+        self.dedupe_threshold = dedupe_threshold
+        self.cluster_shards = cluster_shards
+        self.last_error = None
+
+    def shard_contexts(self, texts, vectors=None):
+        """Returns the context of every shard of the chunk texts."""
+        shards = shard_texts(texts, self.count_tokens, self.token_budget, vectors if self.cluster_shards else None)
+        return ['\n\n'.join(texts[index] for index in shard) for shard in shards]
+
+    def invoke(self, texts, vectors=None):
+        """
+        Generates the flashcards of a topic.
+
+        Args:
+            texts (list[str]): The chunk texts of the topic.
+            vectors (numpy.ndarray, optional): Their embeddings, used to
+                shard by subtopic.
+
+        Returns:
+            Flashcards: The merged, deduplicated flashcards.
+        """
+        contexts = self.shard_contexts(texts, vectors)
+        shard_cards = self.generate(contexts)
+        if contexts and all(cards is None for cards in shard_cards):
+            raise self.last_error
+        flashcards = [card for cards in shard_cards if cards is not None for card in cards]
+        return Flashcards(flashcards=deduplicate_flashcards(flashcards, self.embedding_model, self.dedupe_threshold))
+
+    def stream(self, texts, vectors=None):
+        """
+        Generates the flashcards of a topic shard by shard, yielding every
+        new card as soon as the model finishes it. Near-duplicate questions
+        are dropped along the way.
+
+        Args:
+            texts (list[str]): The chunk texts of the topic.
+            vectors (numpy.ndarray, optional): Their embeddings, used to
+                shard by subtopic.
+
+        Yields:
+            Flashcard: The cards, in the order they are generated.
+        """
+        kept_vectors = []
+        for context in self.shard_contexts(texts, vectors):
+            for card in self.flashcard_chain.stream({"context": context}):
+                if self.embedding_model is not None:
+                    vector = np.asarray(self.embedding_model.embed_query(card.question), dtype=np.float32)
+                    vector /= max(np.linalg.norm(vector), 1e-12)
+                    if kept_vectors and np.max(np.stack(kept_vectors) @ vector) >= self.dedupe_threshold:
+                        continue
+                    kept_vectors.append(vector)
+                yield card
+
+    def generate(self, contexts):
+        """
+        Generates cards for several shard contexts, `batch_size` per LLM call.
+
+        Returns:
+            list[list[Flashcard] | None]: The valid cards of every shard, or
+            None for a shard whose generation or parsing failed (the error
+            is kept in `last_error`).
+        """
+        outputs = self.flashcard_chain.batch(
+            [{"context": context} for context in contexts],
+            config={'max_concurrency': self.batch_size},
+            return_exceptions=True,
+        )
+        shard_cards = []
+        for output in outputs:
+            if isinstance(output, Exception):
+                self.last_error = output
+                shard_cards.append(None)
+            else:
+                shard_cards.append(parse_flashcards(output))
+        return shard_cards
+
+def create_flashcard_generator(llm, config, embedding_model=None):
+    """
+    Builds the sharded flashcard generator over the flashcard chain.
+
+    Its settings come from the optional 'features.flashcards' section:
+    'shard_token_budget' (chunk tokens per shard; keep it well below the
+    model's context size minus 'max_new_tokens'), 'batch_size',
+    'dedupe_threshold' and 'cluster_shards'.
+
+    Args:
+        llm (langchain_core.language_models.base.BaseLanguageModel): The
+            initialized language model object.
+        config (dict): The project's configuration dictionary.
+        embedding_model (langchain_core.embeddings.Embeddings, optional):
+            The model used to find near-duplicate questions.
+
+    Returns:
+        FlashcardGenerator: The generator.
+    """
+    flashcard_config = config.get('features', {}).get('flashcards', {})
+    return FlashcardGenerator(
+        create_flashcard_chain(llm),
+        # About four characters per token when the LLM exposes no tokenizer.
+        token_counter(llm) or (lambda text: len(text) // 4),
+        embedding_model=embedding_model,
+        token_budget=flashcard_config.get('shard_token_budget', 2000),
+        batch_size=flashcard_config.get('batch_size', 8),
+        dedupe_threshold=flashcard_config.get('dedupe_threshold', 0.9),
+        cluster_shards=flashcard_config.get('cluster_shards', True),
+    )
@@ -1,11 +1,15 @@
 import sys
+import time
 
 repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 sys.path.append(repo_path)
 
 from langchain.chains import RetrievalQA
 
-def create_qa_chain(retriever , llm, config):
+from src.features.answer_cache import AnswerCache, CachedQAChain
+from src.llm.model_loader import register_prompt_prefix, token_counter
+
+def create_qa_chain(retriever , llm, config, embedding_model=None):
     """
     Builds and returns a complete question-answering (QA) chain using the RAG
     (Retrieval-Augmented Generation) pattern.
@@ -22,6 +26,10 @@ def create_qa_chain(retriever , llm, config):
     5.  Constructs a `RetrievalQA` chain that connects the provided retriever
         and the language model, ready to answer questions based on retrieved
         context.
+    6.  When 'features.answer_cache.enabled' is set and an embedding model
+        is given, puts a semantic answer cache in front of the chain, so a
+        question asked before (exactly, or within the configured cosine
+        similarity) is answered without running the LLM again.
 
     Args:
         retriever (langchain_core.vectorstores.VectorStoreRetriever): An
@@ -30,11 +38,14 @@ def create_qa_chain(retriever , llm, config):
         config (dict): The project's configuration dictionary, which must
                      contain the Hugging Face model name for the generator
                      LLM under the 'rag_core.generator.llm_name' key.
+        embedding_model (langchain_core.embeddings.Embeddings, optional):
+            The model used to match questions semantically in the cache.
 
     Returns:
-        langchain.chains.retrieval_qa.base.RetrievalQA: A fully configured
-        QA chain object. This chain can be invoked with a query to get a
-        generated answer and the source documents used.
+        langchain.chains.retrieval_qa.base.RetrievalQA | CachedQAChain: A
+        fully configured QA chain object, possibly wrapped in the answer
+        cache. It can be invoked with a query to get a generated answer and
+        the source documents used.
     """
 
 
@@ -44,5 +55,97 @@ def create_qa_chain(retriever , llm, config):
         chain_type='stuff',
         return_source_documents=True
     )
-    
+    register_prompt_prefix(llm, 'qa', qa_chain.combine_documents_chain.llm_chain.prompt)
+
+    cache_config = config.get('features', {}).get('answer_cache', {})
+    if cache_config.get('enabled', False) and embedding_model is not None:
+        cache = AnswerCache(
+            embedding_model,
+            vector_store=getattr(retriever, 'vectorstore', None),
+            similarity_threshold=cache_config.get('similarity_threshold', 0.95),
+            ttl_seconds=cache_config.get('ttl_seconds', 86400),
+            max_entries=cache_config.get('max_entries', 1000),
+        )
+        return CachedQAChain(qa_chain, cache)
+
     return qa_chain
+
+def count_tokens(llm, pieces):
+    """
+    Counts the tokens of a streamed answer with the LLM's own tokenizer
+    when it has one, otherwise as the number of streamed pieces (streaming
+    backends emit about one piece per token).
+    """
+    counter = token_counter(llm)
+    return counter(''.join(pieces)) if counter is not None else len(pieces)
+
+def stream_qa_answer(qa_chain, question):
+    """
+    Answers a question like the QA chain, but streams the answer.
+
+    Retrieval runs first and its documents are yielded before generation
+    starts, so the sources can be shown while the model is still working.
+    The prompt is built exactly as the chain's 'stuff' step would build it
+    and the answer is streamed from the chain's LLM. When the chain sits
+    behind an answer cache, a cached answer is returned at once and a new
+    answer is cached once it is complete.
+
+    Args:
+        qa_chain (RetrievalQA | CachedQAChain): The chain returned by
+            `create_qa_chain`.
+        question (str): The user's question.
+
+    Yields:
+        tuple[str, object]: ('sources', documents) first, then ('token',
+        text) for every piece of the answer, and finally ('metrics', dict)
+        with 'cached', 'retrieval_seconds', 'ttft_seconds' (time to first
+        token, from the start of the request), 'tokens',
+        'tokens_per_second' and 'total_seconds'.
+    """
+    start = time.perf_counter()
+    cache = getattr(qa_chain, 'cache', None)
+    vector = None
+    if cache is not None:
+        cached, vector = cache.lookup(question)
+        if cached is not None:
+            yield 'sources', cached['source_documents']
+            yield 'token', cached['result']
+            elapsed = time.perf_counter() - start
+            yield 'metrics', {
+                'cached': True, 'retrieval_seconds': 0.0, 'ttft_seconds': elapsed,
+                'tokens': 0, 'tokens_per_second': 0.0, 'total_seconds': elapsed,
+            }
+            return
+        qa_chain = qa_chain.qa_chain
+
+    documents = qa_chain.retriever.invoke(question)
+    retrieval_seconds = time.perf_counter() - start
+    yield 'sources', documents
+
+    combine_chain = qa_chain.combine_documents_chain
+    llm_chain = combine_chain.llm_chain
+    context = combine_chain.document_separator.join(document.page_content for document in documents)
+    prompt = llm_chain.prompt.format(**{combine_chain.document_variable_name: context, 'question': question})
+
+    pieces = []
+    first_token_time = None
+    for text in llm_chain.llm.stream(prompt):
+        if first_token_time is None:
+            first_token_time = time.perf_counter()
+        pieces.append(text)
+        yield 'token', text
+    end = time.perf_counter()
+
+    answer = ''.join(pieces)
+    tokens = count_tokens(llm_chain.llm, pieces) if answer else 0
+    generation_seconds = end - (first_token_time or end)
+    if cache is not None:
+        cache.store(question, {'query': question, 'result': answer, 'source_documents': documents}, vector)
+    yield 'metrics', {
+        'cached': False,
+        'retrieval_seconds': retrieval_seconds,
+        'ttft_seconds': (first_token_time or end) - start,
+        'tokens': tokens,
+        'tokens_per_second': (tokens - 1) / generation_seconds if tokens > 1 and generation_seconds > 0 else 0.0,
+        'total_seconds': end - start,
+    }
@@ -0,0 +1,98 @@
+import sys
+import hashlib
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+from src.features.flashcard_generator import deduplicate_flashcards, shard_texts
+from src.memory.tracker import (
+    delete_bank_shards, get_bank_shards, get_bank_topics, store_bank_questions,
+)
+
+def question_bank_shards(vector_store, count_tokens, token_budget):
+    """
+    Splits every course of the collection into the shards the question bank
+    is generated from.
+
+    Shards never span source files, and a shard's key is derived from its
+    chunk IDs, so editing a file only changes the keys of that file's
+    shards.
+
+    Args:
+        vector_store (langchain_chroma.Chroma): The vector store.
+        count_tokens (callable): Returns the number of tokens of a text.
+        token_budget (int): The maximum number of tokens per shard.
+
+    Returns:
+        dict[str, list[dict]]: For every course, its shards with 'key',
+        'chunk_ids' and 'context'.
+    """
+    data = vector_store.get(include=['documents', 'metadatas'])
+    courses = {}
+    for chunk_id, text, metadata in zip(data['ids'], data['documents'], data['metadatas']):
+        if metadata.get('course'):
+            sources = courses.setdefault(metadata['course'], {})
+            sources.setdefault(metadata.get('source', ''), []).append((chunk_id, text))
+
+    shards = {}
+    for course, sources in courses.items():
+        for _, chunks in sorted(sources.items()):
+            for shard in shard_texts([text for _, text in chunks], count_tokens, token_budget):
+                chunk_ids = [chunks[index][0] for index in shard]
+                shards.setdefault(course, []).append({
+                    'key': hashlib.sha256('\0'.join(sorted(chunk_ids)).encode('utf-8')).hexdigest(),
+                    'chunk_ids': chunk_ids,
+                    'context': '\n\n'.join(chunks[index][1] for index in shard),
+                })
+    return shards
+
+def refresh_question_bank(flashcard_generator, vector_store, config):
+    """
+    Brings the question bank up to date with the vector store.
+
+    Questions are only generated for shards that are not in the bank yet,
+    i.e. new shards or shards whose chunks changed; the questions of shards
+    that no longer exist (including whole courses) are deleted. Each batch
+    of shards is stored as soon as it is generated, so an interrupted run
+    keeps its progress, and shards whose output could not be parsed are
+    retried on the next run.
+
+    Args:
+        flashcard_generator (src.features.flashcard_generator.FlashcardGenerator):
+            The generator returned by `create_flashcard_generator`.
+        vector_store (langchain_chroma.Chroma): The vector store.
+        config (dict): The project's configuration dictionary.
+
+    Returns:
+        dict: The numbers of shards 'generated', 'kept', 'failed' and
+        'removed', and of new 'questions'.
+    """
+    stats = {'generated': 0, 'kept': 0, 'failed': 0, 'removed': 0, 'questions': 0}
+    shards_by_course = question_bank_shards(vector_store, flashcard_generator.count_tokens, flashcard_generator.token_budget)
+
+    for course in sorted(get_bank_topics(config) - set(shards_by_course)):
+        stale = get_bank_shards(course, config)
+        delete_bank_shards(course, stale, config)
+        stats['removed'] += len(stale)
+
+    for course, shards in sorted(shards_by_course.items()):
+        stored = get_bank_shards(course, config)
+        pending = [shard for shard in shards if shard['key'] not in stored]
+        stats['kept'] += len(shards) - len(pending)
+        print(f"{course}: {len(pending)} of {len(shards)} shards need questions.")
+
+        for start in range(0, len(pending), flashcard_generator.batch_size):
+            batch = pending[start:start + flashcard_generator.batch_size]
+            for shard, cards in zip(batch, flashcard_generator.generate([shard['context'] for shard in batch])):
+                if cards is None:
+                    stats['failed'] += 1
+                    continue
+                cards = deduplicate_flashcards(cards, flashcard_generator.embedding_model, flashcard_generator.dedupe_threshold)
+                store_bank_questions(course, shard['key'], shard['chunk_ids'], [(card.question, card.answer) for card in cards], config)
+                stats['generated'] += 1
+                stats['questions'] += len(cards)
+
+        stale = stored - {shard['key'] for shard in shards}
+        delete_bank_shards(course, stale, config)
+        stats['removed'] += len(stale)
+    return stats
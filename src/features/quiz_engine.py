@@ -22,8 +22,9 @@ def grade_user_answer(user_answer, correct_answer, embedding_model, config):
     Args:
         user_answer (str): The answer provided by the user.
         correct_answer (str): The ground truth answer for the question.
-        embedding_model (langchain_huggingface.embeddings.HuggingFaceEmbeddings):
-            The initialized embedding model object used to convert text to vectors.
+        embedding_model (langchain_core.embeddings.Embeddings): The
+            initialized embedding model object used to convert text to
+            vectors, normally the shared `EmbeddingEngine`.
         config (dict): The project's configuration dictionary, which must
                      contain the similarity threshold under the key
                      'features.quiz.similarity_threshold'.
@@ -1,11 +1,16 @@
-import sys
+import os, sys
+import time
+import hashlib
+import sqlite3
+import threading
 
 repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 if repo_path not in sys.path:
     sys.path.append(repo_path)
 
 from langchain.prompts import PromptTemplate
-from langchain.chains.summarize import load_summarize_chain
+
+from src.llm.model_loader import register_prompt_prefix, token_counter
 
 def get_summarizer_prompts():
     """
@@ -53,34 +58,269 @@ Comprehensive Final Summary:
     
     return map_prompt_template, combine_prompt_template
 
+def get_collapse_prompt():
+    """
+    Creates and returns the prompt template that condenses a group of key
+    points into fewer key points, used between the map and combine steps
+    when the key points do not fit the combine prompt at once.
+
+    Returns:
+        PromptTemplate: The collapse prompt template.
+    """
+    collapse_prompt_string = """
+You are an expert academic assistant. The following key points were extracted from consecutive sections of a student's notes. Merge them into a single, shorter list of key points: remove repetition, keep every distinct concept, definition, formula and principle.
+
+Key Points:
+"{text}"
+
+Merged Key Points:
+"""
+    return PromptTemplate(
+        template=collapse_prompt_string,
+        input_variables=["text"]
+    )
+
+class MapOutputCache:
+    """
+    A persistent cache of map step outputs in SQLite, keyed by the hash of
+    the chunk text (together with the model and the map prompt), so
+    re-summarizing a course only runs the map step for changed chunks.
+    """
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS map_outputs (key TEXT PRIMARY KEY, output TEXT NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """
+        Looks up the outputs of several chunk keys.
+
+        Returns:
+            dict[str, str]: The cached output of every key that was found.
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT key, output FROM map_outputs WHERE key IN ({placeholders})", batch
+                ).fetchall())
+        return found
+
+    def put_many(self, outputs):
+        """Stores outputs, given as a dict from chunk key to output."""
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO map_outputs (key, output) VALUES (?, ?)", list(outputs.items()))
+            self._conn.commit()
+
+class MapReduceSummarizer:
+    """
+    Summarizes a set of documents with map-reduce, built for large courses.
+
+    - Map: key points are extracted from every chunk, `map_batch_size`
+      chunks per LLM call, so the model (or the inference scheduler)
+      processes them as a batch. Outputs are cached per chunk hash.
+    - Collapse: while the key points exceed `token_budget` tokens, they
+      are grouped into consecutive runs that fit the budget and each
+      group is merged by the LLM (in batches again), at most
+      `max_collapse_levels` times.
+    - Combine: the final summary is generated from the remaining key
+      points and streamed.
+    """
+
+    def __init__(self, llm, map_prompt, collapse_prompt, combine_prompt, map_cache=None, model_key='',
+                 token_budget=2500, map_batch_size=8, max_collapse_levels=4):
+        self.llm = llm
+        self.map_prompt = map_prompt
+        self.collapse_prompt = collapse_prompt
+        self.combine_prompt = combine_prompt
+        self.map_cache = map_cache
+        self.model_key = model_key
+        self.token_budget = token_budget
+        self.map_batch_size = map_batch_size
+        self.max_collapse_levels = max_collapse_levels
+        # About four characters per token when the LLM exposes no tokenizer.
+        self.count_tokens = token_counter(llm) or (lambda text: len(text) // 4)
+
+    def chunk_key(self, text):
+        """Returns the map cache key of a chunk text."""
+        return hashlib.sha256(f'{self.model_key}\0{self.map_prompt.template}\0{text}'.encode('utf-8')).hexdigest()
+
+    def _run_batches(self, prompt, texts):
+        """Formats `prompt` with every text and yields the outputs batch by batch."""
+        for start in range(0, len(texts), self.map_batch_size):
+            batch = texts[start:start + self.map_batch_size]
+            yield start, self.llm.batch([prompt.format(text=text) for text in batch])
+
+    def map_documents(self, documents):
+        """
+        Runs the map step, serving unchanged chunks from the cache.
+
+        Yields:
+            tuple[int, str, bool]: The document index, its key points and
+            whether they came from the cache, cached ones first.
+        """
+        keys = [self.chunk_key(document.page_content) for document in documents]
+        cached = self.map_cache.get_many(keys) if self.map_cache is not None else {}
+        pending = []
+        for index, key in enumerate(keys):
+            if key in cached:
+                yield index, cached[key], True
+            else:
+                pending.append(index)
+
+        texts = [documents[index].page_content for index in pending]
+        for start, outputs in self._run_batches(self.map_prompt, texts):
+            indices = pending[start:start + len(outputs)]
+            if self.map_cache is not None:
+                self.map_cache.put_many({keys[index]: output for index, output in zip(indices, outputs)})
+            for index, output in zip(indices, outputs):
+                yield index, output, False
+
+    def group_by_budget(self, texts):
+        """Splits texts into consecutive groups of at most `token_budget` tokens."""
+        groups, group, group_tokens = [], [], 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if group and group_tokens + tokens > self.token_budget:
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(text)
+            group_tokens += tokens
+        if group:
+            groups.append(group)
+        return groups
+
+    def collapse_rounds(self, texts):
+        """
+        Merges key points group by group until they fit `token_budget`.
+
+        Yields:
+            tuple[int, list[str]]: The level and the key points after
+            every collapse round (nothing when the texts already fit).
+        """
+        levels = 0
+        while texts and self.count_tokens('\n\n'.join(texts)) > self.token_budget and levels < self.max_collapse_levels:
+            groups = ['\n\n'.join(group) for group in self.group_by_budget(texts)]
+            texts = [output for _, outputs in self._run_batches(self.collapse_prompt, groups) for output in outputs]
+            levels += 1
+            yield levels, texts
+
+    def reduce(self, texts):
+        """Returns the key points collapsed to fit `token_budget`, joined."""
+        for _, texts in self.collapse_rounds(texts):
+            pass
+        return '\n\n'.join(texts)
+
+    def combine(self, texts):
+        """Returns the final summary of key points, collapsing them first."""
+        key_points = self.reduce(texts)
+        return self.llm.invoke(self.combine_prompt.format(text=key_points)) if key_points else ''
+
+    def stream(self, documents):
+        """
+        Summarizes documents, streaming progress and the summary.
+
+        Args:
+            documents (list[langchain_core.documents.Document]): The chunks.
+
+        Yields:
+            tuple[str, object]: ('key_points', dict) for every chunk as soon
+            as it is mapped, with 'index', 'source', 'text', 'cached',
+            'done' and 'total'; ('collapse', dict) with the 'level' and the
+            number of 'groups' after every collapse round; ('token', text)
+            for every piece of the final summary; and finally ('metrics',
+            dict) with 'chunks', 'cached_chunks', 'collapse_levels',
+            'map_seconds' and 'total_seconds'.
+        """
+        start = time.perf_counter()
+        key_points = [None] * len(documents)
+        cached_chunks = 0
+        for done, (index, text, cached) in enumerate(self.map_documents(documents), start=1):
+            key_points[index] = text
+            cached_chunks += cached
+            yield 'key_points', {
+                'index': index, 'source': documents[index].metadata.get('source'), 'text': text,
+                'cached': cached, 'done': done, 'total': len(documents),
+            }
+        map_seconds = time.perf_counter() - start
+
+        levels = 0
+        for levels, key_points in self.collapse_rounds(key_points):
+            yield 'collapse', {'level': levels, 'groups': len(key_points)}
+
+        if key_points:
+            for text in self.llm.stream(self.combine_prompt.format(text='\n\n'.join(key_points))):
+                yield 'token', text
+
+        yield 'metrics', {
+            'chunks': len(documents),
+            'cached_chunks': cached_chunks,
+            'collapse_levels': levels,
+            'map_seconds': map_seconds,
+            'total_seconds': time.perf_counter() - start,
+        }
+
+    def invoke(self, documents):
+        """
+        Summarizes documents like the LangChain summarize chain.
+
+        Returns:
+            dict: 'output_text' with the summary and 'intermediate_steps'
+            with the key points of every chunk.
+        """
+        key_points = [None] * len(documents)
+        pieces = []
+        for kind, value in self.stream(documents):
+            if kind == 'key_points':
+                key_points[value['index']] = value['text']
+            elif kind == 'token':
+                pieces.append(value)
+        return {'output_text': ''.join(pieces), 'intermediate_steps': key_points}
+
 def create_summarizer_chain(llm, config):
     """
-    Builds and returns a summarization chain using the map-reduce strategy.
+    Builds and returns the map-reduce summarizer.
 
     This function reuses the provided language model (LLM) and constructs a
-    specialized chain for summarization. It uses custom prompts for both the
-    'map' and 'combine' steps to ensure high-quality, structured summaries.
+    `MapReduceSummarizer` with the custom map, collapse and combine prompts.
+    Its settings come from the optional 'features.summarizer' section:
+    'map_cache_path' (the SQLite map output cache; caching is off without
+    it), 'token_budget', 'map_batch_size' and 'max_collapse_levels'.
 
     Args:
         llm (langchain_core.language_models.base.BaseLanguageModel): The
             initialized language model object (e.g., HuggingFacePipeline)
             that will be used for summarization.
-        config (dict): The project's configuration dictionary. This is included
-                     for potential future use, such as adding specific
-                     summarizer settings.
+        config (dict): The project's configuration dictionary.
 
     Returns:
-        langchain.chains.base.Chain: A fully configured summarization chain
-        object, ready to be invoked with a list of documents.
+        MapReduceSummarizer: The summarizer, ready to be invoked or
+        streamed with a list of documents.
     """
     map_prompt_template, combine_prompt_template = get_summarizer_prompts()
+    collapse_prompt_template = get_collapse_prompt()
+    register_prompt_prefix(llm, 'summary_map', map_prompt_template)
+    register_prompt_prefix(llm, 'summary_collapse', collapse_prompt_template)
+    register_prompt_prefix(llm, 'summary_combine', combine_prompt_template)
 
-    summarization_chain = load_summarize_chain(
+    summarizer_config = config.get('features', {}).get('summarizer', {})
+    generator_config = config.get('rag_core', {}).get('generator', {})
+    map_cache_path = summarizer_config.get('map_cache_path')
+
+    return MapReduceSummarizer(
         llm,
-        chain_type='map_reduce',
-        map_prompt=map_prompt_template,
-        combine_prompt=combine_prompt_template,
-        verbose=True
+        map_prompt_template,
+        collapse_prompt_template,
+        combine_prompt_template,
+        map_cache=MapOutputCache(map_cache_path) if map_cache_path else None,
+        model_key=f"{generator_config.get('backend', 'transformers')}|{generator_config.get('llm_name', '')}",
+        token_budget=summarizer_config.get('token_budget', 2500),
+        map_batch_size=summarizer_config.get('map_batch_size', 8),
+        max_collapse_levels=summarizer_config.get('max_collapse_levels', 4),
     )
-
-    return summarization_chain
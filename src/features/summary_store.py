@@ -0,0 +1,183 @@
+import os, sys
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+from langchain_core.documents import Document
+
+def summary_node_key(course, notes_type=None, source=None):
+    """
+    Returns the key of a node of the summary tree: a course, a notes type
+    within a course, or a source file within a notes type.
+    """
+    return json.dumps([part for part in (course, notes_type, source) if part is not None])
+
+def _fingerprint(parts):
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+class SummaryStore:
+    """
+    The precomputed summary tree, persisted in SQLite.
+
+    Every node (course, notes type or source file) keeps its text, the IDs
+    of the chunks it was built from, and a fingerprint of those chunks and
+    of the summarizer, so a refresh can tell which nodes are still valid.
+    Course and notes type nodes hold final summaries; source nodes hold
+    the key points of their file, from which the summaries are built.
+    """
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                node TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                text TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, node):
+        """
+        Returns a stored node as a dict with 'kind', 'fingerprint',
+        'chunk_ids', 'text' and 'updated_at' (a Unix timestamp), or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, fingerprint, chunk_ids, text, updated_at FROM summaries WHERE node = ?", (node,)
+            ).fetchone()
+        if row is None:
+            return None
+        kind, fingerprint, chunk_ids, text, updated_at = row
+        return {'kind': kind, 'fingerprint': fingerprint, 'chunk_ids': json.loads(chunk_ids), 'text': text, 'updated_at': updated_at}
+
+    def put(self, node, kind, fingerprint, chunk_ids, text):
+        """Stores a node, replacing its previous version."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (node, kind, fingerprint, chunk_ids, text, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (node, kind, fingerprint, json.dumps(sorted(chunk_ids)), text, time.time()),
+            )
+            self._conn.commit()
+
+    def nodes(self):
+        """Returns the keys of all stored nodes."""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT node FROM summaries")}
+
+    def delete(self, nodes):
+        """Deletes nodes by key."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM summaries WHERE node = ?", [(node,) for node in nodes])
+            self._conn.commit()
+
+def _summary_tree(vector_store):
+    """Groups the chunks of the collection by course, notes type and source."""
+    data = vector_store.get(include=['documents', 'metadatas'])
+    tree = {}
+    for chunk_id, text, metadata in zip(data['ids'], data['documents'], data['metadatas']):
+        if not metadata.get('course'):
+            continue
+        sources = tree.setdefault(metadata['course'], {}).setdefault(metadata.get('notes_type', ''), {})
+        sources.setdefault(metadata.get('source', ''), []).append(Document(page_content=text, metadata=dict(metadata, chunk_id=chunk_id)))
+    return tree
+
+def refresh_summaries(summarizer, vector_store, store):
+    """
+    Brings the stored summary tree up to date with the vector store.
+
+    The tree has a node per source file (its key points, reduced to the
+    summarizer's token budget), per notes type of a course and per course
+    (final summaries over the key points of their files). A node is only
+    rebuilt when its fingerprint changed, i.e. when one of its chunks was
+    added, changed or removed, or the model or prompts changed, so editing
+    one file rebuilds that file's node and the summaries above it. Map
+    outputs of unchanged chunks also come from the summarizer's cache.
+    Nodes of courses, notes types and files that no longer exist are
+    deleted.
+
+    Args:
+        summarizer (src.features.summarizer.MapReduceSummarizer): The
+            summarizer returned by `create_summarizer_chain`.
+        vector_store (langchain_chroma.Chroma): The vector store.
+        store (SummaryStore): The summary store to refresh.
+
+    Returns:
+        dict: The numbers of nodes 'rebuilt', 'reused' and 'removed'.
+    """
+    version = _fingerprint([
+        summarizer.model_key, summarizer.map_prompt.template,
+        summarizer.collapse_prompt.template, summarizer.combine_prompt.template,
+    ])
+    stats = {'rebuilt': 0, 'reused': 0, 'removed': 0}
+    live_nodes = set()
+
+    def refresh_node(node, kind, chunk_ids, child_fingerprints, build):
+        fingerprint = _fingerprint([version, *child_fingerprints])
+        live_nodes.add(node)
+        stored = store.get(node)
+        if stored is not None and stored['fingerprint'] == fingerprint:
+            stats['reused'] += 1
+            return fingerprint, stored['text']
+        print(f"Summarizing {kind} {node}...")
+        text = build()
+        store.put(node, kind, fingerprint, chunk_ids, text)
+        stats['rebuilt'] += 1
+        return fingerprint, text
+
+    def source_key_points(documents):
+        key_points = [None] * len(documents)
+        for index, text, _ in summarizer.map_documents(documents):
+            key_points[index] = text
+        return summarizer.reduce(key_points)
+
+    for course, notes_types in sorted(_summary_tree(vector_store).items()):
+        course_fingerprints, course_key_points, course_chunk_ids = [], [], []
+        for notes_type, sources in sorted(notes_types.items()):
+            type_fingerprints, type_key_points, type_chunk_ids = [], [], []
+            for source, documents in sorted(sources.items()):
+                chunk_ids = [document.metadata['chunk_id'] for document in documents]
+                fingerprint, key_points = refresh_node(
+                    summary_node_key(course, notes_type, source), 'source', chunk_ids, sorted(chunk_ids),
+                    lambda: source_key_points(documents),
+                )
+                type_fingerprints.append(fingerprint)
+                type_key_points.append(key_points)
+                type_chunk_ids.extend(chunk_ids)
+
+            fingerprint, _ = refresh_node(
+                summary_node_key(course, notes_type), 'notes_type', type_chunk_ids, type_fingerprints,
+                lambda: summarizer.combine(type_key_points),
+            )
+            course_fingerprints.append(fingerprint)
+            course_key_points.extend(type_key_points)
+            course_chunk_ids.extend(type_chunk_ids)
+
+        refresh_node(
+            summary_node_key(course), 'course', course_chunk_ids, course_fingerprints,
+            lambda: summarizer.combine(course_key_points),
+        )
+
+    removed = store.nodes() - live_nodes
+    store.delete(removed)
+    stats['removed'] = len(removed)
+    return stats
+
+def load_summary_store(config):
+    """
+    Opens the summary store at 'features.summarizer.store_path', or
+    returns None when no path is configured.
+    """
+    store_path = config.get('features', {}).get('summarizer', {}).get('store_path')
+    return SummaryStore(store_path) if store_path else None
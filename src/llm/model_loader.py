@@ -1,38 +1,393 @@
 import sys
+import copy
+import threading
+from typing import Any, Dict, List, Optional
 
 repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 sys.path.append(repo_path)
 
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig, pipeline
 from langchain_huggingface import HuggingFacePipeline
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
 
-def load_llm(config):
-    bnb_config = BitsAndBytesConfig(
-        load_in_4bit=True,
-        bnb_4bit_use_double_quant=True,
-        bnb_4bit_quant_type="nf4",
-        bnb_4bit_compute_dtype=torch.bfloat16,
-    )
+from src.llm.prefix_cache import PrefixKVCache, match_prefix, prefix_key, prompt_prefix
 
-    tokenizer = AutoTokenizer.from_pretrained(config['rag_core']['generator']['llm_name'])
-    model = AutoModelForCausalLM.from_pretrained(
-        config['rag_core']['generator']['llm_name'],
-        quantization_config=bnb_config,
-        device_map="auto",
-        trust_remote_code=True,
-    )
-    model.eval()
+# GGML tensor types accepted by llama.cpp for the key/value cache.
+_GGML_KV_TYPES = {'f32': 0, 'f16': 1, 'q4_0': 2, 'q4_1': 3, 'q5_0': 6, 'q5_1': 7, 'q8_0': 8}
+
+def kv_cache_nbytes(cache):
+    """Returns the memory held by the key/value tensors of a transformers cache."""
+    if hasattr(cache, 'layers'):
+        tensors = [tensor for layer in cache.layers for tensor in (layer.keys, layer.values)]
+    else:
+        tensors = list(cache.key_cache) + list(cache.value_cache)
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors if tensor is not None)
+
+def _event_stopping_criteria(event):
+    """Returns a transformers `StoppingCriteria` that stops every sequence once `event` is set."""
+    import torch
+    from transformers import StoppingCriteria
+
+    class EventStoppingCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+    return EventStoppingCriteria()
+
+class StreamingHuggingFacePipeline(HuggingFacePipeline):
+    """
+    A `HuggingFacePipeline` whose `stream` yields text as the model
+    produces it. Generation runs on a background thread and feeds a
+    `TextIteratorStreamer`, which hands over the decoded text of every new
+    token without the prompt.
+
+    With a `prefix_cache`, single prompts that start with a registered
+    prefix (see `register_prompt_prefix`) resume from the cached key/value
+    state of that prefix instead of processing it again.
+    """
+    prefix_cache: Any = None
+    prompt_prefixes: Dict[str, str] = {}
+
+    def register_prefix(self, name, prefix):
+        self.prompt_prefixes[name] = prefix
+
+    def _prefix_state(self, prompt):
+        """
+        Returns a copy of the key/value state of the prompt's registered
+        prefix, computing and caching it on a miss, or None when no prefix
+        applies. Generation extends the state in place, hence the copy.
+        """
+        match = match_prefix(self.prompt_prefixes, prompt) if self.prefix_cache is not None else None
+        if match is None:
+            return None
+        name, prefix = match
+        tokenizer = self.pipeline.tokenizer
+        # The last prefix token may merge with the text that follows, so it is left to the prompt.
+        prefix_ids = tokenizer(prefix)['input_ids'][:-1]
+        prompt_ids = tokenizer(prompt)['input_ids']
+        if not prefix_ids or prompt_ids[:len(prefix_ids)] != prefix_ids:
+            return None
+
+        key = prefix_key(prefix_ids)
+        state = self.prefix_cache.get(key, name, len(prefix_ids))
+        if state is None:
+            import torch
+            from transformers import DynamicCache
+
+            model = self.pipeline.model
+            with torch.no_grad():
+                output = model(input_ids=torch.tensor([prefix_ids], device=model.device), past_key_values=DynamicCache(), use_cache=True)
+            state = output.past_key_values
+            self.prefix_cache.put(key, state, kv_cache_nbytes(state))
+        return copy.deepcopy(state)
+
+    def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+        # A cached state belongs to one sequence, so batches run as before.
+        state = self._prefix_state(prompts[0]) if len(prompts) == 1 else None
+        if state is not None:
+            kwargs['pipeline_kwargs'] = dict(kwargs.get('pipeline_kwargs', {}), past_key_values=state)
+        return super()._generate(prompts, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        """
+        Streams the answer. When the consumer stops early (closes the
+        generator), the generation thread is stopped at the next token and
+        joined, so the model is idle again once this generator is closed.
+        An error raised by the generation thread is raised here.
+        """
+        from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+        stop_event = threading.Event()
+        streamer = TextIteratorStreamer(self.pipeline.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        pipeline_kwargs = dict(
+            kwargs.get("pipeline_kwargs", {}),
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([_event_stopping_criteria(stop_event)]),
+        )
+        state = self._prefix_state(prompt)
+        if state is not None:
+            pipeline_kwargs['past_key_values'] = state
+        errors = []
+
+        def generate():
+            # Without this, an error in generation never ends the streamer and the loop below waits forever.
+            try:
+                self.pipeline(prompt, **pipeline_kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        try:
+            for text in streamer:
+                if not text:
+                    continue
+                chunk = GenerationChunk(text=text)
+                if run_manager:
+                    run_manager.on_llm_new_token(text, chunk=chunk)
+                yield chunk
+        finally:
+            stop_event.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+
+class LlamaCppLLM(LLM):
+    """
+    A LangChain LLM over a `llama_cpp.Llama` model, with streaming.
+
+    llama.cpp reuses cached prompt prefixes itself (through the client's
+    `LlamaRAMCache`); with a `prefix_cache`, calls whose prompt starts
+    with a registered prefix are counted as hits or misses per chain.
+    """
+    client: Any
+    max_tokens: int = 1024
+    temperature: float = 0.7
+    top_p: float = 0.95
+    repeat_penalty: float = 1.1
+    prefix_cache: Any = None
+    prompt_prefixes: Dict[str, str] = {}
+
+    @property
+    def _llm_type(self):
+        return "llama_cpp"
+
+    def register_prefix(self, name, prefix):
+        self.prompt_prefixes[name] = prefix
+
+    def _record_prefix(self, prompt):
+        match = match_prefix(self.prompt_prefixes, prompt) if self.prefix_cache is not None else None
+        if match is None:
+            return
+        name, prefix = match
+        prefix_ids = tuple(self.client.tokenize(prefix.encode('utf-8'))[:-1])
+        evaluated = [tuple(self.client.input_ids[:self.client.n_tokens])]
+        if self.client.cache is not None:
+            evaluated.extend(self.client.cache.cache_state.keys())
+        hit = any(tokens[:len(prefix_ids)] == prefix_ids for tokens in evaluated)
+        self.prefix_cache.record(name, hit, len(prefix_ids))
+
+    def _generation_kwargs(self, stop):
+        return {
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'top_p': self.top_p,
+            'repeat_penalty': self.repeat_penalty,
+            'stop': stop or [],
+        }
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        self._record_prefix(prompt)
+        result = self.client(prompt, **self._generation_kwargs(stop))
+        return result['choices'][0]['text']
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        self._record_prefix(prompt)
+        for part in self.client(prompt, stream=True, **self._generation_kwargs(stop)):
+            text = part['choices'][0]['text']
+            if not text:
+                continue
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    def get_num_tokens(self, text):
+        return len(self.client.tokenize(text.encode('utf-8'), add_bos=False))
+
+def _prefix_cache(generator_config):
+    """Creates the prefix cache configured by 'prefix_cache', or None."""
+    prefix_config = generator_config.get('prefix_cache', {})
+    if not prefix_config.get('enabled', False):
+        return None
+    return PrefixKVCache(max_bytes=prefix_config.get('max_mb', 512) * 1024 * 1024)
+
+def _text_generation_pipeline(model, tokenizer, generator_config, prefix_cache=None):
+    """Builds the transformers text-generation pipeline shared by the
+    'transformers' and 'onnx' backends."""
+    from transformers import pipeline
+
+    # Batched generation (see src/llm/scheduler.py) pads prompts on the left.
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
 
     pipe = pipeline(
         "text-generation",
         model=model,
         tokenizer=tokenizer,
-        max_new_tokens=1024,
-        temperature=0.7,
-        top_p=0.95,
-        repetition_penalty=1.1,
+        max_new_tokens=generator_config.get('max_new_tokens', 1024),
+        temperature=generator_config.get('temperature', 0.7),
+        top_p=generator_config.get('top_p', 0.95),
+        repetition_penalty=generator_config.get('repetition_penalty', 1.1),
+        use_cache=generator_config.get('use_kv_cache', True),
+        return_full_text=False,
+    )
+    return StreamingHuggingFacePipeline(pipeline=pipe, prefix_cache=prefix_cache, prompt_prefixes={})
+
+def _load_transformers_llm(generator_config):
+    """
+    Loads the model with transformers: 4-bit bitsandbytes quantization on
+    CUDA, and full precision (bfloat16 when requested) on CPU, where
+    bitsandbytes is not available.
+    """
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+
+    if generator_config.get('num_threads'):
+        torch.set_num_threads(generator_config['num_threads'])
+
+    model_kwargs = {'trust_remote_code': True}
+    if torch.cuda.is_available():
+        model_kwargs['quantization_config'] = BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_use_double_quant=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_compute_dtype=torch.bfloat16,
+        )
+        model_kwargs['device_map'] = "auto"
+    else:
+        model_kwargs['torch_dtype'] = getattr(torch, generator_config.get('cpu_dtype', 'float32'))
+
+    tokenizer = AutoTokenizer.from_pretrained(generator_config['llm_name'])
+    model = AutoModelForCausalLM.from_pretrained(generator_config['llm_name'], **model_kwargs)
+    model.eval()
+    return _text_generation_pipeline(model, tokenizer, generator_config, prefix_cache=_prefix_cache(generator_config))
+
+def _load_llama_cpp_llm(generator_config):
+    """
+    Loads a local GGUF model with the llama.cpp bindings (llama-cpp-python).
+    """
+    try:
+        from llama_cpp import Llama, LlamaRAMCache
+    except ImportError as e:
+        raise ImportError("The 'llama_cpp' backend needs llama-cpp-python: pip install llama-cpp-python") from e
+
+    llama_config = generator_config.get('llama_cpp', {})
+    kv_cache_type = _GGML_KV_TYPES[llama_config.get('kv_cache_type', 'f16')]
+    client = Llama(
+        model_path=llama_config['model_path'],
+        n_ctx=generator_config.get('context_size', 4096),
+        n_threads=generator_config.get('num_threads') or None,
+        n_batch=llama_config.get('n_batch', 512),
+        type_k=kv_cache_type,
+        type_v=kv_cache_type,
+        flash_attn=llama_config.get('flash_attn', False),
+        verbose=False,
     )
+    prefix_cache = _prefix_cache(generator_config)
+    if prefix_cache is not None:
+        client.set_cache(LlamaRAMCache(capacity_bytes=prefix_cache.max_bytes))
+    return LlamaCppLLM(
+        client=client,
+        max_tokens=generator_config.get('max_new_tokens', 1024),
+        temperature=generator_config.get('temperature', 0.7),
+        top_p=generator_config.get('top_p', 0.95),
+        repeat_penalty=generator_config.get('repetition_penalty', 1.1),
+        prefix_cache=prefix_cache,
+        prompt_prefixes={},
+    )
+
+def _load_onnx_llm(generator_config):
+    """
+    Loads an ONNX export of the model (for example one quantized to int8
+    with `optimum-cli onnxruntime quantize`) with ONNX Runtime on CPU.
+    """
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForCausalLM
+    except ImportError as e:
+        raise ImportError("The 'onnx' backend needs optimum and onnxruntime: pip install optimum[onnxruntime]") from e
+    from transformers import AutoTokenizer
+
+    onnx_config = generator_config.get('onnx', {})
+    session_options = onnxruntime.SessionOptions()
+    if generator_config.get('num_threads'):
+        session_options.intra_op_num_threads = generator_config['num_threads']
+
+    model = ORTModelForCausalLM.from_pretrained(
+        onnx_config['model_path'],
+        provider="CPUExecutionProvider",
+        session_options=session_options,
+        use_cache=generator_config.get('use_kv_cache', True),
+    )
+    tokenizer = AutoTokenizer.from_pretrained(onnx_config.get('tokenizer', onnx_config['model_path']))
+    return _text_generation_pipeline(model, tokenizer, generator_config)
+
+_BACKENDS = {
+    'transformers': _load_transformers_llm,
+    'llama_cpp': _load_llama_cpp_llm,
+    'onnx': _load_onnx_llm,
+}
+
+def load_llm(config):
+    """
+    Loads the generator LLM with the backend selected in
+    'rag_core.generator.backend'.
+
+    - 'transformers' (default): the Hugging Face model 'llm_name', 4-bit
+      quantized with bitsandbytes when CUDA is available.
+    - 'llama_cpp': a local GGUF file ('llama_cpp.model_path') run by
+      llama.cpp, with its KV cache type ('llama_cpp.kv_cache_type') and
+      batch size ('llama_cpp.n_batch').
+    - 'onnx': an ONNX Runtime export ('onnx.model_path'), e.g. int8.
+
+    With 'prefix_cache.enabled', the 'transformers' and 'llama_cpp'
+    backends keep the key/value state of registered prompt prefixes (up to
+    'prefix_cache.max_mb') and reuse it across calls.
+
+    All backends share the generation settings of the section
+    ('max_new_tokens', 'temperature', 'top_p', 'repetition_penalty') and
+    the CPU settings 'num_threads' (0 keeps the library default),
+    'context_size' and 'use_kv_cache', and all of them return a LangChain
+    LLM that supports `stream`, so the chains work unchanged.
+
+    Args:
+        config (dict): The project's configuration dictionary.
+
+    Returns:
+        langchain_core.language_models.llms.BaseLLM: The loaded LLM.
+    """
+    generator_config = config['rag_core']['generator']
+    backend = generator_config.get('backend', 'transformers')
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {backend}")
+    return _BACKENDS[backend](generator_config)
+
+def register_prompt_prefix(llm, name, prompt):
+    """
+    Registers the fixed start of a chain's prompt template with the LLM, so
+    its key/value state is cached and reused. LLMs without a prefix cache
+    (and the wrappers of the scheduler) are handled transparently.
+
+    Args:
+        llm (langchain_core.language_models.llms.BaseLLM): The chain's LLM.
+        name (str): The chain name the cache statistics are reported under.
+        prompt (langchain_core.prompts.PromptTemplate): The chain's prompt.
+    """
+    llm = getattr(getattr(llm, 'scheduler', None), 'llm', llm)
+    if getattr(llm, 'prefix_cache', None) is not None:
+        llm.register_prefix(name, prompt_prefix(prompt))
+
+def prefix_cache_stats(llm):
+    """
+    Returns the prefix cache statistics of an LLM (see
+    `PrefixKVCache.stats`), or None when it has no prefix cache.
+    """
+    llm = getattr(getattr(llm, 'scheduler', None), 'llm', llm)
+    prefix_cache = getattr(llm, 'prefix_cache', None)
+    return prefix_cache.stats() if prefix_cache is not None else None
 
-    llm = HuggingFacePipeline(pipeline=pipe)
-    return llm
\ No newline at end of file
+def token_counter(llm):
+    """
+    Returns a function that counts the tokens of a text with the LLM's own
+    tokenizer, or None when the LLM does not expose one.
+    """
+    llm = getattr(getattr(llm, 'scheduler', None), 'llm', llm)
+    tokenizer = getattr(getattr(llm, 'pipeline', None), 'tokenizer', None)
+    if tokenizer is not None:
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    if getattr(llm, '_llm_type', None) == 'llama_cpp':
+        return llm.get_num_tokens
+    return None
@@ -0,0 +1,118 @@
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+def prompt_prefix(prompt):
+    """
+    Returns the fixed text a prompt template starts with: everything before
+    its first input variable, with partial variables (such as the
+    flashcard format instructions) filled in.
+
+    Args:
+        prompt (langchain_core.prompts.PromptTemplate): The template.
+
+    Returns:
+        str: The prefix shared by every prompt built from the template.
+    """
+    sentinels = {name: f"\x00{name}\x00" for name in prompt.input_variables}
+    text = prompt.format(**sentinels)
+    return text[:min(text.find(sentinel) for sentinel in sentinels.values())] if sentinels else text
+
+def match_prefix(prefixes, prompt):
+    """
+    Finds the longest registered prefix a prompt starts with.
+
+    Args:
+        prefixes (dict[str, str]): Prefix texts by chain name.
+        prompt (str): The prompt about to be generated from.
+
+    Returns:
+        tuple[str, str] | None: The chain name and its prefix, or None.
+    """
+    matches = [(name, prefix) for name, prefix in prefixes.items() if prefix and prompt.startswith(prefix)]
+    return max(matches, key=lambda match: len(match[1])) if matches else None
+
+def prefix_key(token_ids):
+    """Hashes the token IDs of a prompt prefix."""
+    return hashlib.sha256(np.asarray(token_ids, dtype=np.int64).tobytes()).hexdigest()
+
+class PrefixKVCache:
+    """
+    Keeps the key/value attention state of shared prompt prefixes, so the
+    model only processes the rest of each prompt.
+
+    Entries are keyed by the hash of the prefix's token IDs and evicted
+    least recently used first once their total size exceeds `max_bytes`.
+    Hits and misses are counted per chain.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.chains = {}
+
+    def record(self, name, hit, tokens):
+        """
+        Counts a lookup for the chain `name`; a hit saves `tokens` tokens of
+        prompt processing.
+        """
+        with self._lock:
+            chain = self.chains.setdefault(name, {'hits': 0, 'misses': 0, 'reused_tokens': 0})
+            if hit:
+                chain['hits'] += 1
+                chain['reused_tokens'] += tokens
+            else:
+                chain['misses'] += 1
+
+    def get(self, key, name, tokens):
+        """
+        Returns the cached state for `key`, or None, and counts the lookup.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        self.record(name, value is not None, tokens)
+        return None if value is None else value[0]
+
+    def put(self, key, state, nbytes):
+        """
+        Stores the state of a prefix, evicting the least recently used
+        entries to stay within `max_bytes`. States larger than the whole
+        budget are not stored.
+        """
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (state, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the cache metrics.
+
+        Returns:
+            dict: 'entries', 'bytes', 'evictions', and 'chains', which maps
+            each chain name to its 'hits', 'misses' and 'reused_tokens'.
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'evictions': self.evictions,
+                'chains': {name: dict(chain) for name, chain in self.chains.items()},
+            }
@@ -0,0 +1,284 @@
+import sys
+import time
+import heapq
+import queue
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, List, Optional
+import numpy as np
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, GenerationChunk, LLMResult
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+_END_OF_STREAM = object()
+
+class SchedulerBusyError(RuntimeError):
+    """Raised when a request cannot be queued because the queue is full."""
+
+class _Request:
+    def __init__(self, kind, prompt, stop, priority):
+        self.kind = kind
+        self.prompt = prompt
+        self.stop = tuple(stop or ())
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.future = Future()
+        self.chunks = queue.Queue()
+        self.cancelled = False
+
+def _batch_kwargs(llm, size):
+    """Extra `generate` arguments that make the backend run a batch at once."""
+    if hasattr(llm, 'pipeline'):
+        return {'pipeline_kwargs': {'batch_size': size}}
+    return {}
+
+class InferenceScheduler:
+    """
+    Serializes access to one loaded LLM for all sessions and chains.
+
+    Requests wait in a priority queue (lower numbers first, first come
+    first served within a priority) that a single worker thread drains.
+    Non-streaming requests with the same stop sequences are batched: the
+    worker takes up to `max_batch_size` of them, waiting at most
+    `batch_wait_ms` for more to arrive, and runs them as one `generate`
+    call. Streaming requests run on their own. When `max_queue_size`
+    requests are waiting, new ones wait up to `submit_timeout` seconds for
+    room and are then rejected with `SchedulerBusyError`.
+    """
+
+    def __init__(self, llm, max_batch_size=4, batch_wait_ms=20, max_queue_size=32, submit_timeout=30.0):
+        self.llm = llm
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self.submit_timeout = submit_timeout
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._waits = deque(maxlen=1000)
+        self.metrics = {'submitted': 0, 'completed': 0, 'rejected': 0, 'batches': 0, 'batched_requests': 0, 'max_queue_depth': 0}
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _enqueue(self, request):
+        with self._condition:
+            deadline = time.monotonic() + self.submit_timeout
+            while len(self._queue) >= self.max_queue_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics['rejected'] += 1
+                    raise SchedulerBusyError(f"The inference queue is full ({self.max_queue_size} requests waiting).")
+                self._condition.wait(remaining)
+            if self._closed:
+                raise RuntimeError("The inference scheduler is closed.")
+            heapq.heappush(self._queue, (request.priority, next(self._sequence), request))
+            self.metrics['submitted'] += 1
+            self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], len(self._queue))
+            self._condition.notify_all()
+        return request
+
+    def submit(self, prompt, stop=None, priority=PRIORITY_BULK):
+        """
+        Queues a prompt for generation.
+
+        Args:
+            prompt (str): The prompt.
+            stop (list[str], optional): Stop sequences.
+            priority (int): Lower values are served first.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the generated text.
+        """
+        return self._enqueue(_Request('generate', prompt, stop, priority)).future
+
+    def stream(self, prompt, stop=None, priority=PRIORITY_INTERACTIVE):
+        """
+        Queues a prompt for streamed generation.
+
+        Args:
+            prompt (str): The prompt.
+            stop (list[str], optional): Stop sequences.
+            priority (int): Lower values are served first.
+
+        Yields:
+            str: The generated text, piece by piece. Closing the generator
+            early stops the generation.
+        """
+        request = self._enqueue(_Request('stream', prompt, stop, priority))
+        try:
+            while True:
+                item = request.chunks.get()
+                if item is _END_OF_STREAM:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            request.cancelled = True
+
+    def _take_batch(self):
+        """Pops the next request and, for generate requests, compatible ones."""
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            if not self._queue:
+                return None
+            first = heapq.heappop(self._queue)[2]
+            batch = [first]
+            if first.kind == 'generate':
+                deadline = time.monotonic() + self.batch_wait
+                while len(batch) < self.max_batch_size:
+                    compatible = [entry for entry in self._queue if entry[2].kind == 'generate' and entry[2].stop == first.stop]
+                    if compatible:
+                        entry = min(compatible)
+                        self._queue.remove(entry)
+                        heapq.heapify(self._queue)
+                        batch.append(entry[2])
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            self._condition.notify_all()
+
+        now = time.perf_counter()
+        for request in batch:
+            self._waits.append(now - request.enqueued)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            if batch[0].kind == 'stream':
+                self._run_stream(batch[0])
+            else:
+                self._run_generate(batch)
+
+    def _run_generate(self, batch):
+        try:
+            result = self.llm.generate(
+                [request.prompt for request in batch],
+                stop=list(batch[0].stop) or None,
+                **_batch_kwargs(self.llm, len(batch)),
+            )
+            for request, generations in zip(batch, result.generations):
+                request.future.set_result(generations[0].text)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+        with self._condition:
+            self.metrics['completed'] += len(batch)
+            self.metrics['batches'] += 1
+            self.metrics['batched_requests'] += len(batch)
+
+    def _run_stream(self, request):
+        # Closing the backend's stream stops its generation before the next request starts.
+        stream = self.llm.stream(request.prompt, stop=list(request.stop) or None)
+        try:
+            for text in stream:
+                if request.cancelled:
+                    break
+                request.chunks.put(text)
+            request.chunks.put(_END_OF_STREAM)
+        except Exception as e:
+            request.chunks.put(e)
+        finally:
+            stream.close()
+        with self._condition:
+            self.metrics['completed'] += 1
+
+    def stats(self):
+        """
+        Returns the scheduler metrics.
+
+        Returns:
+            dict: 'queue_depth' (requests waiting now), 'max_queue_depth',
+            the 'submitted', 'completed' and 'rejected' counts, the
+            'average_batch_size' of generate batches, and the 'wait_p50_ms'
+            and 'wait_p95_ms' queueing delays of recent requests.
+        """
+        with self._condition:
+            stats = dict(self.metrics, queue_depth=len(self._queue))
+            waits = list(self._waits)
+        stats['average_batch_size'] = stats['batched_requests'] / stats['batches'] if stats['batches'] else 0.0
+        p50, p95 = np.percentile(waits, [50, 95]) * 1000 if waits else (0.0, 0.0)
+        stats['wait_p50_ms'], stats['wait_p95_ms'] = float(p50), float(p95)
+        return stats
+
+    def close(self):
+        """Stops the worker once the queued requests are done."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+class ScheduledLLM(LLM):
+    """
+    A LangChain LLM that sends its prompts through an `InferenceScheduler`
+    at a fixed priority, so chains can share the model without changes.
+    Multi-prompt calls (e.g. the map step of a summary) are submitted at
+    once, so the scheduler can batch them.
+    """
+    scheduler: Any
+    priority: int = PRIORITY_BULK
+
+    @property
+    def _llm_type(self):
+        return "scheduled"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        return self.scheduler.submit(prompt, stop=stop, priority=self.priority).result()
+
+    def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+        futures = [self.scheduler.submit(prompt, stop=stop, priority=self.priority) for prompt in prompts]
+        return LLMResult(generations=[[Generation(text=future.result())] for future in futures])
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        for text in self.scheduler.stream(prompt, stop=stop, priority=self.priority):
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    def get_num_tokens(self, text):
+        return self.scheduler.llm.get_num_tokens(text)
+
+def create_scheduled_llms(llm, config):
+    """
+    Wraps the loaded LLM in a shared scheduler, configured by
+    'rag_core.generator.scheduler', and returns one LLM per priority class.
+
+    Args:
+        llm (langchain_core.language_models.llms.BaseLLM): The loaded LLM.
+        config (dict): The project's configuration dictionary.
+
+    Returns:
+        tuple[BaseLLM, BaseLLM, InferenceScheduler | None]: The LLM for
+        interactive chat, the LLM for bulk work (summaries, flashcards)
+        and the scheduler. Without 'enabled', both LLMs are `llm` itself
+        and the scheduler is None.
+    """
+    scheduler_config = config['rag_core']['generator'].get('scheduler', {})
+    if not scheduler_config.get('enabled', False):
+        return llm, llm, None
+    scheduler = InferenceScheduler(
+        llm,
+        max_batch_size=scheduler_config.get('max_batch_size', 4),
+        batch_wait_ms=scheduler_config.get('batch_wait_ms', 20),
+        max_queue_size=scheduler_config.get('max_queue_size', 32),
+        submit_timeout=scheduler_config.get('submit_timeout', 30.0),
+    )
+    interactive_llm = ScheduledLLM(scheduler=scheduler, priority=PRIORITY_INTERACTIVE)
+    bulk_llm = ScheduledLLM(scheduler=scheduler, priority=PRIORITY_BULK)
+    return interactive_llm, bulk_llm, scheduler
@@ -4,6 +4,7 @@ repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 if repo_path not in sys.path:
     sys.path.append(repo_path)
 
+import json
 import sqlite3
 import datetime
 
@@ -25,6 +26,8 @@ def initialize_database(config):
         - Creates an SQLite database file at the specified path if it
           doesn't exist.
         - Creates the 'mistakes' table within the database.
+        - Creates the 'question_bank' table of pre-generated quiz
+          questions, each keyed to the shard of chunks it came from.
         - Prints a confirmation message to the console.
     """
     with sqlite3.connect(config['memory']['sqlite_database_path']) as conn:
@@ -38,8 +41,20 @@ def initialize_database(config):
         )
         """
         cursor.execute(create_table_query)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS question_bank (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL,
+            shard_key TEXT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            chunk_ids TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS question_bank_topic ON question_bank (topic, shard_key)")
         conn.commit()
-        print('Created or found mistakes table.')
+        print('Created or found mistakes and question_bank tables.')
 
 def log_mistake(topic, question, config):
     """
@@ -108,3 +123,98 @@ def get_weak_topics(config):
         cursor.execute(query, limit)
         results = cursor.fetchall()
         return results
+
+def get_bank_topics(config):
+    """
+    Returns the topics that have questions in the question bank.
+
+    Args:
+        config (dict): The project's configuration dictionary, containing the
+                     path to the SQLite database.
+
+    Returns:
+        set[str]: The topics.
+    """
+    with sqlite3.connect(config['memory']['sqlite_database_path']) as conn:
+        return {row[0] for row in conn.execute("SELECT DISTINCT topic FROM question_bank").fetchall()}
+
+def get_bank_shards(topic, config):
+    """
+    Returns the shards of a topic that have questions in the question bank.
+
+    Args:
+        topic (str): The topic or course.
+        config (dict): The project's configuration dictionary, containing the
+                     path to the SQLite database.
+
+    Returns:
+        set[str]: The keys of the stored shards.
+    """
+    with sqlite3.connect(config['memory']['sqlite_database_path']) as conn:
+        rows = conn.execute("SELECT DISTINCT shard_key FROM question_bank WHERE topic = ?", (topic,)).fetchall()
+        return {row[0] for row in rows}
+
+def store_bank_questions(topic, shard_key, chunk_ids, cards, config):
+    """
+    Stores the questions generated from one shard of a topic, replacing the
+    shard's previous questions.
+
+    Args:
+        topic (str): The topic or course.
+        shard_key (str): The key of the shard, derived from its chunk IDs.
+        chunk_ids (list[str]): The IDs of the chunks the questions came from.
+        cards (list[tuple[str, str]]): The (question, answer) pairs.
+        config (dict): The project's configuration dictionary, containing the
+                     path to the SQLite database.
+
+    Side Effects:
+        - Replaces the shard's rows in the 'question_bank' table.
+    """
+    formatted_datetime = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    chunk_ids_json = json.dumps(sorted(chunk_ids))
+    with sqlite3.connect(config['memory']['sqlite_database_path']) as conn:
+        conn.execute("DELETE FROM question_bank WHERE topic = ? AND shard_key = ?", (topic, shard_key))
+        conn.executemany(
+            "INSERT INTO question_bank (topic, shard_key, question, answer, chunk_ids, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            [(topic, shard_key, question, answer, chunk_ids_json, formatted_datetime) for question, answer in cards],
+        )
+        conn.commit()
+
+def delete_bank_shards(topic, shard_keys, config):
+    """
+    Deletes the questions of shards whose chunks no longer exist.
+
+    Side Effects:
+        - Deletes the shards' rows from the 'question_bank' table.
+    """
+    with sqlite3.connect(config['memory']['sqlite_database_path']) as conn:
+        conn.executemany(
+            "DELETE FROM question_bank WHERE topic = ? AND shard_key = ?",
+            [(topic, shard_key) for shard_key in shard_keys],
+        )
+        conn.commit()
+
+def sample_bank_questions(topic, count, config):
+    """
+    Draws random questions of a topic from the question bank, so a quiz can
+    start without generating anything.
+
+    Args:
+        topic (str): The topic or course.
+        count (int): The maximum number of questions.
+        config (dict): The project's configuration dictionary, containing the
+                     path to the SQLite database.
+
+    Returns:
+        list[tuple[str, str]]: (question, answer) pairs; empty when the bank
+        holds no questions for the topic.
+    """
+    with sqlite3.connect(config['memory']['sqlite_database_path']) as conn:
+        query = """
+        SELECT question, answer
+        FROM question_bank
+        WHERE topic = ?
+        ORDER BY RANDOM()
+        LIMIT ?
+        """
+        return conn.execute(query, (topic, count)).fetchall()
@@ -35,8 +35,8 @@ def chunk_single_document(file_path, config):
         content = doc.read()
         document_text += content
     
-    meta_data = {}
-    path_data = file_path.split(os.sep)
+    meta_data = {'source': file_path}
+    path_data = os.path.dirname(file_path).split(os.sep)
     path_data = path_data[2:]
 
     if len(path_data) > 2:
@@ -50,7 +50,7 @@ def chunk_single_document(file_path, config):
         meta_data = {
             'source': file_path,
             'course': path_data[0],
-            'notes_type': path_data[2]
+            'notes_type': path_data[1]
         }
 
     text_splitter = RecursiveCharacterTextSplitter(
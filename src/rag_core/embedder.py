@@ -1,22 +1,115 @@
 import sys
+import hashlib
 
 repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 sys.path.append(repo_path)
 
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 
+from src.rag_core.embedding_engine import load_embedding_model
+
+def compute_chunk_ids(documents):
+    """
+    Derives a deterministic ID for every chunk from its source path and a
+    hash of its content.
+
+    Identical chunks within the same source are told apart by their
+    occurrence number, so re-chunking an unchanged file always yields the
+    same IDs, while a chunk whose text changed gets a new one.
+
+    Args:
+        documents (list[langchain_core.documents.base.Document]): Chunks
+            whose metadata contains their 'source' path.
+
+    Returns:
+        list[str]: One ID per document, in the same order.
+    """
+    ids = []
+    occurrences = {}
+    for document in documents:
+        source = document.metadata.get('source', '')
+        content_hash = hashlib.sha256(document.page_content.encode('utf-8')).hexdigest()
+        occurrence = occurrences.get((source, content_hash), 0)
+        occurrences[(source, content_hash)] = occurrence + 1
+        key = f'{source}\0{content_hash}\0{occurrence}'
+        ids.append(hashlib.sha256(key.encode('utf-8')).hexdigest()[:32])
+    return ids
+
+def assign_chunk_ids(documents):
+    """
+    Computes the chunk IDs of `documents` and records each one in its
+    metadata under 'chunk_id', so documents returned by a search can be
+    traced back to their entry in the collection.
+
+    Args:
+        documents (list[langchain_core.documents.base.Document]): Chunks
+            to label. Their metadata is modified in place.
+
+    Returns:
+        list[str]: The chunk IDs, in the same order.
+    """
+    ids = compute_chunk_ids(documents)
+    for document, chunk_id in zip(documents, ids):
+        document.metadata['chunk_id'] = chunk_id
+    return ids
+
+def open_vector_store(config, embeddings=None):
+    """
+    Opens (or creates) the persistent ChromaDB collection described in the
+    configuration.
+
+    Args:
+        config (dict): The project's configuration dictionary.
+        embeddings (langchain_core.embeddings.Embeddings, optional): The
+            embedding model to attach. Defaults to the shared embedding
+            engine built from the configuration.
+
+    Returns:
+        langchain_chroma.Chroma: The vector store.
+    """
+    if embeddings is None:
+        embeddings = load_embedding_model(config)
+
+    return Chroma(
+        collection_name=config['rag_core']['database']['collection_name'],
+        embedding_function=embeddings,
+        persist_directory=config['rag_core']['database']['persist_directory']
+    )
+
+def get_indexed_chunk_ids(vector_store):
+    """
+    Lists the chunk IDs already stored in the collection, grouped by the
+    source file they came from. Only IDs and metadata are read, not the
+    embeddings or the chunk texts.
+
+    Args:
+        vector_store (langchain_chroma.Chroma): The vector store.
+
+    Returns:
+        dict[str, set[str]]: Chunk IDs keyed by source path.
+    """
+    indexed = {}
+    stored = vector_store.get(include=['metadatas'])
+    for chunk_id, metadata in zip(stored['ids'], stored['metadatas']):
+        source = (metadata or {}).get('source', '')
+        indexed.setdefault(source, set()).add(chunk_id)
+    return indexed
+
 def embed_and_store(documents, config):
     """
     Embeds a list of text documents and stores them in a persistent
     ChromaDB vector store.
 
-    This function takes a list of LangChain Document objects, initializes a
-    Hugging Face embedding model specified in the configuration, and then
+    This function takes a list of LangChain Document objects, initializes the
+    embedding engine specified in the configuration, and then
     uses LangChain's Chroma class to perform the embedding and storage in
     a single operation. The resulting vector database is saved to the
     directory specified in the configuration, making it persistent.
 
+    Every chunk is stored under its deterministic ID (see
+    `compute_chunk_ids`), so storing the same chunks again updates the
+    existing entries instead of duplicating them.
+
     Args:
         documents (list[langchain_core.documents.base.Document]): A list of
             LangChain Document objects to be embedded and stored. Each
@@ -32,14 +125,12 @@ def embed_and_store(documents, config):
           by `persist_directory` in the config.
         - Prints status messages from the underlying libraries to the console.
     """
-    embeddings = HuggingFaceEmbeddings(
-        model_name=config['rag_core']['embedding']['model_name']
-    )
-    
+    embeddings = load_embedding_model(config)
+
     Chroma.from_documents(
         documents=documents,
         embedding=embeddings,
+        ids=assign_chunk_ids(documents),
         persist_directory=config['rag_core']['database']['persist_directory'],
         collection_name=config['rag_core']['database']['collection_name']
     )
-
@@ -0,0 +1,195 @@
+import os, sys
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+def embedding_cache_key(model_name, normalize):
+    """
+    Builds the model part of the cache key. Vectors from different models,
+    or normalized and unnormalized vectors of the same model, never mix.
+
+    Args:
+        model_name (str): The embedding model name.
+        normalize (bool): Whether the vectors are L2-normalized.
+
+    Returns:
+        str: The model key.
+    """
+    return f'{model_name}|normalize={bool(normalize)}'
+
+class EmbeddingCache:
+    """
+    A content-addressed, persistent cache of embedding vectors.
+
+    Vectors are stored as float32 rows appended to a flat file that is read
+    through a memory map, and a SQLite index maps the hash of
+    (model key, text) to the row. Every model key gets its own file and
+    index in a subdirectory of `cache_dir`, since models with different
+    embedding sizes cannot share one row stride. A small LRU dictionary in
+    front of the disk serves the hottest entries without touching the
+    memory map.
+    Several processes may share the cache: new rows are allocated and
+    written inside a SQLite write transaction.
+    """
+
+    def __init__(self, cache_dir, model_key, memory_items=10000):
+        model_dir = os.path.join(cache_dir, hashlib.sha256(model_key.encode('utf-8')).hexdigest()[:16])
+        os.makedirs(model_dir, exist_ok=True)
+        self.model_key = model_key
+        self.memory_items = memory_items
+        self.vectors_path = os.path.join(model_dir, 'vectors.f32')
+        self._conn = sqlite3.connect(os.path.join(model_dir, 'index.db'), timeout=30, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._matrix = None
+        self._dim = self._get_meta('dim')
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+
+    def _get_meta(self, name):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _key(self, text):
+        return hashlib.sha256(f'{self.model_key}\0{text}'.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_rows(self, rows):
+        """Reads rows through the memory map, remapping if the file grew."""
+        needed = max(rows) + 1
+        if self._matrix is None or self._matrix.shape[0] < needed:
+            row_count = os.path.getsize(self.vectors_path) // (4 * self._dim)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(row_count, self._dim))
+        return np.array(self._matrix[rows])
+
+    def get_many(self, texts):
+        """
+        Looks up the vectors of several texts.
+
+        Args:
+            texts (list[str]): The texts to look up.
+
+        Returns:
+            list[numpy.ndarray | None]: The cached vector of each text, or
+            None where the text has not been embedded before.
+        """
+        keys = [self._key(text) for text in texts]
+        results = [None] * len(texts)
+        with self._lock:
+            disk_lookups = {}
+            for index, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[index] = self._memory[key]
+                    self.hits['memory'] += 1
+                else:
+                    disk_lookups.setdefault(key, []).append(index)
+
+            if disk_lookups and self._dim is not None:
+                found = {}
+                lookup_keys = list(disk_lookups)
+                for start in range(0, len(lookup_keys), 500):
+                    batch = lookup_keys[start:start + 500]
+                    placeholders = ','.join('?' * len(batch))
+                    found.update(self._conn.execute(
+                        f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})", batch
+                    ).fetchall())
+                if found:
+                    found_keys = list(found)
+                    vectors = self._read_rows([found[key] for key in found_keys])
+                    for key, vector in zip(found_keys, vectors):
+                        self._remember(key, vector)
+                        for index in disk_lookups[key]:
+                            results[index] = vector
+                            self.hits['disk'] += 1
+
+            self.misses += sum(1 for result in results if result is None)
+        return results
+
+    def put_many(self, texts, vectors):
+        """
+        Stores the vectors of several texts.
+
+        Args:
+            texts (list[str]): The embedded texts.
+            vectors (numpy.ndarray): A (len(texts), dim) matrix.
+
+        Raises:
+            ValueError: If `dim` differs from the vectors already cached for
+                this model key.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not len(texts):
+            return
+        unique = OrderedDict()
+        for text, vector in zip(texts, vectors):
+            unique[self._key(text)] = vector.copy()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._dim is None:
+                    self._dim = self._get_meta('dim') or vectors.shape[1]
+                    self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dim', ?)", (self._dim,))
+                if vectors.shape[1] != self._dim:
+                    raise ValueError(
+                        f"Cannot cache {vectors.shape[1]}-dimensional vectors with the {self._dim}-dimensional "
+                        f"vectors already cached for {self.model_key}."
+                    )
+                keys = list(unique)
+                existing = set()
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    placeholders = ','.join('?' * len(batch))
+                    existing.update(key for (key,) in self._conn.execute(
+                        f"SELECT key FROM embeddings WHERE key IN ({placeholders})", batch
+                    ))
+                new_keys = [key for key in keys if key not in existing]
+                if new_keys:
+                    first_row = self._get_meta('rows') or 0
+                    block = np.stack([unique[key] for key in new_keys])
+                    with open(self.vectors_path, 'ab') as f:
+                        f.truncate(first_row * 4 * self._dim)
+                        f.write(block.tobytes())
+                    self._conn.executemany(
+                        "INSERT INTO embeddings (key, row) VALUES (?, ?)",
+                        [(key, first_row + offset) for offset, key in enumerate(new_keys)],
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta (name, value) VALUES ('rows', ?)", (first_row + len(new_keys),)
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            for key in keys:
+                self._remember(key, unique[key])
+
+    def stats(self):
+        """
+        Returns the hit and miss counts of this cache instance.
+
+        Returns:
+            dict: 'memory_hits', 'disk_hits', 'misses' and 'hit_rate' (0-1).
+        """
+        hits = self.hits['memory'] + self.hits['disk']
+        lookups = hits + self.misses
+        return {
+            'memory_hits': self.hits['memory'],
+            'disk_hits': self.hits['disk'],
+            'misses': self.misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
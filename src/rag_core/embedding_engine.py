@@ -0,0 +1,136 @@
+import sys
+import numpy as np
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+from langchain_core.embeddings import Embeddings
+
+from src.rag_core.embedding_cache import EmbeddingCache, embedding_cache_key
+
+class EmbeddingEngine(Embeddings):
+    """
+    A sentence-transformers embedding model tuned for CPU throughput.
+
+    It is a drop-in LangChain `Embeddings` object, so it can be handed to
+    Chroma, retrievers and the quiz grader alike, but unlike the default
+    `HuggingFaceEmbeddings` it exposes the batch size and optional
+    multi-process encoding, and returns L2-normalized float32 vectors.
+    sentence-transformers already encodes inputs sorted by length, so each
+    batch pads as little as possible.
+
+    When an `EmbeddingCache` is attached, texts that were embedded before
+    (by this or any other process sharing the cache) are served from it and
+    only the remaining texts reach the model.
+    """
+
+    def __init__(self, model_name, batch_size=64, num_processes=1, normalize=True, device="cpu", cache=None):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_processes = num_processes
+        self.normalize = normalize
+        self.cache = cache
+        self.model = SentenceTransformer(model_name, device=device)
+        self._pool = None
+
+    def encode(self, texts):
+        """
+        Embeds a list of texts.
+
+        Large inputs are spread over a pool of worker processes when
+        `num_processes` is greater than 1. With a cache attached, cached
+        texts are not re-encoded and every newly encoded text is added to
+        the cache. The vectors are returned in the order of `texts`.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            numpy.ndarray: A (len(texts), dim) float32 matrix.
+        """
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        if self.cache is None:
+            return self._encode(texts)
+
+        cached = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            vectors = self._encode(missing)
+            self.cache.put_many(missing, vectors)
+            encoded = dict(zip(missing, vectors))
+            cached = [encoded[text] if vector is None else vector for text, vector in zip(texts, cached)]
+        return np.stack(cached).astype(np.float32, copy=False)
+
+    def _encode(self, texts):
+        """Runs the model on `texts` without consulting the cache."""
+        if self.num_processes > 1 and len(texts) >= self.batch_size * self.num_processes:
+            if self._pool is None:
+                self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.num_processes)
+            vectors = self.model.encode_multi_process(
+                texts,
+                self._pool,
+                batch_size=self.batch_size,
+                normalize_embeddings=self.normalize,
+            )
+        else:
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=self.normalize,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+    def close(self):
+        """Stops the multi-process pool, if one was started."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+def load_embedding_model(config):
+    """
+    Creates the embedding engine shared by indexing, retrieval and quiz
+    grading from the 'rag_core.embedding' section of the configuration.
+
+    Args:
+        config (dict): The project's configuration dictionary. Besides the
+            'model_name', the section may set 'batch_size', 'num_threads'
+            (0 keeps the torch default), 'num_processes' and 'normalize'. A
+            'cache' subsection with a 'path' attaches the persistent
+            embedding cache, holding up to 'memory_items' vectors in memory.
+
+    Returns:
+        EmbeddingEngine: The initialized embedding engine.
+    """
+    embedding_config = config['rag_core']['embedding']
+    if embedding_config.get('num_threads'):
+        import torch
+
+        torch.set_num_threads(embedding_config['num_threads'])
+
+    cache_config = embedding_config.get('cache', {})
+    cache = None
+    if cache_config.get('path'):
+        cache = EmbeddingCache(
+            cache_config['path'],
+            model_key=embedding_cache_key(embedding_config['model_name'], embedding_config.get('normalize', True)),
+            memory_items=cache_config.get('memory_items', 10000),
+        )
+    return EmbeddingEngine(
+        model_name=embedding_config['model_name'],
+        batch_size=embedding_config.get('batch_size', 64),
+        num_processes=embedding_config.get('num_processes', 1),
+        normalize=embedding_config.get('normalize', True),
+        cache=cache,
+    )
@@ -0,0 +1,94 @@
+import sys
+from typing import Any, List
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.rag_core.lexical_index import tokenize
+
+def reciprocal_rank_fusion(rankings, weights, rrf_k=60):
+    """
+    Fuses several rankings with weighted reciprocal-rank fusion: every item
+    scores sum(weight / (rrf_k + rank)) over the rankings it appears in.
+
+    Args:
+        rankings (list[list[str]]): Item IDs of each ranking, best first.
+        weights (list[float]): The weight of each ranking.
+        rrf_k (int): Damping constant; larger values flatten the rank curve.
+
+    Returns:
+        list[str]: The item IDs, best fused score first.
+    """
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + weight / (rrf_k + rank)
+    return sorted(scores, key=lambda item: scores[item], reverse=True)
+
+def is_near_duplicate(tokens, kept_token_sets, threshold):
+    """
+    Checks whether a chunk's token set overlaps any kept chunk's token set
+    with a Jaccard similarity of at least `threshold`.
+    """
+    for kept in kept_token_sets:
+        union = len(tokens | kept)
+        if union and len(tokens & kept) / union >= threshold:
+            return True
+    return False
+
+def _chunk_key(document):
+    return document.metadata.get('chunk_id') or document.page_content
+
+class HybridRetriever(BaseRetriever):
+    """
+    Combines a dense retriever with the BM25 lexical index.
+
+    Both produce `candidates` results, which are fused with weighted
+    reciprocal-rank fusion; lexical-only hits are read from the Chroma
+    store by chunk ID. Results that are near-duplicates of a better-ranked
+    result are skipped, so the k chunks returned cover more ground.
+    """
+    dense_retriever: BaseRetriever
+    lexical_index: Any
+    vectorstore: Any = None
+    k: int = 5
+    candidates: int = 20
+    dense_weight: float = 1.0
+    lexical_weight: float = 1.0
+    rrf_k: int = 60
+    dedupe_threshold: float = 0.8
+
+    def _get_relevant_documents(self, query, *, run_manager) -> List[Document]:
+        dense = self.dense_retriever.invoke(query, config={'callbacks': run_manager.get_child()})
+        lexical = self.lexical_index.search(query, self.candidates)
+
+        documents = {_chunk_key(document): document for document in dense}
+        fused = reciprocal_rank_fusion(
+            [[_chunk_key(document) for document in dense], [chunk_id for chunk_id, _ in lexical]],
+            [self.dense_weight, self.lexical_weight],
+            self.rrf_k,
+        )
+        missing = [chunk_id for chunk_id in fused if chunk_id not in documents]
+        if missing:
+            stored = self.vectorstore.get(ids=missing, include=['documents', 'metadatas'])
+            for chunk_id, text, metadata in zip(stored['ids'], stored['documents'], stored['metadatas']):
+                metadata = dict(metadata or {})
+                metadata.setdefault('chunk_id', chunk_id)
+                documents[chunk_id] = Document(page_content=text, metadata=metadata)
+
+        results, kept_token_sets = [], []
+        for chunk_id in fused:
+            document = documents.get(chunk_id)
+            if document is None:
+                continue
+            tokens = set(tokenize(document.page_content))
+            if is_near_duplicate(tokens, kept_token_sets, self.dedupe_threshold):
+                continue
+            results.append(document)
+            kept_token_sets.append(tokens)
+            if len(results) == self.k:
+                break
+        return results
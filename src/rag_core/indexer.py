@@ -0,0 +1,204 @@
+import os, sys
+import time
+import queue
+import threading
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+from src.rag_core.chunker import chunk_single_document
+from src.rag_core.embedder import assign_chunk_ids
+from src.rag_core.topic_catalog import summarize_source
+
+_END_OF_STREAM = object()
+
+def _put(target_queue, item, stop_event):
+    """Puts an item on a bounded queue, giving up once the pipeline stops."""
+    while not stop_event.is_set():
+        try:
+            target_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def iter_processed_files(processed_path):
+    """
+    Yields the processed .txt files under `processed_path` in a stable order.
+
+    Args:
+        processed_path (str): The processed data directory.
+
+    Yields:
+        str: The path of each .txt file.
+    """
+    for root, dirs, files in os.walk(processed_path):
+        dirs.sort()
+        for f in sorted(files):
+            if f.endswith('.txt'):
+                yield os.path.join(root, f)
+
+def iter_chunk_operations(file_paths, config, indexed, batch_size, seen_sources, source_summaries=None):
+    """
+    Chunks files one at a time and turns them into vector store operations.
+
+    Chunks whose ID is already stored are skipped. New chunks are grouped
+    into batches of `batch_size`, and IDs a file no longer produces become
+    delete operations. Only one file's chunks and one batch are in memory
+    at a time.
+
+    Args:
+        file_paths (Iterable[str]): The processed files to index.
+        config (dict): The project's configuration dictionary.
+        indexed (dict[str, set[str]]): Stored chunk IDs keyed by source path.
+        batch_size (int): Number of chunks per add operation.
+        seen_sources (set[str]): Filled with every file path visited.
+        source_summaries (dict, optional): Filled with the topic catalog
+            summary of every file visited, keyed by path.
+
+    Yields:
+        tuple: ('add', documents, ids) or ('delete', None, ids).
+    """
+    documents, ids = [], []
+    for file_path in file_paths:
+        seen_sources.add(file_path)
+        indexed_ids = indexed.get(file_path, set())
+        chunks = chunk_single_document(file_path, config)
+        chunk_ids = assign_chunk_ids(chunks)
+        if source_summaries is not None:
+            source_summaries[file_path] = summarize_source(chunks)
+
+        stale_ids = sorted(indexed_ids - set(chunk_ids))
+        if stale_ids:
+            yield 'delete', None, stale_ids
+
+        for chunk, chunk_id in zip(chunks, chunk_ids):
+            if chunk_id in indexed_ids:
+                continue
+            documents.append(chunk)
+            ids.append(chunk_id)
+            if len(documents) == batch_size:
+                yield 'add', documents, ids
+                documents, ids = [], []
+    if documents:
+        yield 'add', documents, ids
+
+def _chunk_worker(operations, out_queue, stop_event):
+    """Stage 1: produces chunk batches and deletions."""
+    try:
+        for operation in operations:
+            if not _put(out_queue, operation, stop_event):
+                return
+    except Exception as e:
+        _put(out_queue, e, stop_event)
+        return
+    _put(out_queue, _END_OF_STREAM, stop_event)
+
+def _embed_worker(embeddings, in_queue, out_queue, stop_event):
+    """Stage 2: embeds each batch of chunks as it arrives."""
+    while not stop_event.is_set():
+        try:
+            item = in_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _END_OF_STREAM or isinstance(item, Exception):
+            _put(out_queue, item, stop_event)
+            return
+        kind, documents, ids = item
+        vectors = None
+        if kind == 'add':
+            try:
+                vectors = embeddings.embed_documents([document.page_content for document in documents])
+            except Exception as e:
+                _put(out_queue, e, stop_event)
+                return
+        if not _put(out_queue, (kind, documents, ids, vectors), stop_event):
+            return
+
+def build_index(vector_store, indexed, config, lexical_index=None):
+    """
+    Streams every processed document into the vector store.
+
+    Three stages run concurrently and are connected by bounded queues:
+    chunking (a generator over the files), embedding (fixed-size batches)
+    and writing into Chroma (on the calling thread). Embedding starts with
+    the first batch instead of after the whole corpus is chunked, and peak
+    memory is bounded by the batch and queue sizes rather than the corpus.
+
+    Args:
+        vector_store (langchain_chroma.Chroma): The vector store to update.
+        indexed (dict[str, set[str]]): Stored chunk IDs keyed by source path,
+            as returned by `get_indexed_chunk_ids`.
+        config (dict): The project's configuration dictionary. Batch and
+            queue sizes are read from 'rag_core.indexing'.
+        lexical_index (src.rag_core.lexical_index.LexicalIndex, optional):
+            A lexical index that receives the same additions and deletions
+            as the vector store. Saving it is left to the caller.
+
+    Returns:
+        dict: Run statistics: 'added', 'deleted', 'seconds',
+        'chunks_per_second', 'seen_sources' (the set of files visited) and
+        'source_summaries' (their topic catalog summaries).
+    """
+    indexing_config = config['rag_core'].get('indexing', {})
+    batch_size = indexing_config.get('batch_size', 64)
+    queue_size = indexing_config.get('queue_size', 4)
+
+    seen_sources = set()
+    source_summaries = {}
+    operations = iter_chunk_operations(
+        iter_processed_files(config['data']['processed_path']), config, indexed, batch_size, seen_sources, source_summaries
+    )
+    chunk_queue = queue.Queue(maxsize=queue_size)
+    vector_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    workers = [
+        threading.Thread(target=_chunk_worker, args=(operations, chunk_queue, stop_event), daemon=True),
+        threading.Thread(target=_embed_worker, args=(vector_store.embeddings, chunk_queue, vector_queue, stop_event), daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    added = 0
+    deleted = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            item = vector_queue.get()
+            if item is _END_OF_STREAM:
+                break
+            if isinstance(item, Exception):
+                raise item
+            kind, documents, ids, vectors = item
+            if kind == 'delete':
+                vector_store.delete(ids=ids)
+                if lexical_index is not None:
+                    lexical_index.delete(ids)
+                deleted += len(ids)
+                continue
+            vector_store._collection.upsert(
+                ids=ids,
+                embeddings=vectors,
+                documents=[document.page_content for document in documents],
+                metadatas=[document.metadata for document in documents],
+            )
+            if lexical_index is not None:
+                for chunk_id, document in zip(ids, documents):
+                    lexical_index.add(chunk_id, document.page_content)
+            added += len(ids)
+            elapsed = time.perf_counter() - start
+            print(f"    --> {added} chunks embedded ({added / elapsed:.1f} chunks/s)")
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'added': added,
+        'deleted': deleted,
+        'seconds': elapsed,
+        'chunks_per_second': added / elapsed if elapsed > 0 else 0.0,
+        'seen_sources': seen_sources,
+        'source_summaries': source_summaries,
+    }
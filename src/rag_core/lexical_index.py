@@ -0,0 +1,282 @@
+import os, sys
+import re
+import math
+from array import array
+from collections import Counter
+import numpy as np
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+def tokenize(text):
+    """
+    Splits text into lowercase word tokens. Formula names, acronyms and
+    course codes such as 'cs231n' stay single tokens.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list[str]: The tokens.
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+def _pack_strings(strings):
+    """Packs strings into one UTF-8 byte array and their end offsets."""
+    encoded = [string.encode('utf-8') for string in strings]
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    ends = np.cumsum([len(item) for item in encoded], dtype=np.int64)
+    return blob, ends
+
+def _unpack_strings(blob, ends):
+    """Reverses `_pack_strings`."""
+    data = blob.tobytes()
+    starts = np.concatenate([[0], ends[:-1]]) if len(ends) else ends
+    return [data[start:end].decode('utf-8') for start, end in zip(starts.tolist(), ends.tolist())]
+
+class LexicalIndex:
+    """
+    A BM25 inverted index over the chunk texts, keyed by chunk ID.
+
+    Postings are stored as flat arrays: for each term, the rows of the
+    chunks containing it (uint32) and the term frequencies (uint16), with
+    a dictionary from term to its slice, so a term lookup is one
+    dictionary access. Chunks added since the index was loaded go to small
+    appendable arrays, and deleted chunks become tombstones; `save` merges
+    both into the flat arrays and drops the tombstoned rows.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._chunk_ids = []
+        self._rows = {}
+        self._lengths = array('I')
+        self._deleted = set()
+        self._total_length = 0
+        self._term_slices = {}
+        self._doc_ids = np.zeros(0, dtype=np.uint32)
+        self._tfs = np.zeros(0, dtype=np.uint16)
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._chunk_ids) - len(self._deleted)
+
+    def chunk_ids(self):
+        """Returns the set of chunk IDs currently in the index."""
+        return {chunk_id for chunk_id, row in self._rows.items() if row not in self._deleted}
+
+    def add(self, chunk_id, text):
+        """
+        Adds a chunk, replacing any earlier chunk with the same ID.
+
+        Args:
+            chunk_id (str): The chunk ID.
+            text (str): The chunk text.
+        """
+        if chunk_id in self._rows:
+            self.delete([chunk_id])
+        row = len(self._chunk_ids)
+        counts = Counter(tokenize(text))
+        self._chunk_ids.append(chunk_id)
+        self._rows[chunk_id] = row
+        length = sum(counts.values())
+        self._lengths.append(length)
+        self._total_length += length
+        for term, count in counts.items():
+            rows, tfs = self._pending.setdefault(term, (array('I'), array('H')))
+            rows.append(row)
+            tfs.append(min(count, 65535))
+
+    def delete(self, chunk_ids):
+        """
+        Removes chunks from the search results. Unknown IDs are ignored.
+
+        Args:
+            chunk_ids (Iterable[str]): The IDs of the chunks to remove.
+        """
+        for chunk_id in chunk_ids:
+            row = self._rows.pop(chunk_id, None)
+            if row is not None and row not in self._deleted:
+                self._deleted.add(row)
+                self._total_length -= self._lengths[row]
+
+    def _postings(self, term):
+        """Returns the rows and term frequencies of a term."""
+        rows, tfs = self._doc_ids[:0], self._tfs[:0]
+        if term in self._term_slices:
+            start, end = self._term_slices[term]
+            rows, tfs = self._doc_ids[start:end], self._tfs[start:end]
+        if term in self._pending:
+            pending_rows, pending_tfs = self._pending[term]
+            rows = np.concatenate([rows, np.frombuffer(pending_rows, dtype=np.uint32)])
+            tfs = np.concatenate([tfs, np.frombuffer(pending_tfs, dtype=np.uint16)])
+        return rows, tfs
+
+    def search(self, query, k=20):
+        """
+        Ranks the chunks by their BM25 score for the query.
+
+        Args:
+            query (str): The query text.
+            k (int): Maximum number of results.
+
+        Returns:
+            list[tuple[str, float]]: (chunk ID, score) pairs, best first.
+            Chunks that share no term with the query are not returned.
+        """
+        alive = len(self)
+        if not alive:
+            return []
+        average_length = self._total_length / alive or 1.0
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+
+        # Only rows that contain a query term are scored, so the cost
+        # follows the posting list lengths rather than the corpus size.
+        matched_rows, contributions = [], []
+        for term in set(tokenize(query)):
+            rows, tfs = self._postings(term)
+            if not len(rows):
+                continue
+            idf = math.log(1.0 + (alive - len(rows) + 0.5) / (len(rows) + 0.5))
+            tfs = tfs.astype(np.float32)
+            norms = self.k1 * (1.0 - self.b + self.b * lengths[rows] / average_length)
+            matched_rows.append(rows)
+            contributions.append(idf * tfs * (self.k1 + 1.0) / (tfs + norms))
+        if not matched_rows:
+            return []
+
+        rows, positions = np.unique(np.concatenate(matched_rows), return_inverse=True)
+        scores = np.bincount(positions, weights=np.concatenate(contributions))
+        if self._deleted:
+            alive_mask = ~np.isin(rows, np.fromiter(self._deleted, dtype=np.int64))
+            rows, scores = rows[alive_mask], scores[alive_mask]
+        if len(rows) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[best], scores[best]
+        order = np.argsort(-scores, kind='stable')
+        return [(self._chunk_ids[row], float(scores[position])) for position, row in zip(order, rows[order])]
+
+    def save(self, path):
+        """
+        Compacts the index and writes it to a single .npz file, replaced
+        atomically.
+
+        Args:
+            path (str): The file to write.
+        """
+        alive_rows = np.array(
+            [row for row in range(len(self._chunk_ids)) if row not in self._deleted], dtype=np.int64
+        )
+        remap = np.full(len(self._chunk_ids), -1, dtype=np.int64)
+        remap[alive_rows] = np.arange(len(alive_rows))
+
+        terms, doc_id_parts, tf_parts, ends = [], [], [], []
+        total = 0
+        for term in sorted(set(self._term_slices) | set(self._pending)):
+            rows, tfs = self._postings(term)
+            new_rows = remap[rows]
+            keep = new_rows >= 0
+            if not keep.any():
+                continue
+            terms.append(term)
+            doc_id_parts.append(new_rows[keep].astype(np.uint32))
+            tf_parts.append(tfs[keep])
+            total += int(keep.sum())
+            ends.append(total)
+
+        chunk_ids = [self._chunk_ids[row] for row in alive_rows.tolist()]
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)[alive_rows] if len(alive_rows) else np.zeros(0, dtype=np.uint32)
+        term_blob, term_ends = _pack_strings(terms)
+        id_blob, id_ends = _pack_strings(chunk_ids)
+        arrays = {
+            'doc_ids': np.concatenate(doc_id_parts) if doc_id_parts else np.zeros(0, dtype=np.uint32),
+            'tfs': np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.uint16),
+            'posting_ends': np.asarray(ends, dtype=np.int64),
+            'lengths': lengths.astype(np.uint32),
+            'term_blob': term_blob,
+            'term_ends': term_ends,
+            'id_blob': id_blob,
+            'id_ends': id_ends,
+        }
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary_path = f'{path}.tmp.npz'
+        np.savez(temporary_path, **arrays)
+        os.replace(temporary_path, path)
+        self._set_arrays(arrays)
+
+    def _set_arrays(self, arrays):
+        """Replaces the in-memory state with compacted arrays."""
+        terms = _unpack_strings(arrays['term_blob'], arrays['term_ends'])
+        ends = arrays['posting_ends'].tolist()
+        starts = [0] + ends[:-1]
+        self._term_slices = dict(zip(terms, zip(starts, ends)))
+        self._doc_ids = arrays['doc_ids']
+        self._tfs = arrays['tfs']
+        self._pending = {}
+        self._chunk_ids = _unpack_strings(arrays['id_blob'], arrays['id_ends'])
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._chunk_ids)}
+        self._lengths = array('I', arrays['lengths'].astype(np.uint32).tobytes())
+        self._deleted = set()
+        self._total_length = int(arrays['lengths'].sum())
+
+    @classmethod
+    def load(cls, path, k1=1.5, b=0.75):
+        """
+        Loads an index written by `save`, or returns an empty index if the
+        file does not exist.
+
+        Args:
+            path (str): The .npz file.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 length normalization.
+
+        Returns:
+            LexicalIndex: The index.
+        """
+        index = cls(k1=k1, b=b)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                index._set_arrays({name: data[name] for name in data.files})
+        return index
+
+def load_lexical_index(config):
+    """
+    Loads the lexical index described in the configuration.
+
+    Args:
+        config (dict): The project's configuration dictionary. The file is
+            read from 'rag_core.database.lexical_index_path' and the BM25
+            parameters from 'rag_core.retriever.hybrid'.
+
+    Returns:
+        LexicalIndex: The index (empty if it has not been built yet).
+    """
+    hybrid_config = config['rag_core']['retriever'].get('hybrid', {})
+    return LexicalIndex.load(
+        config['rag_core']['database']['lexical_index_path'],
+        k1=hybrid_config.get('bm25_k1', 1.5),
+        b=hybrid_config.get('bm25_b', 0.75),
+    )
+
+def rebuild_lexical_index(lexical_index, vector_store, batch_size=1000):
+    """
+    Refills a lexical index from every chunk in the Chroma collection, for
+    when the two have drifted apart (for example on the first build after
+    the index was introduced).
+
+    Args:
+        lexical_index (LexicalIndex): The index to refill. Chunks not in
+            the collection are removed from it.
+        vector_store (langchain_chroma.Chroma): The vector store.
+        batch_size (int): Number of chunks read from Chroma at a time.
+    """
+    collection = vector_store._collection
+    lexical_index.delete(list(lexical_index.chunk_ids()))
+    for offset in range(0, collection.count(), batch_size):
+        batch = collection.get(include=['documents'], limit=batch_size, offset=offset)
+        for chunk_id, text in zip(batch['ids'], batch['documents']):
+            lexical_index.add(chunk_id, text or '')
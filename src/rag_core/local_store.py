@@ -0,0 +1,438 @@
+import os, sys
+import json
+import functools
+import numpy as np
+from typing import Any, Callable, List
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.embeddings import Embeddings
+
+def _replace_files(store_dir, names):
+    """
+    Moves the `<name>.tmp` files written for `names` over their final
+    paths, so readers never see a partly written file.
+    """
+    for name in names:
+        os.replace(os.path.join(store_dir, f'{name}.tmp'), os.path.join(store_dir, name))
+
+def export_local_store(vector_store, store_dir, batch_size=1000):
+    """
+    Exports the Chroma collection into a flat on-disk store that the local
+    retriever backends search in-process.
+
+    The store holds the float32 vectors as one row-major matrix
+    (`vectors.f32`), the chunk texts and metadata as JSON lines
+    (`chunks.jsonl`) with the byte offset of every line (`offsets.i64`), so
+    a search result can be read without loading the others, and the row
+    count and dimension (`info.json`). Chroma remains the system of record;
+    the store is rebuilt from it after every index build.
+
+    Args:
+        vector_store (langchain_chroma.Chroma): The vector store to export.
+        store_dir (str): The directory to write the store into.
+        batch_size (int): Number of entries read from Chroma at a time.
+
+    Returns:
+        dict: The store info: 'count' and 'dim'.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    collection = vector_store._collection
+    total = collection.count()
+
+    count, dim = 0, 0
+    offsets = []
+    with open(os.path.join(store_dir, 'vectors.f32.tmp'), 'wb') as vectors_file, \
+         open(os.path.join(store_dir, 'chunks.jsonl.tmp'), 'wb') as chunks_file:
+        for offset in range(0, total, batch_size):
+            batch = collection.get(include=['embeddings', 'documents', 'metadatas'], limit=batch_size, offset=offset)
+            vectors = np.asarray(batch['embeddings'], dtype=np.float32)
+            if not len(vectors):
+                continue
+            dim = vectors.shape[1]
+            vectors_file.write(vectors.tobytes())
+            for chunk_id, text, metadata in zip(batch['ids'], batch['documents'], batch['metadatas']):
+                offsets.append(chunks_file.tell())
+                line = json.dumps({'id': chunk_id, 'text': text, 'metadata': metadata or {}}, ensure_ascii=False)
+                chunks_file.write(line.encode('utf-8') + b'\n')
+            count += len(vectors)
+
+    np.asarray(offsets, dtype=np.int64).tofile(os.path.join(store_dir, 'offsets.i64.tmp'))
+    info = {'count': count, 'dim': dim}
+    with open(os.path.join(store_dir, 'info.json.tmp'), 'w') as f:
+        json.dump(info, f)
+    # info.json goes last: it describes the shape of the files before it.
+    _replace_files(store_dir, ('vectors.f32', 'chunks.jsonl', 'offsets.i64', 'info.json'))
+    return info
+
+def open_local_store(store_dir):
+    """
+    Opens an exported store. The vector matrix is memory-mapped, so only
+    the rows a search touches are read from disk.
+
+    Args:
+        store_dir (str): The store directory.
+
+    Returns:
+        dict: 'info', 'vectors' (a read-only numpy.memmap, or an empty
+        array for an empty store) and 'offsets'.
+    """
+    with open(os.path.join(store_dir, 'info.json'), 'r') as f:
+        info = json.load(f)
+    if info['count']:
+        vectors = np.memmap(os.path.join(store_dir, 'vectors.f32'), dtype=np.float32, mode='r',
+                            shape=(info['count'], info['dim']))
+    else:
+        vectors = np.zeros((0, info['dim']), dtype=np.float32)
+    offsets = np.fromfile(os.path.join(store_dir, 'offsets.i64'), dtype=np.int64)
+    return {'info': info, 'vectors': vectors, 'offsets': offsets}
+
+def read_documents(store_dir, offsets, rows):
+    """
+    Reads the chunks stored at the given rows.
+
+    Args:
+        store_dir (str): The store directory.
+        offsets (numpy.ndarray): The line offsets from `open_local_store`.
+        rows (Iterable[int]): The rows to read, in the order to return them.
+
+    Returns:
+        list[langchain_core.documents.base.Document]: The chunks, with the
+        chunk ID in their metadata under 'chunk_id'.
+    """
+    documents = []
+    with open(os.path.join(store_dir, 'chunks.jsonl'), 'rb') as f:
+        for row in rows:
+            f.seek(int(offsets[row]))
+            entry = json.loads(f.readline())
+            metadata = dict(entry['metadata'])
+            metadata.setdefault('chunk_id', entry['id'])
+            documents.append(Document(page_content=entry['text'], metadata=metadata))
+    return documents
+
+def quantize_int8(vectors):
+    """
+    Scalar-quantizes vectors to int8 with one symmetric scale per vector.
+
+    Args:
+        vectors (numpy.ndarray): A (n, dim) float32 matrix.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: The (n, dim) int8 codes and
+        the (n,) float32 scales, with vectors ~= codes * scales[:, None].
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def build_int8_index(store_dir, block_size=65536):
+    """
+    Builds the int8 index of an exported store: the quantized codes
+    (`codes.i8`), their scales (`scales.f32`) and the exact squared norm of
+    every vector (`norms.f32`), which lets the approximate search rank by
+    L2 distance like Chroma does.
+
+    Args:
+        store_dir (str): The store directory.
+        block_size (int): Number of vectors quantized at a time.
+    """
+    store = open_local_store(store_dir)
+    vectors = store['vectors']
+    with open(os.path.join(store_dir, 'codes.i8.tmp'), 'wb') as codes_file, \
+         open(os.path.join(store_dir, 'scales.f32.tmp'), 'wb') as scales_file, \
+         open(os.path.join(store_dir, 'norms.f32.tmp'), 'wb') as norms_file:
+        for start in range(0, len(vectors), block_size):
+            block = np.asarray(vectors[start:start + block_size])
+            codes, scales = quantize_int8(block)
+            codes_file.write(codes.tobytes())
+            scales_file.write(scales.tobytes())
+            norms_file.write(np.einsum('ij,ij->i', block, block).astype(np.float32).tobytes())
+    _replace_files(store_dir, ('codes.i8', 'scales.f32', 'norms.f32'))
+
+def load_int8_index(store_dir):
+    """
+    Loads the int8 index of a store into memory, alongside the memory-mapped
+    full-precision vectors.
+
+    Args:
+        store_dir (str): The store directory.
+
+    Returns:
+        dict: The `open_local_store` result plus 'codes', 'scales' and 'norms'.
+    """
+    store = open_local_store(store_dir)
+    dim = store['info']['dim']
+    store['codes'] = np.fromfile(os.path.join(store_dir, 'codes.i8'), dtype=np.int8).reshape(-1, dim)
+    store['scales'] = np.fromfile(os.path.join(store_dir, 'scales.f32'), dtype=np.float32)
+    store['norms'] = np.fromfile(os.path.join(store_dir, 'norms.f32'), dtype=np.float32)
+    return store
+
+def exact_rerank(vectors, query, rows, k):
+    """
+    Ranks candidate rows by their exact L2 distance to the query, reading
+    only those rows of the full-precision matrix.
+
+    Args:
+        vectors (numpy.ndarray): The (possibly memory-mapped) vector matrix.
+        query (numpy.ndarray): The float32 query vector.
+        rows (numpy.ndarray): The candidate rows.
+        k (int): Number of rows to keep.
+
+    Returns:
+        numpy.ndarray: The k nearest rows, nearest first.
+    """
+    rows = np.sort(rows)
+    candidates = np.asarray(vectors[rows])
+    distances = np.einsum('ij,ij->i', candidates - query, candidates - query)
+    return rows[np.argsort(distances, kind='stable')[:k]]
+
+def search_int8(index, query, k, rerank_candidates=50, block_size=65536):
+    """
+    Finds the k nearest vectors using the int8 codes, then reranks the best
+    `rerank_candidates` of them with their full-precision vectors.
+
+    Args:
+        index (dict): The index from `load_int8_index`.
+        query (numpy.ndarray): The float32 query vector.
+        k (int): Number of results.
+        rerank_candidates (int): Number of approximate matches reranked.
+        block_size (int): Number of codes scored at a time, which bounds the
+            temporary float32 copy.
+
+    Returns:
+        numpy.ndarray: The rows of the k nearest vectors, nearest first.
+    """
+    count = len(index['codes'])
+    if not count:
+        return np.zeros(0, dtype=np.int64)
+    approximate = np.empty(count, dtype=np.float32)
+    for start in range(0, count, block_size):
+        codes = index['codes'][start:start + block_size].astype(np.float32)
+        approximate[start:start + block_size] = codes @ query * index['scales'][start:start + block_size]
+    distances = index['norms'] - 2.0 * approximate
+
+    pool = min(max(rerank_candidates, k), count)
+    candidates = np.argpartition(distances, pool - 1)[:pool]
+    return exact_rerank(index['vectors'], query, candidates, k)
+
+def _nearest_centroids(vectors, centroids, block_size=65536):
+    """Assigns every vector to its nearest centroid, a block at a time."""
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size])
+        assignments[start:start + block_size] = np.argmin(centroid_norms - 2.0 * block @ centroids.T, axis=1)
+    return assignments
+
+def train_kmeans(vectors, n_lists, iterations=20, seed=0, sample_size=None):
+    """
+    Trains k-means centroids with Lloyd's algorithm on a random sample of
+    the vectors. Clusters that end up empty are reseeded with random
+    sample vectors.
+
+    Args:
+        vectors (numpy.ndarray): The (possibly memory-mapped) vector matrix.
+        n_lists (int): Number of centroids.
+        iterations (int): Number of Lloyd iterations.
+        seed (int): Random seed, so rebuilding the same data is repeatable.
+        sample_size (int, optional): Number of training vectors. Defaults
+            to 256 per centroid.
+
+    Returns:
+        numpy.ndarray: The (n_lists, dim) float32 centroids.
+    """
+    rng = np.random.default_rng(seed)
+    count = len(vectors)
+    sample_size = min(count, sample_size or 256 * n_lists)
+    sample = np.asarray(vectors[np.sort(rng.choice(count, sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _nearest_centroids(sample, centroids)
+        counts = np.bincount(assignments, minlength=n_lists)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        if not filled.all():
+            centroids[~filled] = sample[rng.choice(sample_size, int((~filled).sum()), replace=False)]
+    return centroids
+
+def build_ivf_index(store_dir, n_lists=0, iterations=20, seed=0):
+    """
+    Builds the IVF (inverted file) index of an exported store: k-means
+    centroids (`ivf_centroids.f32`), the rows of every list stored one list
+    after the other (`ivf_rows.i64`) and where each list starts
+    (`ivf_offsets.i64`).
+
+    Args:
+        store_dir (str): The store directory.
+        n_lists (int): Number of lists. 0 picks the square root of the
+            number of vectors.
+        iterations (int): Number of k-means iterations.
+        seed (int): Random seed for k-means.
+    """
+    store = open_local_store(store_dir)
+    vectors = store['vectors']
+    count, dim = store['info']['count'], store['info']['dim']
+    if count:
+        n_lists = min(n_lists or max(1, int(np.sqrt(count))), count)
+        centroids = train_kmeans(vectors, n_lists, iterations=iterations, seed=seed)
+        assignments = _nearest_centroids(vectors, centroids)
+        rows = np.argsort(assignments, kind='stable')
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+    else:
+        centroids = np.zeros((0, dim), dtype=np.float32)
+        rows = np.zeros(0, dtype=np.int64)
+        list_offsets = np.zeros(1, dtype=np.int64)
+
+    centroids.astype(np.float32).tofile(os.path.join(store_dir, 'ivf_centroids.f32.tmp'))
+    rows.astype(np.int64).tofile(os.path.join(store_dir, 'ivf_rows.i64.tmp'))
+    list_offsets.astype(np.int64).tofile(os.path.join(store_dir, 'ivf_offsets.i64.tmp'))
+    _replace_files(store_dir, ('ivf_centroids.f32', 'ivf_rows.i64', 'ivf_offsets.i64'))
+
+def load_ivf_index(store_dir):
+    """
+    Loads the IVF index of a store into memory, alongside the memory-mapped
+    vectors.
+
+    Args:
+        store_dir (str): The store directory.
+
+    Returns:
+        dict: The `open_local_store` result plus 'centroids', 'rows' and
+        'list_offsets'.
+    """
+    store = open_local_store(store_dir)
+    dim = store['info']['dim']
+    store['centroids'] = np.fromfile(os.path.join(store_dir, 'ivf_centroids.f32'), dtype=np.float32).reshape(-1, dim)
+    store['rows'] = np.fromfile(os.path.join(store_dir, 'ivf_rows.i64'), dtype=np.int64)
+    store['list_offsets'] = np.fromfile(os.path.join(store_dir, 'ivf_offsets.i64'), dtype=np.int64)
+    return store
+
+def search_ivf(index, query, k, n_probe=8):
+    """
+    Finds the k nearest vectors by scanning the lists of the `n_probe`
+    centroids closest to the query (more if those lists hold fewer than k
+    vectors) with exact distances.
+
+    Args:
+        index (dict): The index from `load_ivf_index`.
+        query (numpy.ndarray): The float32 query vector.
+        k (int): Number of results.
+        n_probe (int): Number of lists to scan.
+
+    Returns:
+        numpy.ndarray: The rows of the k nearest vectors, nearest first.
+    """
+    if not len(index['rows']):
+        return np.zeros(0, dtype=np.int64)
+    centroid_distances = ((index['centroids'] - query) ** 2).sum(axis=1)
+    candidates = []
+    found = 0
+    for probed, list_id in enumerate(np.argsort(centroid_distances)):
+        if probed >= n_probe and found >= k:
+            break
+        start, end = index['list_offsets'][list_id], index['list_offsets'][list_id + 1]
+        candidates.append(index['rows'][start:end])
+        found += end - start
+    return exact_rerank(index['vectors'], query, np.concatenate(candidates), k)
+
+class LocalStoreRetriever(BaseRetriever):
+    """
+    The LangChain retriever over a local store. `search` is the backend's
+    row search, called as `search(index, query_vector, k)`, e.g.
+    `search_int8` or `search_ivf`. `vectorstore` keeps the Chroma store,
+    which the app still uses for metadata queries.
+    """
+    store_dir: str
+    index: dict
+    search: Callable[[dict, np.ndarray, int], np.ndarray]
+    embeddings: Embeddings
+    k: int = 5
+    vectorstore: Any = None
+
+    def _get_relevant_documents(self, query, *, run_manager) -> List[Document]:
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        rows = self.search(self.index, query_vector, self.k)
+        return read_documents(self.store_dir, self.index['offsets'], rows)
+
+_INDEX_FILES = {'int8': 'codes.i8', 'ivf': 'ivf_centroids.f32'}
+
+def build_local_index(vector_store, config):
+    """
+    Exports the Chroma collection and builds the index of the configured
+    local retriever backend. Does nothing for the 'chroma' backend.
+
+    Args:
+        vector_store (langchain_chroma.Chroma): The vector store to export.
+        config (dict): The project's configuration dictionary. The backend
+            and its settings are read from 'rag_core.retriever' and the
+            store location from 'rag_core.database.local_store_directory'.
+
+    Returns:
+        dict | None: The store info, or None for the 'chroma' backend.
+    """
+    retriever_config = config['rag_core']['retriever']
+    backend = retriever_config.get('backend', 'chroma')
+    if backend == 'chroma':
+        return None
+    if backend not in _INDEX_FILES:
+        raise ValueError(f"Unknown retriever backend: {backend}")
+
+    store_dir = config['rag_core']['database']['local_store_directory']
+    info = export_local_store(vector_store, store_dir)
+    if backend == 'int8':
+        build_int8_index(store_dir)
+    else:
+        ivf_config = retriever_config.get('ivf', {})
+        build_ivf_index(store_dir, n_lists=ivf_config.get('n_lists', 0), iterations=ivf_config.get('iterations', 20))
+    return info
+
+def create_local_retriever(config, embedding_model, vector_store, k=None):
+    """
+    Creates the retriever of the configured local backend, building its
+    index from `vector_store` first if it does not exist yet.
+
+    Args:
+        config (dict): The project's configuration dictionary.
+        embedding_model (langchain_core.embeddings.Embeddings): The model
+            used to embed queries.
+        vector_store (langchain_chroma.Chroma): The Chroma store the local
+            store is exported from.
+        k (int, optional): Number of results. Defaults to
+            'rag_core.retriever.k'.
+
+    Returns:
+        LocalStoreRetriever: The retriever.
+    """
+    retriever_config = config['rag_core']['retriever']
+    k = k or retriever_config['k']
+    backend = retriever_config['backend']
+    if backend not in _INDEX_FILES:
+        raise ValueError(f"Unknown retriever backend: {backend}")
+
+    store_dir = config['rag_core']['database']['local_store_directory']
+    if not os.path.exists(os.path.join(store_dir, _INDEX_FILES[backend])):
+        build_local_index(vector_store, config)
+
+    if backend == 'int8':
+        # The int8 codes are scanned in memory and only the best candidates' float32 vectors are read for reranking.
+        index = load_int8_index(store_dir)
+        search = functools.partial(search_int8, rerank_candidates=retriever_config.get('rerank_candidates', 50))
+    else:
+        # Only the IVF lists nearest to the query are read from the memory-mapped matrix.
+        index = load_ivf_index(store_dir)
+        search = functools.partial(search_ivf, n_probe=retriever_config.get('ivf', {}).get('n_probe', 8))
+    return LocalStoreRetriever(
+        store_dir=store_dir,
+        index=index,
+        search=search,
+        embeddings=embedding_model,
+        k=k,
+        vectorstore=vector_store,
+    )
@@ -4,42 +4,81 @@ repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 sys.path.append(repo_path)
 
 from langchain_chroma import Chroma
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 
-def create_retriever(config):
+from src.rag_core.embedding_engine import load_embedding_model
+from src.rag_core.local_store import create_local_retriever
+from src.rag_core.lexical_index import load_lexical_index
+from src.rag_core.hybrid_retriever import HybridRetriever
+
+def create_retriever(config, embedding_model=None):
     """
     Creates a retriever object from a pre-existing, persistent ChromaDB
     vector store.
 
-    This function initializes the same Hugging Face embedding model that was
-    used for storing the data. It then connects to the ChromaDB database
+    This function uses the same embedding engine that was used for storing
+    the data. It then connects to the ChromaDB database
     persisted on disk and creates a retriever object from it. The retriever
     is configured with search parameters, such as 'k' for the number of
     documents to return, based on the provided configuration.
 
+    The 'rag_core.retriever.backend' setting selects the search backend:
+    'chroma' (the default) searches the collection directly, while 'int8'
+    (quantized codes with float32 rerank) and 'ivf' (k-means inverted
+    lists) search the local store exported from it (see
+    `src.rag_core.local_store`), which is built on first use if
+    build_vector_store.py has not built it yet.
+
+    With 'rag_core.retriever.hybrid.enabled', the chosen backend fetches
+    'candidates' results that are fused with the BM25 lexical index by
+    weighted reciprocal-rank fusion, and near-duplicate chunks are dropped.
+
     Args:
         config (dict): The project's configuration dictionary. It must
                      contain the embedding model name, the database persist
                      directory, the collection name, and retriever settings
                      (like 'k') under the 'rag_core' key.
+        embedding_model (langchain_core.embeddings.Embeddings, optional):
+            An already loaded embedding model to share. Defaults to a new
+            engine built from the configuration.
 
     Returns:
-        langchain_core.vectorstores.VectorStoreRetriever: A configured
+        langchain_core.retrievers.BaseRetriever: A configured
         retriever object ready to be used for fetching relevant documents
-        from the vector store in response to a query.
+        from the vector store in response to a query. Its `vectorstore`
+        attribute is the Chroma store in every backend.
     """
-    embeddings = HuggingFaceEmbeddings(
-        model_name=config['rag_core']['embedding']['model_name']
-    )
-    
+    if embedding_model is None:
+        embedding_model = load_embedding_model(config)
+
     vector_store = Chroma(
         collection_name=config['rag_core']['database']['collection_name'],
-        embedding_function=embeddings,
+        embedding_function=embedding_model,
         persist_directory=config['rag_core']['database']['persist_directory']
     )
-    
-    retriever = vector_store.as_retriever(
-        search_kwargs={"k": config['rag_core']['retriever']['k']}
-    )
-    
+
+    retriever_config = config['rag_core']['retriever']
+    hybrid_config = retriever_config.get('hybrid', {})
+    hybrid = hybrid_config.get('enabled', False)
+    k = hybrid_config.get('candidates', 20) if hybrid else retriever_config['k']
+
+    if retriever_config.get('backend', 'chroma') != 'chroma':
+        retriever = create_local_retriever(config, embedding_model, vector_store, k=k)
+    else:
+        retriever = vector_store.as_retriever(
+            search_kwargs={"k": k}
+        )
+
+    if hybrid:
+        retriever = HybridRetriever(
+            dense_retriever=retriever,
+            lexical_index=load_lexical_index(config),
+            vectorstore=vector_store,
+            k=retriever_config['k'],
+            candidates=k,
+            dense_weight=hybrid_config.get('dense_weight', 1.0),
+            lexical_weight=hybrid_config.get('lexical_weight', 1.0),
+            rrf_k=hybrid_config.get('rrf_k', 60),
+            dedupe_threshold=hybrid_config.get('dedupe_threshold', 0.8),
+        )
+
     return retriever
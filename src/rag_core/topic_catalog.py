@@ -0,0 +1,110 @@
+import os, sys
+import json
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+sys.path.append(repo_path)
+
+_CATALOG_FIELDS = ('specialization', 'course', 'notes_type')
+
+def summarize_source(documents):
+    """
+    Summarizes the chunks of one source file for the topic catalog.
+
+    Args:
+        documents (list[langchain_core.documents.base.Document]): The
+            chunks of the file. They share the metadata derived from its path.
+
+    Returns:
+        dict: The file's 'specialization', 'course' and 'notes_type' (those
+        present in its metadata) and its number of 'chunks'.
+    """
+    metadata = documents[0].metadata if documents else {}
+    summary = {field: metadata[field] for field in _CATALOG_FIELDS if field in metadata}
+    summary['chunks'] = len(documents)
+    return summary
+
+def build_topic_catalog(source_summaries):
+    """
+    Aggregates per-file summaries into the topic catalog.
+
+    Args:
+        source_summaries (dict[str, dict]): `summarize_source` results keyed
+            by source path.
+
+    Returns:
+        dict: 'courses' (course -> {'specialization', 'chunks',
+        'notes_types': {notes_type: chunks}}), the sorted 'specializations'
+        and 'notes_types', and 'total_chunks'.
+    """
+    courses = {}
+    specializations, notes_types = set(), set()
+    for summary in source_summaries.values():
+        if summary.get('specialization'):
+            specializations.add(summary['specialization'])
+        if summary.get('notes_type'):
+            notes_types.add(summary['notes_type'])
+        if not summary.get('course'):
+            continue
+        course = courses.setdefault(
+            summary['course'], {'specialization': summary.get('specialization'), 'chunks': 0, 'notes_types': {}}
+        )
+        course['chunks'] += summary['chunks']
+        if summary.get('notes_type'):
+            course['notes_types'][summary['notes_type']] = course['notes_types'].get(summary['notes_type'], 0) + summary['chunks']
+
+    return {
+        'courses': {name: courses[name] for name in sorted(courses)},
+        'specializations': sorted(specializations),
+        'notes_types': sorted(notes_types),
+        'total_chunks': sum(summary['chunks'] for summary in source_summaries.values()),
+    }
+
+def catalog_from_vector_store(vector_store):
+    """
+    Builds the topic catalog by scanning the metadata of the whole
+    collection. Only needed when no catalog file exists yet.
+
+    Args:
+        vector_store (langchain_chroma.Chroma): The vector store.
+
+    Returns:
+        dict: The topic catalog.
+    """
+    source_summaries = {}
+    for metadata in vector_store.get(include=['metadatas'])['metadatas']:
+        metadata = metadata or {}
+        summary = source_summaries.setdefault(
+            metadata.get('source', ''),
+            dict({field: metadata[field] for field in _CATALOG_FIELDS if field in metadata}, chunks=0),
+        )
+        summary['chunks'] += 1
+    return build_topic_catalog(source_summaries)
+
+def save_topic_catalog(catalog, path):
+    """
+    Writes the topic catalog as JSON, replacing the previous file atomically.
+
+    Args:
+        catalog (dict): The topic catalog.
+        path (str): The catalog file.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, indent=2, ensure_ascii=False)
+    os.replace(temporary_path, path)
+
+def load_topic_catalog(path):
+    """
+    Reads the topic catalog.
+
+    Args:
+        path (str): The catalog file.
+
+    Returns:
+        dict | None: The topic catalog, or None if it has not been built.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,88 @@
+import sys
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from src.features.answer_cache import AnswerCache, CachedQAChain
+
+
+class KeywordEmbedding(Embeddings):
+    """Embeds text as a bag of a few keywords, so similarity is predictable."""
+    keywords = ["gru", "gates", "lstm", "attention", "many", "how"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        words = text.lower().replace("?", "").split()
+        return [float(sum(word.startswith(keyword) for word in words)) for keyword in self.keywords]
+
+
+class CountingQAChain:
+    """Stands in for RetrievalQA and counts how often it runs."""
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, question):
+        self.calls += 1
+        return {
+            "query": question,
+            "result": f"answer {self.calls}",
+            "source_documents": [Document(page_content="GRUs have two gates.", metadata={"chunk_id": "chunk-1"})],
+        }
+
+
+class ChunkStore:
+    """Stands in for the Chroma store, answering `get(ids=...)`."""
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    def get(self, ids, include):
+        return {"ids": [chunk_id for chunk_id in ids if chunk_id in self.ids]}
+
+
+def test_semantic_answer_cache():
+    """
+    Tests the semantic answer cache in front of the QA chain.
+
+    This unit test verifies that:
+    1.  A repeated question, even with different case and punctuation, is an
+        exact hit and does not run the chain.
+    2.  A reworded question with the same meaning is a semantic hit, while an
+        unrelated question is a miss.
+    3.  An answer whose source chunk left the vector store is invalidated.
+    4.  The least recently used entry is evicted beyond `max_entries`, and
+        the metrics count every outcome.
+    """
+    qa_chain = CountingQAChain()
+    chunk_store = ChunkStore(["chunk-1"])
+    cache = AnswerCache(KeywordEmbedding(), vector_store=chunk_store, similarity_threshold=0.95, max_entries=2)
+    cached_chain = CachedQAChain(qa_chain, cache)
+
+    first = cached_chain.invoke("How many gates does a GRU have?")
+    assert first["cached"] is False and qa_chain.calls == 1
+
+    repeated = cached_chain.invoke("how many gates does a GRU have")
+    assert repeated["cached"] is True and repeated["result"] == first["result"]
+
+    reworded = cached_chain.invoke("GRU: how many gates?")
+    assert reworded["cached"] is True and qa_chain.calls == 1
+
+    assert cached_chain.invoke("What is attention?")["cached"] is False
+    assert qa_chain.calls == 2
+
+    chunk_store.ids.clear()
+    assert cached_chain.invoke("How many gates does a GRU have?")["cached"] is False
+    assert qa_chain.calls == 3
+
+    chunk_store.ids.add("chunk-1")
+    cached_chain.invoke("Explain LSTM cells")
+    assert len(cache._entries) == 2
+
+    stats = cache.stats()
+    assert stats["exact_hits"] == 1 and stats["semantic_hits"] == 1
+    assert stats["misses"] == 4 and stats["invalidations"] >= 1 and stats["evictions"] == 1
+    assert stats["hit_rate"] == 2 / 6
@@ -0,0 +1,133 @@
+import sys
+import json
+from typing import Any, List
+
+import numpy as np
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, LLMResult
+from src.features.flashcard_generator import (
+    Flashcard, Flashcards, FlashcardScanner, create_flashcard_chain, create_flashcard_generator, shard_texts,
+)
+
+
+class ShardCardLLM(LLM):
+    """Writes one card per context line, breaking the JSON of 'broken' shards."""
+    batches: List[Any] = []
+
+    @property
+    def _llm_type(self):
+        return "shard_cards"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        context = prompt.split("---")[-2].strip()
+        if "broken" in context:
+            return '{"flashcards": [{"question": "What'
+        cards = [{"question": f"What is {text.split()[0]}?", "answer": text} for text in context.split("\n\n")]
+        return json.dumps({"flashcards": cards})
+
+    def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+        self.batches.append(len(prompts))
+        return LLMResult(generations=[[Generation(text=self._call(prompt))] for prompt in prompts])
+
+
+class QuestionEmbedding(Embeddings):
+    """Embeds a question by the term it asks about, ignoring case."""
+    terms = ["gru", "lstm", "attention"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        term = text.lower().split()[2].strip("?")
+        return [float(term == known) for known in self.terms]
+
+
+def test_sharded_flashcard_generation():
+    """
+    Tests flashcard generation over token-budgeted topic shards.
+
+    This unit test verifies that:
+    1.  Chunks are packed into shards within the token budget, and with
+        embeddings every shard holds one cluster of chunks.
+    2.  All shards are generated in one batched LLM call.
+    3.  A shard with malformed output only loses its own cards, near
+        duplicate questions are dropped, and the result is a `Flashcards`
+        object.
+    """
+    texts = ["GRU gates", "LSTM cells", "Attention weights", "gru gating", "broken output here"]
+    count_tokens = lambda text: len(text.split())
+
+    assert shard_texts(texts, count_tokens, token_budget=4) == [[0, 1], [2, 3], [4]]
+    vectors = np.array([[1, 0], [0, 1], [0, 1], [1, 0], [0, 1]], dtype=np.float32)
+    clustered = shard_texts(texts, count_tokens, token_budget=4, vectors=vectors)
+    assert sorted(index for shard in clustered for index in shard) == list(range(5))
+    assert [0, 3] in clustered
+    assert all(sum(count_tokens(texts[index]) for index in shard) <= 4 for shard in clustered if len(shard) > 1)
+
+    mock_config = {"features": {"flashcards": {"shard_token_budget": 4, "batch_size": 8, "dedupe_threshold": 0.9}}}
+    llm = ShardCardLLM(batches=[])
+    generator = create_flashcard_generator(llm, mock_config, embedding_model=QuestionEmbedding())
+    generator.count_tokens = count_tokens
+
+    result = generator.invoke(texts, vectors)
+    assert isinstance(result, Flashcards)
+    assert llm.batches == [len(clustered)]
+    questions = [card.question for card in result.flashcards]
+    assert sorted(questions) == ["What is Attention?", "What is GRU?", "What is LSTM?"]
+
+
+def test_streaming_flashcard_parser():
+    """
+    Tests the incremental flashcard parser.
+
+    This unit test verifies that:
+    1.  Each card is returned as soon as its JSON object closes, and the
+        scanner only keeps the text of the card still open.
+    2.  A malformed card and a truncated last card only lose themselves,
+        and trailing commas are tolerated.
+    3.  Streaming the flashcard chain yields `Flashcard` objects one by one,
+        and invoking it returns the recovered cards as `Flashcards`.
+    4.  When an unbalanced quote derails the scanner, streaming still
+        yields the flat card objects that can be recovered, at the end.
+    """
+    output = (
+        'Here are your flashcards:\n```json\n{"flashcards": ['
+        '{"question": "What is a GRU?", "answer": "A gated {recurrent} unit."},'
+        '{"question": "Broken" "answer": "missing comma"},'
+        '{"question": "What does \\"LSTM\\" stand for?", "answer": "Long short-term memory",},'
+        '{"question": "What is attention?", "answer": "A weighted'
+    )
+
+    scanner = FlashcardScanner()
+    arrivals = []
+    for position, char in enumerate(output):
+        for card in scanner.feed(char):
+            arrivals.append((position, card))
+    assert [card.question for _, card in arrivals] == ["What is a GRU?", 'What does "LSTM" stand for?']
+    assert output[arrivals[0][0]] == "}" and arrivals[0][0] < output.index("Broken")
+    assert scanner.text == '{"question": "What is attention?", "answer": "A weighted'
+
+    chain = create_flashcard_chain(FakeStreamingListLLM(responses=[output, output]))
+    streamed = list(chain.stream({"context": "RNN notes"}))
+    assert all(isinstance(card, Flashcard) for card in streamed) and len(streamed) == 2
+
+    result = chain.invoke({"context": "RNN notes"})
+    assert isinstance(result, Flashcards)
+    assert [card.answer for card in result.flashcards] == ["A gated {recurrent} unit.", "Long short-term memory"]
+
+    derailed = (
+        '{"note": "unbalanced, "flashcards": ['
+        '{"question": "What is a GRU?", "answer": "A gated recurrent unit."},'
+        '{"question": "What is an LSTM?", "answer": "Long short-term memory."}]}'
+    )
+    assert FlashcardScanner().feed(derailed) == []
+    chain = create_flashcard_chain(FakeStreamingListLLM(responses=[derailed]))
+    streamed = list(chain.stream({"context": "RNN notes"}))
+    assert [card.question for card in streamed] == ["What is a GRU?", "What is an LSTM?"]
@@ -0,0 +1,47 @@
+import sys
+from typing import List
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.retrievers import BaseRetriever
+from src.features.generator import create_qa_chain, stream_qa_answer
+
+
+class NotesRetriever(BaseRetriever):
+    """Returns the same two chunks for every question."""
+    def _get_relevant_documents(self, query, *, run_manager) -> List[Document]:
+        return [
+            Document(page_content="GRUs have two gates.", metadata={"source": "notes/rnn.txt", "chunk_id": "a"}),
+            Document(page_content="LSTMs have three gates.", metadata={"source": "notes/rnn.txt", "chunk_id": "b"}),
+        ]
+
+
+def test_stream_qa_answer():
+    """
+    Tests the streaming variant of the QA chain.
+
+    This unit test verifies that:
+    1.  The retrieved sources arrive before any token of the answer.
+    2.  The streamed pieces join up to the same answer the chain returns.
+    3.  Time to first token and throughput metrics are reported last.
+    """
+    answer = "A GRU has two gates."
+    mock_config = {"features": {"answer_cache": {"enabled": False}}}
+    qa_chain = create_qa_chain(NotesRetriever(), FakeStreamingListLLM(responses=[answer]), mock_config)
+
+    events = list(stream_qa_answer(qa_chain, "How many gates does a GRU have?"))
+    kinds = [kind for kind, _ in events]
+
+    assert kinds[0] == "sources" and kinds[-1] == "metrics"
+    assert set(kinds[1:-1]) == {"token"} and len(kinds) > 3
+    assert [document.metadata["chunk_id"] for document in events[0][1]] == ["a", "b"]
+    assert "".join(text for kind, text in events if kind == "token") == answer
+    assert qa_chain.invoke("How many gates does a GRU have?")["result"] == answer
+
+    metrics = events[-1][1]
+    assert metrics["cached"] is False and metrics["tokens"] > 0
+    assert 0 <= metrics["retrieval_seconds"] <= metrics["ttft_seconds"] <= metrics["total_seconds"]
@@ -6,6 +6,9 @@ if repo_path not in sys.path:
     sys.path.append(repo_path)
 
 from src.memory.tracker import initialize_database , log_mistake , get_weak_topics
+from src.memory.tracker import sample_bank_questions, get_bank_shards, get_bank_topics
+from src.features.flashcard_generator import Flashcard
+from src.features.question_bank import refresh_question_bank
 
 def test_tracker_functions():
     """
@@ -49,5 +52,82 @@ def test_tracker_functions():
             os.remove(temp_db_path)
 
 
+class CollectionStub:
+    """Stands in for the Chroma store, answering `get(include=...)`."""
+    def __init__(self, chunks):
+        self.chunks = chunks
 
+    def get(self, include):
+        return {
+            "ids": list(self.chunks),
+            "documents": [text for text, _ in self.chunks.values()],
+            "metadatas": [metadata for _, metadata in self.chunks.values()],
+        }
+
+
+class OneCardGenerator:
+    """Stands in for the flashcard generator: one card per shard line."""
+    token_budget = 4
+    batch_size = 2
+    embedding_model = None
+    dedupe_threshold = 0.9
+
+    def __init__(self):
+        self.contexts = []
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+    def generate(self, contexts):
+        self.contexts.extend(contexts)
+        return [[Flashcard(question=f"What about {line}?", answer=line) for line in context.split("\n\n")]
+                for context in contexts]
+
+
+def test_question_bank():
+    """
+    Tests the pre-generated quiz question bank.
+
+    This unit test verifies that:
+    1.  The first refresh generates questions for every shard of every
+        course and stores them in the memory database.
+    2.  Quizzes are sampled from the bank without generating anything.
+    3.  A refresh after one file changed only regenerates that file's
+        shards, and questions of removed courses are deleted.
+    """
+    temp_db_path = "test_question_bank.db"
+    mock_config = {"memory": {"sqlite_database_path": temp_db_path, "limit": 3}}
+    chunks = {
+        "a1": ("rnn basics", {"course": "DL", "source": "notes/a.txt"}),
+        "a2": ("lstm gates", {"course": "DL", "source": "notes/a.txt"}),
+        "b1": ("gru gates", {"course": "DL", "source": "notes/b.txt"}),
+        "c1": ("svm margins", {"course": "ML", "source": "notes/c.txt"}),
+    }
+
+    try:
+        initialize_database(mock_config)
+        generator = OneCardGenerator()
+        collection = CollectionStub(chunks)
+
+        stats = refresh_question_bank(generator, collection, mock_config)
+        assert stats["generated"] == 3 and stats["questions"] == 4 and stats["kept"] == 0
+        assert get_bank_topics(mock_config) == {"DL", "ML"}
+
+        quiz = sample_bank_questions("DL", 2, mock_config)
+        assert len(quiz) == 2 and all(question.startswith("What about") for question, _ in quiz)
+        assert len(sample_bank_questions("DL", 10, mock_config)) == 3
+
+        generator.contexts.clear()
+        del chunks["b1"]
+        chunks["b2"] = ("gru update gates", {"course": "DL", "source": "notes/b.txt"})
+        del chunks["c1"]
+        stats = refresh_question_bank(generator, collection, mock_config)
+        assert generator.contexts == ["gru update gates"]
+        assert stats["generated"] == 1 and stats["kept"] == 1 and stats["removed"] == 2
+        assert get_bank_topics(mock_config) == {"DL"} and len(get_bank_shards("DL", mock_config)) == 2
+        assert ("What about gru update gates?", "gru update gates") in sample_bank_questions("DL", 10, mock_config)
 
+    finally:
+
+        if os.path.exists(temp_db_path):
+            os.remove(temp_db_path)
@@ -0,0 +1,165 @@
+import sys
+import queue
+import types
+
+import pytest
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from src.llm import model_loader
+from src.llm.model_loader import LlamaCppLLM, StreamingHuggingFacePipeline, load_llm, token_counter
+from src.llm.scheduler import InferenceScheduler
+
+
+class FakeLlama:
+    """Stands in for `llama_cpp.Llama`, recording how it is built and called."""
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.calls = []
+        self.cache = None
+
+    def set_cache(self, cache):
+        self.cache = cache
+
+    def tokenize(self, text, add_bos=True):
+        return list(range(len(text.split()) + int(add_bos)))
+
+    def __call__(self, prompt, stream=False, **kwargs):
+        self.calls.append(dict(kwargs, prompt=prompt, stream=stream))
+        if not stream:
+            return {'choices': [{'text': "A GRU has two gates."}]}
+        return iter({'choices': [{'text': text}]} for text in ["A GRU", "", " has", " two gates."])
+
+
+class FakeRAMCache:
+    def __init__(self, capacity_bytes):
+        self.capacity_bytes = capacity_bytes
+
+
+def test_load_llm_dispatches_by_backend(monkeypatch):
+    """
+    Tests that `load_llm` picks the loader of the configured backend.
+
+    This unit test verifies that:
+    1.  Without a 'backend' the transformers loader is used, and every
+        loader receives the generator section of the configuration.
+    2.  'llama_cpp' and 'onnx' are dispatched to their own loaders.
+    3.  An unknown backend raises a ValueError naming it.
+    """
+    calls = []
+    for backend in ('transformers', 'llama_cpp', 'onnx'):
+        monkeypatch.setitem(model_loader._BACKENDS, backend,
+                            lambda generator_config, backend=backend: calls.append((backend, generator_config)) or backend)
+
+    generator_config = {"llm_name": "fake"}
+    assert load_llm({"rag_core": {"generator": generator_config}}) == "transformers"
+    assert calls == [("transformers", generator_config)]
+    assert load_llm({"rag_core": {"generator": {"backend": "llama_cpp"}}}) == "llama_cpp"
+    assert load_llm({"rag_core": {"generator": {"backend": "onnx"}}}) == "onnx"
+
+    with pytest.raises(ValueError, match="Unknown LLM backend: vllm"):
+        load_llm({"rag_core": {"generator": {"backend": "vllm"}}})
+
+
+def test_llama_cpp_backend(monkeypatch):
+    """
+    Tests the llama.cpp backend with a stubbed `llama_cpp` module.
+
+    This unit test verifies that:
+    1.  The GGUF model is opened with the configured KV cache type, batch
+        size and thread count, and a RAM cache when the prefix cache is on.
+    2.  The generation settings and stop sequences are passed to the model,
+        with no stop sequences sent as an empty list.
+    3.  Streaming yields the model's text piece by piece, skipping empty
+        pieces, and tokens are counted without the BOS token.
+    """
+    monkeypatch.setitem(sys.modules, "llama_cpp", types.SimpleNamespace(Llama=FakeLlama, LlamaRAMCache=FakeRAMCache))
+    mock_config = {"rag_core": {"generator": {
+        "backend": "llama_cpp",
+        "max_new_tokens": 64,
+        "temperature": 0.2,
+        "num_threads": 0,
+        "context_size": 2048,
+        "prefix_cache": {"enabled": True, "max_mb": 1},
+        "llama_cpp": {"model_path": "models/fake.gguf", "kv_cache_type": "q8_0", "n_batch": 256},
+    }}}
+
+    llm = load_llm(mock_config)
+    assert isinstance(llm, LlamaCppLLM)
+    client = llm.client
+    assert client.kwargs["model_path"] == "models/fake.gguf" and client.kwargs["n_ctx"] == 2048
+    assert client.kwargs["type_k"] == client.kwargs["type_v"] == 8
+    assert client.kwargs["n_batch"] == 256 and client.kwargs["n_threads"] is None
+    assert client.cache.capacity_bytes == 1024 * 1024
+
+    assert llm.invoke("How many gates?", stop=["\n\n"]) == "A GRU has two gates."
+    assert llm.invoke("How many gates?") == "A GRU has two gates."
+    assert [call["stop"] for call in client.calls] == [["\n\n"], []]
+    assert client.calls[0]["max_tokens"] == 64 and client.calls[0]["temperature"] == 0.2
+
+    assert list(llm.stream("How many gates?", stop=["Question:"])) == ["A GRU", " has", " two gates."]
+    assert client.calls[-1]["stream"] is True and client.calls[-1]["stop"] == ["Question:"]
+
+    assert token_counter(llm)("two gates") == 2
+
+
+class FakeTextIteratorStreamer:
+    """Stands in for `transformers.TextIteratorStreamer`; waits at most 5 s for text so a bug fails instead of hanging."""
+    def __init__(self, tokenizer, skip_prompt=False, skip_special_tokens=False):
+        self.queue = queue.Queue()
+
+    def put(self, text):
+        self.queue.put(text)
+
+    def end(self):
+        self.queue.put(None)
+
+    def __iter__(self):
+        while (text := self.queue.get(timeout=5)) is not None:
+            yield text
+
+
+class FakeTextGenerationPipeline:
+    """Streams the words of the prompt, and fails like a CUDA OOM on prompts starting with 'boom'."""
+    tokenizer = None
+
+    def __call__(self, prompt, streamer=None, stopping_criteria=None, **kwargs):
+        streamer.put(prompt.split()[0] + " ")
+        if prompt.startswith("boom"):
+            raise RuntimeError("CUDA out of memory")
+        for word in prompt.split()[1:]:
+            streamer.put(word + " ")
+        streamer.end()
+
+
+def test_streaming_pipeline_raises_generation_errors(monkeypatch):
+    """
+    Tests that an error in the generation thread ends the stream.
+
+    This unit test verifies that:
+    1.  The transformers backend streams the text put into its streamer.
+    2.  When generation raises, the stream ends and raises the error
+        instead of waiting for text forever.
+    3.  Behind the scheduler, the failed stream does not block later
+        requests.
+    """
+    transformers = types.SimpleNamespace(
+        TextIteratorStreamer=FakeTextIteratorStreamer, StoppingCriteriaList=list, StoppingCriteria=object,
+    )
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace())
+    llm = StreamingHuggingFacePipeline(pipeline=FakeTextGenerationPipeline())
+
+    assert list(llm.stream("two gates")) == ["two ", "gates "]
+    with pytest.raises(RuntimeError, match="CUDA out of memory"):
+        list(llm.stream("boom again"))
+
+    scheduler = InferenceScheduler(llm)
+    try:
+        with pytest.raises(RuntimeError, match="CUDA out of memory"):
+            list(scheduler.stream("boom"))
+        assert list(scheduler.stream("still works")) == ["still ", "works "]
+    finally:
+        scheduler.close()
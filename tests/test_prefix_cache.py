@@ -0,0 +1,48 @@
+import sys
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from src.features.flashcard_generator import get_flashcard_prompt
+from src.llm.prefix_cache import PrefixKVCache, match_prefix, prefix_key, prompt_prefix
+
+
+def test_prefix_kv_cache():
+    """
+    Tests the prompt-prefix key/value cache.
+
+    This unit test verifies that:
+    1.  The prefix of the flashcard prompt ends before its context and
+        includes the JSON format instructions.
+    2.  Prompts are matched to the longest registered prefix.
+    3.  Entries are keyed by a hash of the prefix token IDs and evicted
+        least recently used first to stay within the byte budget.
+    4.  Hits, misses and reused tokens are counted per chain.
+    """
+    flashcard_prompt = get_flashcard_prompt()
+    prefix = prompt_prefix(flashcard_prompt)
+    assert "format" in prefix.lower() and prefix.rstrip().endswith("---")
+    assert flashcard_prompt.format(context="GRUs have two gates.").startswith(prefix)
+
+    prefixes = {"flashcards": prefix, "short": prefix[:20], "qa": "Use the following pieces"}
+    assert match_prefix(prefixes, flashcard_prompt.format(context="x"))[0] == "flashcards"
+    assert match_prefix(prefixes, "Unrelated prompt") is None
+
+    assert prefix_key([1, 2, 3]) == prefix_key([1, 2, 3]) != prefix_key([1, 2, 4])
+
+    cache = PrefixKVCache(max_bytes=100)
+    assert cache.get("a", "flashcards", 10) is None
+    cache.put("a", "state a", 40)
+    cache.put("b", "state b", 40)
+    assert cache.get("a", "flashcards", 10) == "state a"
+    cache.put("c", "state c", 40)
+    cache.put("huge", "state huge", 1000)
+    assert cache.get("b", "qa", 5) is None
+    assert cache.get("huge", "qa", 5) is None
+    assert cache.get("c", "qa", 5) == "state c"
+
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 80 and stats["evictions"] == 1
+    assert stats["chains"]["flashcards"] == {"hits": 1, "misses": 1, "reused_tokens": 10}
+    assert stats["chains"]["qa"] == {"hits": 1, "misses": 2, "reused_tokens": 5}
@@ -1,10 +1,73 @@
 import sys
+import os
+import time
+import shutil
+from types import SimpleNamespace
 
 repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
 if repo_path not in sys.path:
     sys.path.append(repo_path)
 
-from src.Preprocessing.text_cleaner import cleaning_fn
+from src.Preprocessing.text_cleaner import cleaning_fn, clean_pages
+
+
+def _write_test_pdf(file_path, page_count, label=None):
+    """
+    Writes a PDF with `page_count` pages of selectable text, enough on each
+    page for direct extraction to be used instead of OCR.
+    """
+    import pymupdf as fitz
+
+    label = label or os.path.basename(file_path)
+    doc = fitz.open()
+    for page_number in range(page_count):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {page_number} of {label}: recurrent networks process sequences.")
+        page.insert_text((72, 96), "Gated units such as the GRU and LSTM mitigate vanishing gradients.")
+        page.insert_text((72, 120), "Bidirectional models read the sequence in both directions at once.")
+    doc.save(file_path)
+    doc.close()
+
+
+def _write_sized_pdf(file_path, page_count):
+    """
+    Writes a PDF whose page `i` is 100 + 20 * i points wide, so a rendered
+    page can be told apart by its pixel width.
+    """
+    import pymupdf as fitz
+
+    doc = fitz.open()
+    for page_number in range(page_count):
+        page = doc.new_page(width=100 + 20 * page_number, height=100)
+        page.insert_text((10, 50), f"Page {page_number}")
+    doc.save(file_path)
+    doc.close()
+
+
+class FakeTesseract:
+    """
+    Stands in for pytesseract. Every image is "recognised" as its pixel
+    width, with the confidence returned by `confidence(image)`, and what
+    Tesseract was given is recorded.
+    """
+    Output = SimpleNamespace(DICT="dict")
+
+    def __init__(self, confidence=lambda image: 90.0, delay=0.0, on_call=None):
+        self.confidence = confidence
+        self.delay = delay
+        self.on_call = on_call
+        self.calls = []
+
+    def image_to_data(self, image, output_type=None):
+        if self.on_call:
+            self.on_call()
+        time.sleep(self.delay)
+        colors = image.getcolors(256) if image.mode == "L" else None
+        self.calls.append({"width": image.width, "mode": image.mode, "values": sorted(value for _, value in colors or [])})
+        return {
+            "text": [str(image.width)], "conf": [self.confidence(image)],
+            "block_num": [1], "par_num": [1], "line_num": [1],
+        }
 
 
 def test_cleaning_function():
@@ -51,3 +114,384 @@ def test_cleaning_function():
     assert cleaning_fn(dirty_4) == expected_4
     assert cleaning_fn(dirty_5) == expected_5
 
+
+def test_hyphenation_and_streaming_cleaner():
+    """
+    Tests the rejoining of hyphenated line breaks and the per-page cleaner.
+
+    The test verifies that:
+    1.  A word hyphenated across a line break is rejoined, while ordinary
+        hyphens are kept.
+    2.  Cleaning a document page by page with `clean_pages` gives exactly
+        the same text as `cleaning_fn` on the whole document, including
+        when a hyphenated word or a whitespace run spans a page boundary.
+    """
+    assert cleaning_fn("recur-\n  rent networks") == "recurrent networks"
+    assert cleaning_fn("a well-known  result") == "a well-known result"
+
+    pages = ["  Long short-term mem-", "\n ory networks use gates.\t", "\n\nThe GRU ", "is simpler. "]
+    assert "".join(clean_pages(pages)) == cleaning_fn("".join(pages))
+    assert "".join(clean_pages(pages)) == "Long short-term memory networks use gates. The GRU is simpler."
+    assert "".join(clean_pages([])) == ""
+
+
+
+def test_parallel_processing_matches_serial():
+    """
+    Tests that the multi-process ingestion mode writes exactly the same
+    processed files as the serial mode.
+
+    A small raw data tree is created with a short PDF and a multi-page PDF
+    that is large enough to be split into several page-range tasks. Both
+    modes are run over it and the resulting .txt files are compared.
+    """
+    from src.Preprocessing.document_parser import process_all_documents
+
+    base_dir = "test_preprocessing_data"
+    course_dir = os.path.join(base_dir, "raw", "Course", "Lectures")
+
+    try:
+        os.makedirs(course_dir, exist_ok=True)
+        _write_test_pdf(os.path.join(course_dir, "short.pdf"), 2)
+        _write_test_pdf(os.path.join(course_dir, "long.pdf"), 7)
+
+        outputs = {}
+        for num_workers in (1, 3):
+            mock_config = {
+                "data": {"raw_path": os.path.join(base_dir, "raw")},
+                "preprocessing": {"num_workers": num_workers, "pages_per_task": 2},
+            }
+            process_all_documents(mock_config)
+            processed_dir = os.path.join(base_dir, "processed", "Course", "Lectures")
+            outputs[num_workers] = {}
+            for name in sorted(os.listdir(processed_dir)):
+                with open(os.path.join(processed_dir, name), encoding="utf-8") as f:
+                    outputs[num_workers][name] = f.read()
+            shutil.rmtree(os.path.join(base_dir, "processed"))
+
+        assert sorted(outputs[1]) == ["long.txt", "short.txt"]
+        assert "Page 6 of long.pdf" in outputs[1]["long.txt"]
+        assert outputs[1] == outputs[3]
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_incremental_processing_with_manifest():
+    """
+    Tests that the preprocessing manifest makes re-runs incremental.
+
+    The test verifies that:
+    1.  A second run over an unchanged corpus rewrites nothing, so manual
+        corrections made to the processed files survive.
+    2.  A source whose content changed is reprocessed.
+    3.  The output of a source that was deleted is removed.
+    """
+    from src.Preprocessing.document_parser import process_all_documents
+
+    base_dir = "test_manifest_data"
+    raw_dir = os.path.join(base_dir, "raw", "Course", "Lectures")
+    processed_dir = os.path.join(base_dir, "processed", "Course", "Lectures")
+    mock_config = {
+        "data": {
+            "raw_path": os.path.join(base_dir, "raw"),
+            "manifest_path": os.path.join(base_dir, "manifest.json"),
+        }
+    }
+
+    try:
+        os.makedirs(raw_dir, exist_ok=True)
+        _write_test_pdf(os.path.join(raw_dir, "a.pdf"), 2)
+        _write_test_pdf(os.path.join(raw_dir, "b.pdf"), 2)
+        process_all_documents(mock_config)
+
+        with open(os.path.join(processed_dir, "a.txt"), "w", encoding="utf-8") as f:
+            f.write("manually corrected")
+        process_all_documents(mock_config)
+        with open(os.path.join(processed_dir, "a.txt"), encoding="utf-8") as f:
+            assert f.read() == "manually corrected"
+
+        _write_test_pdf(os.path.join(raw_dir, "a.pdf"), 2, label="revised notes")
+        os.remove(os.path.join(raw_dir, "b.pdf"))
+        process_all_documents(mock_config)
+
+        with open(os.path.join(processed_dir, "a.txt"), encoding="utf-8") as f:
+            assert "revised notes" in f.read()
+        assert not os.path.exists(os.path.join(processed_dir, "b.txt"))
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_failed_documents_are_retried(monkeypatch):
+    """
+    Tests that documents that failed are not recorded as up to date.
+
+    The test verifies, in the serial and the parallel mode, that:
+    1.  A PDF that cannot be read gets no output file and no manifest entry.
+    2.  A PDF whose OCR raised is written with the text that was extracted
+        but left out of the manifest, so the next run processes it again.
+    3.  Documents that succeeded are recorded in the manifest.
+    """
+    import json
+    import pymupdf as fitz
+    from src.Preprocessing import document_parser
+
+    def failing_ocr(file_path, page_numbers, config):
+        raise RuntimeError("tesseract crashed")
+        yield
+
+    monkeypatch.setattr(document_parser, "iter_ocr_pages", failing_ocr)
+    base_dir = "test_failed_data"
+    raw_dir = os.path.join(base_dir, "raw", "Course", "Lectures")
+    processed_dir = os.path.join(base_dir, "processed", "Course", "Lectures")
+    manifest_path = os.path.join(base_dir, "manifest.json")
+
+    try:
+        for num_workers in (1, 2):
+            os.makedirs(raw_dir, exist_ok=True)
+            _write_test_pdf(os.path.join(raw_dir, "good.pdf"), 2)
+            _write_test_pdf(os.path.join(raw_dir, "scanned.pdf"), 1)
+            doc = fitz.open(os.path.join(raw_dir, "scanned.pdf"))
+            doc.new_page()
+            doc.saveIncr()
+            doc.close()
+            with open(os.path.join(raw_dir, "corrupt.pdf"), "wb") as f:
+                f.write(b"not a pdf")
+            mock_config = {
+                "data": {"raw_path": os.path.join(base_dir, "raw"), "manifest_path": manifest_path},
+                "preprocessing": {"num_workers": num_workers},
+            }
+
+            document_parser.process_all_documents(mock_config)
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            assert sorted(os.path.basename(path) for path in manifest) == ["good.pdf"]
+            assert not os.path.exists(os.path.join(processed_dir, "corrupt.txt"))
+            with open(os.path.join(processed_dir, "scanned.txt"), encoding="utf-8") as f:
+                assert "Page 0 of scanned.pdf" in f.read()
+
+            with open(os.path.join(processed_dir, "scanned.txt"), "w", encoding="utf-8") as f:
+                f.write("stale")
+            document_parser.process_all_documents(mock_config)
+            with open(os.path.join(processed_dir, "scanned.txt"), encoding="utf-8") as f:
+                assert f.read() != "stale"
+
+            shutil.rmtree(base_dir)
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_blank_scanned_pages_are_not_failures(monkeypatch):
+    """
+    Tests that a blank page sent to OCR does not count as a failed page.
+
+    A PDF with a typed page and a blank page is processed with Tesseract
+    stubbed to find no words, as it does on a blank page. The document is
+    recorded in the manifest and skipped on the next run.
+    """
+    import json
+    import pymupdf as fitz
+    from src.Preprocessing import ocr_pipeline
+    from src.Preprocessing.document_parser import process_all_documents
+
+    blank = {"text": [], "conf": [], "block_num": [], "par_num": [], "line_num": []}
+    tesseract = SimpleNamespace(Output=SimpleNamespace(DICT="dict"), image_to_data=lambda image, output_type=None: blank)
+    monkeypatch.setattr(ocr_pipeline, "pytesseract", tesseract)
+    base_dir = "test_blank_page_data"
+    raw_dir = os.path.join(base_dir, "raw", "Course", "Lectures")
+    output_path = os.path.join(base_dir, "processed", "Course", "Lectures", "scan.txt")
+    manifest_path = os.path.join(base_dir, "manifest.json")
+    mock_config = {"data": {"raw_path": os.path.join(base_dir, "raw"), "manifest_path": manifest_path}}
+
+    try:
+        os.makedirs(raw_dir, exist_ok=True)
+        _write_test_pdf(os.path.join(raw_dir, "scan.pdf"), 1)
+        doc = fitz.open(os.path.join(raw_dir, "scan.pdf"))
+        doc.new_page()
+        doc.saveIncr()
+        doc.close()
+
+        process_all_documents(mock_config)
+        with open(manifest_path, encoding="utf-8") as f:
+            entry = json.load(f)[os.path.join(raw_dir, "scan.pdf")]
+        assert entry["ocr_pages"] == [{"page": 2, "dpi": 300, "confidence": None}]
+
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write("manually corrected")
+        process_all_documents(mock_config)
+        with open(output_path, encoding="utf-8") as f:
+            assert f.read() == "manually corrected"
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_extract_document_routes_pages_individually():
+    """
+    Tests that text extraction is routed per page.
+
+    A PDF with a blank page between two typed pages is extracted. Only the
+    blank page should be sent to OCR, and the per-page records should say
+    which path every page took.
+    """
+    import pymupdf as fitz
+    from src.Preprocessing.document_parser import extract_document
+
+    base_dir = "test_routing_data"
+    pdf_path = os.path.join(base_dir, "mixed.pdf")
+    mock_config = {"preprocessing": {"min_page_chars": 50}}
+
+    try:
+        os.makedirs(base_dir, exist_ok=True)
+        _write_test_pdf(pdf_path, 2)
+        doc = fitz.open(pdf_path)
+        doc.new_page(pno=1)
+        doc.saveIncr()
+        doc.close()
+
+        page_texts, page_records = extract_document(pdf_path, mock_config)
+        text = ''.join(page_texts)
+
+        assert [record['method'] for record in page_records] == ['text', 'ocr', 'text']
+        assert [record['page'] for record in page_records] == [1, 2, 3]
+        assert "Page 0 of mixed.pdf" in text and "Page 1 of mixed.pdf" in text
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_ocr_cache_lru_eviction():
+    """
+    Tests the disk-backed OCR cache.
+
+    The test verifies that stored results can be looked up, that lookups
+    refresh an entry's recency, and that eviction under a size budget
+    removes the least recently used entries first.
+    """
+    import time
+    from src.Preprocessing.ocr_cache import open_ocr_cache, store_ocr_result, get_cached_ocr, evict_ocr_cache
+
+    cache_path = "test_ocr_cache.db"
+
+    try:
+        conn = open_ocr_cache(cache_path)
+        for key in ("a" * 64, "b" * 64, "c" * 64):
+            store_ocr_result(conn, key, "x" * 1000, 90.0, 300)
+            time.sleep(0.01)
+
+        assert get_cached_ocr(conn, "a" * 64) == ("x" * 1000, 90.0, 300)
+        assert get_cached_ocr(conn, "d" * 64) is None
+
+        # Room for two entries: "b" is now the least recently used.
+        assert evict_ocr_cache(cache_path, 2500 / (1024 * 1024)) == 1
+        assert get_cached_ocr(conn, "b" * 64) is None
+        assert get_cached_ocr(conn, "a" * 64) is not None
+        assert get_cached_ocr(conn, "c" * 64) is not None
+        conn.close()
+
+    finally:
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+
+def test_ocr_pages_stream_in_order_through_bounded_queue(monkeypatch):
+    """
+    Tests the in-memory OCR pipeline with Tesseract stubbed out.
+
+    The test verifies that:
+    1.  Pages come out in the order requested, each with its own text.
+    2.  The renderer never runs more than the bounded queue allows ahead of
+        a slow Tesseract, so peak memory does not grow with page count.
+    """
+    from src.Preprocessing import ocr_pipeline
+
+    base_dir = "test_ocr_pipeline_data"
+    pdf_path = os.path.join(base_dir, "scan.pdf")
+    mock_config = {"preprocessing": {"ocr": {"dpi": 72, "queue_size": 2}}}
+    rendered = []
+    consumed = []
+    ahead = []
+
+    original_frombytes = ocr_pipeline.Image.frombytes
+
+    def counting_frombytes(*args, **kwargs):
+        rendered.append(1)
+        return original_frombytes(*args, **kwargs)
+
+    def on_call():
+        consumed.append(1)
+        ahead.append(len(rendered) - len(consumed))
+
+    tesseract = FakeTesseract(delay=0.02, on_call=on_call)
+    monkeypatch.setattr(ocr_pipeline, "pytesseract", tesseract)
+    monkeypatch.setattr(ocr_pipeline.Image, "frombytes", counting_frombytes)
+
+    try:
+        os.makedirs(base_dir, exist_ok=True)
+        _write_sized_pdf(pdf_path, 8)
+        results = list(ocr_pipeline.iter_ocr_pages(pdf_path, [5, 0, 3, 1, 2, 4, 6, 7], mock_config))
+
+        assert [page_number for page_number, _, _ in results] == [5, 0, 3, 1, 2, 4, 6, 7]
+        assert all(text == str(100 + 20 * page_number) for page_number, text, _ in results)
+        assert all(details == {"dpi": 72, "confidence": 90.0, "cache": None, "failed": False} for _, _, details in results)
+        # The page being recognised, `queue_size` queued pages and one waiting to be queued.
+        assert max(ahead) <= 2 + 2
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_adaptive_ocr_resolution_and_preprocessing(monkeypatch):
+    """
+    Tests adaptive OCR resolution and page preprocessing with Tesseract
+    stubbed out.
+
+    The test verifies that:
+    1.  Only the page recognised below `min_confidence` at `base_dpi` is
+        rendered again at `dpi`, and the better of its two results is kept.
+    2.  With binarization enabled, Tesseract is given black and white
+        grayscale images.
+    3.  Grayscale conversion alone keeps the grey levels, and without
+        preprocessing the rendered image is passed through unchanged.
+    """
+    from PIL import Image
+    from src.Preprocessing import ocr_pipeline
+
+    base_dir = "test_adaptive_ocr_data"
+    pdf_path = os.path.join(base_dir, "scan.pdf")
+    # At 72 dpi page 1 is 120 px wide and page 2 is 140 px; both are unclear at first,
+    # and page 2 gets even worse at 144 dpi (280 px).
+    confidences = {120: 50.0, 140: 60.0, 280: 40.0}
+    mock_config = {"preprocessing": {"ocr": {
+        "adaptive": True, "base_dpi": 72, "dpi": 144, "min_confidence": 75,
+        "binarize": True, "binarize_threshold": 128,
+    }}}
+
+    tesseract = FakeTesseract(confidence=lambda image: confidences.get(image.width, 90.0))
+    monkeypatch.setattr(ocr_pipeline, "pytesseract", tesseract)
+
+    try:
+        os.makedirs(base_dir, exist_ok=True)
+        _write_sized_pdf(pdf_path, 3)
+        results = {page_number: (text, details) for page_number, text, details in
+                   ocr_pipeline.iter_ocr_pages(pdf_path, range(3), mock_config)}
+
+        assert sorted(call["width"] for call in tesseract.calls) == [100, 120, 140, 240, 280]
+        assert results[0] == ("100", {"dpi": 72, "confidence": 90.0, "cache": None, "failed": False})
+        assert results[1] == ("240", {"dpi": 144, "confidence": 90.0, "cache": None, "failed": False})
+        assert results[2] == ("140", {"dpi": 72, "confidence": 60.0, "cache": None, "failed": False})
+
+        assert all(call["mode"] == "L" for call in tesseract.calls)
+        assert all(set(call["values"]) <= {0, 255} for call in tesseract.calls)
+        assert any(call["values"] == [0, 255] for call in tesseract.calls)
+
+        gradient = Image.linear_gradient("L").convert("RGB")
+        settings = ocr_pipeline.get_ocr_settings({"preprocessing": {"ocr": {"grayscale": True}}})
+        grayscale = ocr_pipeline.prepare_page_image(gradient, settings)
+        assert grayscale.mode == "L" and len(grayscale.getcolors(256)) == 256
+        assert ocr_pipeline.prepare_page_image(gradient, ocr_pipeline.get_ocr_settings({})) is gradient
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
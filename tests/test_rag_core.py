@@ -0,0 +1,329 @@
+import sys
+import types
+import shutil
+import numpy as np
+import pytest
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.rag_core.embedder import assign_chunk_ids, compute_chunk_ids, open_vector_store, get_indexed_chunk_ids
+from src.rag_core.embedding_cache import EmbeddingCache
+from src.rag_core.embedding_engine import load_embedding_model
+
+
+def test_incremental_vector_store_sync():
+    """
+    Tests the deterministic chunk IDs and the incremental index build.
+
+    This unit test verifies that:
+    1.  Chunk IDs are stable across runs and distinguish identical chunks
+        within the same source.
+    2.  Indexing the same file twice embeds nothing the second time, so
+        the collection never holds duplicates.
+    3.  Editing one chunk embeds only that chunk and deletes its old entry,
+        in the vector store and in the lexical index alike.
+
+    A deterministic fake embedding model stands in for the real one, since
+    only the bookkeeping is under test.
+    """
+    import os
+    from src.rag_core.indexer import build_index
+    from src.rag_core.lexical_index import LexicalIndex
+
+    base_dir = "test_vector_store"
+    notes_path = os.path.join(base_dir, "processed", "Course", "Lectures", "rnn.txt")
+    mock_config = {
+        "data": {"processed_path": os.path.join(base_dir, "processed")},
+        "rag_core": {
+            "chunking": {"chunk_size": 30, "chunk_overlap": 0},
+            "database": {"persist_directory": os.path.join(base_dir, "chroma"), "collection_name": "test_notes"},
+        },
+    }
+
+    def make_chunks(*texts):
+        return [Document(page_content=text, metadata={"source": "notes/rnn.txt"}) for text in texts]
+
+    def write_notes(*paragraphs):
+        with open(notes_path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+
+    try:
+        first_ids = compute_chunk_ids(make_chunks("RNNs share weights.", "GRUs have two gates.", "GRUs have two gates."))
+        assert first_ids == compute_chunk_ids(make_chunks("RNNs share weights.", "GRUs have two gates.", "GRUs have two gates."))
+        assert len(set(first_ids)) == 3
+
+        os.makedirs(os.path.dirname(notes_path), exist_ok=True)
+        vector_store = open_vector_store(mock_config, embeddings=DeterministicFakeEmbedding(size=16))
+        lexical_index = LexicalIndex()
+
+        write_notes("RNNs share weights.", "GRUs have two gates.")
+        stats = build_index(vector_store, get_indexed_chunk_ids(vector_store), mock_config, lexical_index)
+        assert (stats["added"], stats["deleted"]) == (2, 0)
+        stats = build_index(vector_store, get_indexed_chunk_ids(vector_store), mock_config, lexical_index)
+        assert (stats["added"], stats["deleted"]) == (0, 0)
+
+        write_notes("RNNs share weights.", "LSTMs have three gates.")
+        stats = build_index(vector_store, get_indexed_chunk_ids(vector_store), mock_config, lexical_index)
+        assert (stats["added"], stats["deleted"]) == (1, 1)
+
+        stored = vector_store.get()
+        assert sorted(stored["documents"]) == ["LSTMs have three gates.", "RNNs share weights."]
+        assert all(metadata["chunk_id"] == chunk_id for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]))
+        assert lexical_index.chunk_ids() == set(stored["ids"])
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_streaming_index_build():
+    """
+    Tests the streaming chunk -> embed -> write pipeline.
+
+    A small processed tree is indexed with a batch size smaller than the
+    number of chunks, so several batches flow through the bounded queues.
+    A second run over the unchanged files must embed nothing. The topic
+    catalog built from the run statistics must match a full scan of the
+    collection metadata.
+    """
+    import os
+    from src.rag_core.indexer import build_index
+    from src.rag_core.topic_catalog import build_topic_catalog, catalog_from_vector_store, save_topic_catalog, load_topic_catalog
+
+    base_dir = "test_index_data"
+    processed_dir = os.path.join(base_dir, "processed", "Course", "Lectures")
+    mock_config = {
+        "data": {"processed_path": os.path.join(base_dir, "processed")},
+        "rag_core": {
+            "chunking": {"chunk_size": 60, "chunk_overlap": 0},
+            "database": {"persist_directory": os.path.join(base_dir, "vector_store"), "collection_name": "test_notes"},
+            "indexing": {"batch_size": 2, "queue_size": 1},
+        },
+    }
+
+    try:
+        os.makedirs(processed_dir, exist_ok=True)
+        for name in ("rnn.txt", "cnn.txt"):
+            with open(os.path.join(processed_dir, name), "w", encoding="utf-8") as f:
+                f.write(" ".join(f"{name} sentence number {i}." for i in range(10)))
+
+        vector_store = open_vector_store(mock_config, embeddings=DeterministicFakeEmbedding(size=16))
+        stats = build_index(vector_store, get_indexed_chunk_ids(vector_store), mock_config)
+        stored_count = len(vector_store.get()["ids"])
+
+        assert stats["added"] == stored_count > 4
+        assert len(stats["seen_sources"]) == 2
+
+        catalog = build_topic_catalog(stats["source_summaries"])
+        assert catalog["courses"] == {"Course": {"specialization": None, "chunks": stored_count, "notes_types": {"Lectures": stored_count}}}
+        assert catalog["notes_types"] == ["Lectures"] and catalog["total_chunks"] == stored_count
+        assert catalog_from_vector_store(vector_store) == catalog
+        save_topic_catalog(catalog, os.path.join(base_dir, "topic_catalog.json"))
+        assert load_topic_catalog(os.path.join(base_dir, "topic_catalog.json")) == catalog
+
+        stats = build_index(vector_store, get_indexed_chunk_ids(vector_store), mock_config)
+        assert stats["added"] == 0 and stats["deleted"] == 0
+        assert len(vector_store.get()["ids"]) == stored_count
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_embedding_cache():
+    """
+    Tests the persistent, content-addressed embedding cache.
+
+    This unit test verifies that:
+    1.  Stored vectors are returned unchanged, and unknown texts are misses.
+    2.  A new cache instance on the same directory (e.g. the app after the
+        indexer ran) reads the vectors back from disk.
+    3.  Vectors of a different model, even of another size, never collide
+        with cached ones, and vectors of the wrong size are rejected.
+    4.  Hit and miss counts are reported.
+    """
+    cache_dir = "test_embedding_cache"
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+    try:
+        cache = EmbeddingCache(cache_dir, model_key="model-a", memory_items=2)
+        cache.put_many(["alpha", "beta", "gamma"], vectors)
+        cache.put_many(["alpha"], vectors[:1])
+
+        results = cache.get_many(["gamma", "delta", "alpha"])
+        np.testing.assert_array_equal(results[0], vectors[2])
+        assert results[1] is None
+        np.testing.assert_array_equal(results[2], vectors[0])
+
+        reopened = EmbeddingCache(cache_dir, model_key="model-a")
+        for text, vector in zip(["alpha", "beta", "gamma"], reopened.get_many(["alpha", "beta", "gamma"])):
+            np.testing.assert_array_equal(vector, vectors[["alpha", "beta", "gamma"].index(text)])
+        assert reopened.stats() == {"memory_hits": 0, "disk_hits": 3, "misses": 0, "hit_rate": 1.0}
+
+        other_model = EmbeddingCache(cache_dir, model_key="model-b")
+        assert other_model.get_many(["alpha"]) == [None]
+        assert cache.stats()["misses"] == 1
+
+        # A model of another size gets its own rows and leaves model-a's intact.
+        other_model.put_many(["alpha"], np.ones((1, 6), dtype=np.float32))
+        np.testing.assert_array_equal(other_model.get_many(["alpha"])[0], np.ones(6))
+        np.testing.assert_array_equal(EmbeddingCache(cache_dir, model_key="model-a").get_many(["beta"])[0], vectors[1])
+        with pytest.raises(ValueError):
+            other_model.put_many(["beta"], np.ones((1, 4), dtype=np.float32))
+
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+class FakeSentenceTransformer:
+    """Stands in for `SentenceTransformer`: embeds a text as [length, first letter], recording every call."""
+    calls = []
+
+    def __init__(self, model_name, device=None):
+        self.model_name = model_name
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, convert_to_numpy=True, show_progress_bar=None):
+        self.calls.append(list(texts))
+        return np.array([[len(text), ord(text[0])] for text in texts], dtype=np.float64)
+
+
+def test_embedding_engine(monkeypatch):
+    """
+    Tests the embedding engine with a stubbed sentence-transformers model.
+
+    This unit test verifies that:
+    1.  `load_embedding_model` applies 'num_threads' to torch and builds
+        the engine from the configuration.
+    2.  Vectors come back as float32 in the order of the input texts.
+    3.  With a cache attached, only texts not seen before reach the model,
+        once each, and an empty input returns an empty matrix.
+    """
+    thread_counts = []
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace(set_num_threads=thread_counts.append))
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=FakeSentenceTransformer))
+    monkeypatch.setattr(FakeSentenceTransformer, "calls", [])
+    cache_dir = "test_engine_embedding_cache"
+    mock_config = {"rag_core": {"embedding": {
+        "model_name": "fake-model", "batch_size": 8, "num_threads": 3, "cache": {"path": cache_dir},
+    }}}
+
+    try:
+        engine = load_embedding_model(mock_config)
+        assert thread_counts == [3] and engine.batch_size == 8
+
+        texts = ["a", "ccc", "bb", "dddd"]
+        vectors = engine.encode(texts)
+        assert vectors.dtype == np.float32
+        np.testing.assert_array_equal(vectors, [[1, 97], [3, 99], [2, 98], [4, 100]])
+
+        assert engine.embed_documents(["ccc", "eeeee", "eeeee"]) == [[3, 99], [5, 101], [5, 101]]
+        assert FakeSentenceTransformer.calls == [texts, ["eeeee"]]
+        assert engine.encode([]).shape == (0, 2)
+
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def test_local_retriever_backends():
+    """
+    Tests the local store backends of `create_retriever`.
+
+    The collection is exported to the local store, and with both the int8
+    and the IVF backend every query must return the same top-k chunks as an
+    exact float32 search over the exported vectors, with their text and
+    metadata intact. The IVF index probes all of its lists here, so its
+    result is exact too.
+    """
+    import os
+    from src.rag_core.retriever import create_retriever
+    from src.rag_core.local_store import export_local_store, open_local_store, read_documents
+
+    base_dir = "test_local_store_data"
+    embeddings = DeterministicFakeEmbedding(size=16)
+    mock_config = {
+        "rag_core": {
+            "database": {
+                "persist_directory": os.path.join(base_dir, "vector_store"),
+                "collection_name": "test_notes",
+                "local_store_directory": os.path.join(base_dir, "local_store"),
+            },
+            "retriever": {"k": 5, "rerank_candidates": 20, "ivf": {"n_lists": 8, "n_probe": 8}},
+        }
+    }
+
+    try:
+        vector_store = open_vector_store(mock_config, embeddings=embeddings)
+        chunks = [Document(page_content=f"Chunk {i} of the notes.", metadata={"source": "notes/rnn.txt"}) for i in range(200)]
+        vector_store.add_documents(chunks, ids=assign_chunk_ids(chunks))
+
+        store_dir = mock_config["rag_core"]["database"]["local_store_directory"]
+        assert export_local_store(vector_store, store_dir) == {"count": 200, "dim": 16}
+        store = open_local_store(store_dir)
+        vectors = np.asarray(store["vectors"])
+        texts = [document.page_content for document in read_documents(store_dir, store["offsets"], range(200))]
+
+        for backend in ("int8", "ivf"):
+            mock_config["rag_core"]["retriever"]["backend"] = backend
+            retriever = create_retriever(mock_config, embeddings)
+            for query in ("Chunk 3 of the notes.", "recurrent networks", "gates"):
+                query_vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+                exact = np.argsort(((vectors - query_vector) ** 2).sum(axis=1))[:5]
+                results = retriever.invoke(query)
+                assert [document.page_content for document in results] == [texts[row] for row in exact]
+                assert all(document.metadata["source"] == "notes/rnn.txt" and document.metadata["chunk_id"] for document in results)
+
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def test_lexical_index_and_hybrid_fusion():
+    """
+    Tests the BM25 lexical index and reciprocal-rank fusion.
+
+    This unit test verifies that:
+    1.  An exact rare term (a course code) ranks its chunk first.
+    2.  Deleted and replaced chunks stop matching, including after a
+        save/load round trip that compacts the tombstones away.
+    3.  Fusion favours items ranked well by both rankings, and the
+        near-duplicate check catches chunks with almost the same words.
+    """
+    import os
+    from src.rag_core.lexical_index import LexicalIndex
+    from src.rag_core.hybrid_retriever import reciprocal_rank_fusion, is_near_duplicate
+
+    index_path = "test_lexical_index.npz"
+    try:
+        index = LexicalIndex()
+        index.add("a", "CS231N covers convolutional networks for visual recognition.")
+        index.add("b", "Recurrent networks process sequences step by step.")
+        index.add("c", "Convolutional networks share weights across positions.")
+        index.add("d", "Attention lets networks focus on relevant tokens.")
+
+        assert index.search("cs231n", k=3)[0][0] == "a"
+        assert [chunk_id for chunk_id, _ in index.search("convolutional", k=5)] in (["a", "c"], ["c", "a"])
+
+        index.delete(["c"])
+        index.add("b", "Transformers replaced recurrent networks.")
+        assert [chunk_id for chunk_id, _ in index.search("convolutional")] == ["a"]
+        assert [chunk_id for chunk_id, _ in index.search("transformers")] == ["b"]
+        assert index.search("sequences") == []
+
+        index.save(index_path)
+        reloaded = LexicalIndex.load(index_path)
+        assert reloaded.chunk_ids() == {"a", "b", "d"}
+        assert reloaded.search("attention tokens") == index.search("attention tokens")
+        assert reloaded.search("attention tokens")[0][0] == "d"
+
+        assert reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], [1.0, 1.0])[0] == "y"
+        assert reciprocal_rank_fusion([["x", "y"], ["y"]], [1.0, 0.0])[0] == "x"
+        assert is_near_duplicate({"rnn", "share", "weights"}, [{"rnn", "share", "weights", "too"}], 0.7)
+        assert not is_near_duplicate({"rnn", "share", "weights"}, [{"gru", "gates"}], 0.7)
+
+    finally:
+        if os.path.exists(index_path):
+            os.remove(index_path)
@@ -0,0 +1,148 @@
+import sys
+import time
+import queue
+import threading
+from typing import Any, List
+
+import pytest
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, GenerationChunk, LLMResult
+from src.llm.scheduler import (
+    InferenceScheduler, ScheduledLLM, SchedulerBusyError, PRIORITY_BULK, PRIORITY_INTERACTIVE,
+)
+
+
+class RecordingLLM(LLM):
+    """Echoes prompts in upper case, records every batch and can be held."""
+    batches: List[Any] = []
+    started: Any = None
+    release: Any = None
+
+    @property
+    def _llm_type(self):
+        return "recording"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        return prompt.upper()
+
+    def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+        self.started.set()
+        self.release.wait()
+        self.batches.append(list(prompts))
+        return LLMResult(generations=[[Generation(text=prompt.upper())] for prompt in prompts])
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.release.wait()
+        for word in prompt.split():
+            yield GenerationChunk(text=word.upper() + " ")
+
+
+def test_inference_scheduler():
+    """
+    Tests the shared LLM scheduler.
+
+    This unit test verifies that:
+    1.  Queued requests are batched up to `max_batch_size` and every caller
+        gets its own answer.
+    2.  Interactive requests are served before bulk requests queued earlier.
+    3.  A full queue rejects new requests once `submit_timeout` runs out.
+    4.  Streaming works through the scheduler and `ScheduledLLM`, and the
+        stats report the queue depth, batch size and waiting times.
+    """
+    llm = RecordingLLM(batches=[], started=threading.Event(), release=threading.Event())
+    scheduler = InferenceScheduler(llm, max_batch_size=3, batch_wait_ms=50, max_queue_size=4, submit_timeout=0.05)
+    try:
+        # The worker takes the first request and blocks on it, the rest queue up.
+        blocker = scheduler.submit("warm up", priority=PRIORITY_BULK)
+        assert llm.started.wait(timeout=5)
+        bulk = [scheduler.submit(f"summary {i}", priority=PRIORITY_BULK) for i in range(3)]
+        chat = scheduler.submit("chat question", priority=PRIORITY_INTERACTIVE)
+        assert scheduler.stats()['queue_depth'] == 4
+
+        with pytest.raises(SchedulerBusyError):
+            scheduler.submit("one too many")
+
+        llm.release.set()
+        assert blocker.result(timeout=5) == "WARM UP"
+        assert chat.result(timeout=5) == "CHAT QUESTION"
+        assert [future.result(timeout=5) for future in bulk] == ["SUMMARY 0", "SUMMARY 1", "SUMMARY 2"]
+
+        assert llm.batches[0] == ["warm up"]
+        assert llm.batches[1] == ["chat question", "summary 0", "summary 1"]
+        assert llm.batches[2] == ["summary 2"]
+
+        scheduled = ScheduledLLM(scheduler=scheduler, priority=PRIORITY_INTERACTIVE)
+        assert "".join(scheduled.stream("two gates")) == "TWO GATES "
+        assert scheduled.invoke("gru") == "GRU"
+
+        stats = scheduler.stats()
+        assert stats['queue_depth'] == 0 and stats['max_queue_depth'] == 4
+        assert stats['completed'] == 7 and stats['rejected'] == 1
+        assert stats['average_batch_size'] == 6 / 4
+        assert 0 <= stats['wait_p50_ms'] <= stats['wait_p95_ms']
+    finally:
+        llm.release.set()
+        scheduler.close()
+
+
+class ThreadedStreamLLM(LLM):
+    """Streams tokens made by a background thread until told to stop, like the transformers backend."""
+    events: List[Any] = []
+    max_tokens: int = 1000
+
+    @property
+    def _llm_type(self):
+        return "threaded_stream"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.events.append("generate")
+        return prompt.upper()
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        stop_event = threading.Event()
+        tokens = queue.Queue()
+
+        def produce():
+            for i in range(self.max_tokens):
+                if stop_event.is_set():
+                    break
+                tokens.put(f"token{i} ")
+                time.sleep(0.002)
+            tokens.put(None)
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while (text := tokens.get()) is not None:
+                yield GenerationChunk(text=text)
+        finally:
+            stop_event.set()
+            thread.join()
+            self.events.append("stopped")
+
+
+def test_cancelled_stream_stops_backend():
+    """
+    Tests that closing a stream early stops the generation.
+
+    This unit test verifies that:
+    1.  Closing a scheduler stream after a few chunks stops the backend's
+        generation thread instead of letting it run to `max_tokens`.
+    2.  The next request only starts once the backend has stopped.
+    """
+    llm = ThreadedStreamLLM(events=[])
+    scheduler = InferenceScheduler(llm, batch_wait_ms=0)
+    try:
+        stream = scheduler.stream("long answer")
+        assert [next(stream), next(stream)] == ["token0 ", "token1 "]
+        stream.close()
+
+        assert scheduler.submit("next question").result(timeout=5) == "NEXT QUESTION"
+        assert llm.events == ["stopped", "generate"]
+    finally:
+        scheduler.close()
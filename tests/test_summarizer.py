@@ -0,0 +1,137 @@
+import os
+import sys
+from typing import Any, List
+
+repo_path = "/content/drive/MyDrive/AI-Study-Assistant"
+if repo_path not in sys.path:
+    sys.path.append(repo_path)
+
+from langchain_core.documents import Document
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, LLMResult
+from src.features.summarizer import create_summarizer_chain
+from src.features.summary_store import load_summary_store, refresh_summaries, summary_node_key
+
+
+class KeyPointLLM(LLM):
+    """Answers every prompt with a short line and records each batch."""
+    batches: List[Any] = []
+
+    @property
+    def _llm_type(self):
+        return "key_points"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        if "Comprehensive Final Summary" in prompt:
+            return "Final summary of the course."
+        if "Merged Key Points" in prompt:
+            return "- merged point"
+        return "- key point " + prompt.split('"')[1].split()[0]
+
+    def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+        self.batches.append(len(prompts))
+        return LLMResult(generations=[[Generation(text=self._call(prompt))] for prompt in prompts])
+
+
+def test_map_reduce_summarizer():
+    """
+    Tests the map-reduce summarization engine.
+
+    This unit test verifies that:
+    1.  Map calls are batched, and key points are streamed for every chunk
+        before the summary.
+    2.  Key points over the token budget are collapsed before the combine
+        step.
+    3.  A second run serves unchanged chunks from the map cache and only
+        maps the changed chunk.
+    """
+    cache_path = "test_summary_map_cache.db"
+    mock_config = {
+        "features": {"summarizer": {"map_cache_path": cache_path, "token_budget": 10, "map_batch_size": 4}},
+        "rag_core": {"generator": {"llm_name": "fake", "backend": "transformers"}},
+    }
+    documents = [Document(page_content=f"topic{i} is explained here.", metadata={"source": "notes/a.txt"}) for i in range(10)]
+    try:
+        llm = KeyPointLLM(batches=[])
+        summarizer = create_summarizer_chain(llm, mock_config)
+        events = list(summarizer.stream(documents))
+        kinds = [kind for kind, _ in events]
+
+        assert kinds[:10] == ["key_points"] * 10 and kinds[-1] == "metrics"
+        assert "collapse" in kinds and kinds.index("collapse") < kinds.index("token")
+        assert llm.batches[:3] == [4, 4, 2]
+        assert sorted(value["index"] for kind, value in events if kind == "key_points") == list(range(10))
+        assert "".join(value for kind, value in events if kind == "token") == "Final summary of the course."
+        assert events[-1][1]["cached_chunks"] == 0 and events[-1][1]["collapse_levels"] >= 1
+
+        documents[3] = Document(page_content="changed topic is explained here.", metadata={"source": "notes/a.txt"})
+        llm.batches.clear()
+        result = summarizer.invoke(documents)
+        assert llm.batches[0] == 1
+        assert result["intermediate_steps"][3] == "- key point changed"
+        assert result["intermediate_steps"][0] == "- key point topic0"
+        assert result["output_text"] == "Final summary of the course."
+    finally:
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+
+class CollectionStub:
+    """Stands in for the Chroma store, answering `get(include=...)`."""
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def get(self, include):
+        return {
+            "ids": list(self.chunks),
+            "documents": [text for text, _ in self.chunks.values()],
+            "metadatas": [metadata for _, metadata in self.chunks.values()],
+        }
+
+
+def test_incremental_summary_refresh():
+    """
+    Tests the precomputed summary tree.
+
+    This unit test verifies that:
+    1.  The first refresh builds a node per source file, per notes type and
+        per course, with the chunk IDs each one covers.
+    2.  A refresh without changes rebuilds nothing.
+    3.  Changing a chunk rebuilds only its file and the summaries above it,
+        and removing a file deletes its nodes.
+    """
+    store_path = "test_summaries.db"
+    mock_config = {
+        "features": {"summarizer": {"store_path": store_path, "token_budget": 1000}},
+        "rag_core": {"generator": {"llm_name": "fake"}},
+    }
+    lecture = {"course": "DL", "notes_type": "lecture"}
+    chunks = {
+        "a1": ("rnn basics", dict(lecture, source="notes/a.txt")),
+        "a2": ("lstm gates", dict(lecture, source="notes/a.txt")),
+        "b1": ("gru gates", dict(lecture, source="notes/b.txt")),
+        "c1": ("lab setup", {"course": "DL", "notes_type": "lab", "source": "notes/c.txt"}),
+    }
+    try:
+        llm = KeyPointLLM(batches=[])
+        store = load_summary_store(mock_config)
+        summarizer = create_summarizer_chain(llm, mock_config)
+        collection = CollectionStub(chunks)
+
+        assert refresh_summaries(summarizer, collection, store) == {"rebuilt": 6, "reused": 0, "removed": 0}
+        assert store.get(summary_node_key("DL"))["text"] == "Final summary of the course."
+        assert store.get(summary_node_key("DL", "lecture"))["chunk_ids"] == ["a1", "a2", "b1"]
+        assert "- key point lstm" in store.get(summary_node_key("DL", "lecture", "notes/a.txt"))["text"]
+
+        llm.batches.clear()
+        assert refresh_summaries(summarizer, collection, store) == {"rebuilt": 0, "reused": 6, "removed": 0}
+        assert llm.batches == []
+
+        del chunks["b1"], chunks["c1"]
+        chunks["b2"] = ("gru update gate", dict(lecture, source="notes/b.txt"))
+        assert refresh_summaries(summarizer, collection, store) == {"rebuilt": 3, "reused": 1, "removed": 2}
+        assert store.get(summary_node_key("DL", "lab")) is None
+        assert store.get(summary_node_key("DL"))["chunk_ids"] == ["a1", "a2", "b2"]
+    finally:
+        if os.path.exists(store_path):
+            os.remove(store_path)